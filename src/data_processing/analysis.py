@@ -9,8 +9,23 @@
 # 5. Thống kê lương theo nhóm
 
 
+import numpy as np
 import pandas as pd
 import os
+import threading
+import time
+
+from bitmap_index import BitmapIndex, build_bitmap_index, load_bitmap_index
+from counting import count_codes, dimension_codes, row_percentages
+from cube import SurveyCube, load_cube
+from encoding import encode_multi_select, load_multi_hot
+from salary_index import DEFAULT_PERCENTILES, SalaryIndex, bootstrap_median_ci
+from executor import Node, critical_path, run_dag
+from itemsets import frequent_itemsets, pack_columns, strongest_rule
+from sketches import SpaceSavingSketch
+from sql_backend import ENGINES, SQLBackend, load_survey
+from storage import iter_table_chunks, read_table, table_fingerprint
+from transform import EXPERIENCE_LABELS, explode_multi_select
 
 
 # Tạo thư mục output nếu chưa có
@@ -19,23 +34,156 @@ os.makedirs(OUTPUT_DIR, exist_ok=True)
 
 
 
+# CACHE EXPLODE CÁC CỘT MULTI-SELECT TRONG MỘT LẦN CHẠY
+
+class ExplodeCache:
+    """
+    Lưu kết quả explode (và mã hoá multi-hot) của các cột multi-select trong
+    một lần run_analysis, để mỗi cột chỉ split + explode (hoặc mã hoá) một lần
+    và dùng chung cho mọi hàm phân tích.
+
+    Khoá cache là (tên cột, DataFrame đầu vào). DataFrame được so sánh theo
+    định danh (is), không theo nội dung, nên cache chỉ dùng khi DataFrame
+    đầu vào không bị sửa giữa các lần gọi. Các hàm dùng cache không được
+    sửa trực tiếp bảng trả về.
+
+    Cache an toàn khi nhiều thread cùng gọi: mỗi khoá có một lock riêng nên
+    một cột chỉ được explode một lần, các thread khác chờ và dùng lại kết quả.
+
+    Thuộc tính:
+        hits: Số lần lấy được kết quả có sẵn
+        misses: Số lần phải explode
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _get_or_compute(self, key: tuple, df: pd.DataFrame, compute):
+        with self._lock:
+            key_lock = self._locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            entry = self._entries.get(key)
+
+            # Giữ tham chiếu tới df để id không bị dùng lại cho object khác
+            if entry is not None and entry[0] is df:
+                with self._lock:
+                    self.hits += 1
+                return entry[1]
+
+            value = compute()
+            self._entries[key] = (df, value)
+            with self._lock:
+                self.misses += 1
+
+            return value
+
+    def get(self, df: pd.DataFrame, col: str, sep: str = ';') -> pd.DataFrame:
+        """
+        Lấy bảng đã explode theo cột col (xem transform.explode_multi_select).
+        """
+        return self._get_or_compute((col, sep, id(df)), df,
+                                    lambda: explode_multi_select(df, col, sep))
+
+    def multi_hot(self, df: pd.DataFrame, col: str, sep: str = ';'):
+        """
+        Lấy mã hoá multi-hot của cột col (xem encoding.encode_multi_select).
+        """
+        return self._get_or_compute(('multi_hot', col, sep, id(df)), df,
+                                    lambda: encode_multi_select(df[col], sep))
+
+    def put_multi_hot(self, df: pd.DataFrame, encodings: dict, sep: str = ';'):
+        """
+        Nạp sẵn các mã hoá multi-hot đã lưu (encoding.load_multi_hot) cho df.
+        Thứ tự dòng của mã hoá phải trùng với df.
+        """
+        for col, encoded in encodings.items():
+            if encoded.n_respondents == len(df):
+                self._entries[('multi_hot', col, sep, id(df))] = (df, encoded)
+
+    def stats(self) -> dict:
+        """
+        Thống kê cache: {'hits', 'misses', 'entries'}.
+        """
+        return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._entries)}
+
+    def clear(self):
+        self._entries.clear()
+
+
+def _multi_hot(df: pd.DataFrame, col: str, cache: ExplodeCache = None, db: SQLBackend = None):
+    """
+    Mã hoá multi-hot cột multi-select, dùng cache nếu có.
+    Nếu có db thì trả về bảng token trong database (cùng các phép tính).
+    """
+    if db is not None:
+        return db.tokens(col)
+
+    if cache is None:
+        return encode_multi_select(df[col])
+
+    return cache.multi_hot(df, col)
+
+
+def _explode(df: pd.DataFrame, col: str, cache: ExplodeCache = None) -> pd.DataFrame:
+    """
+    Explode cột multi-select, dùng cache nếu có.
+    Các giá trị rỗng sau khi explode đã được loại bỏ.
+    """
+    if cache is None:
+        return explode_multi_select(df, col)
+
+    return cache.get(df, col)
+
+
+def _count_codes(df: pd.DataFrame, dims: list, db: SQLBackend = None):
+    """
+    counting.count_codes trên df, hoặc GROUP BY trong database nếu có db.
+    """
+    if db is not None:
+        return db.count_codes(dims)
+
+    return count_codes(df, dims)
+
+
+def _column(df: pd.DataFrame, col: str, db: SQLBackend = None):
+    """
+    Cột col của df (hoặc tên cột nếu dữ liệu nằm trong database).
+    """
+    return col if db is not None else df[col]
+
+
+def _columns(df: pd.DataFrame, db: SQLBackend = None) -> list:
+    return list(db.columns) if db is not None else list(df.columns)
+
+
+def _n_rows(df: pd.DataFrame, db: SQLBackend = None) -> int:
+    return db.n_rows if db is not None else len(df)
+
+
+
 # HÀM 1: THỐNG KÊ TỈ LỆ REMOTEWORK TỔNG THỂ
 
-def analyze_remote_work_overall(df: pd.DataFrame) -> pd.DataFrame:
+def analyze_remote_work_overall(df: pd.DataFrame, db: SQLBackend = None) -> pd.DataFrame:
     """
     Tính tỉ lệ phần trăm các hình thức làm việc (Remote/Hybrid/In-person).
     
     Tham số:
         df: DataFrame chứa cột 'RemoteWork'
+        db: SQLBackend (tuỳ chọn). Nếu có thì tính bằng SQL trong database, bỏ qua df.
     
     Trả về:
         DataFrame với số lượng và tỉ lệ % của mỗi hình thức
     """
-    # Đếm số lượng mỗi loại
-    counts = df['RemoteWork'].value_counts()
+    # Đếm số lượng mỗi loại (bincount trên mã category)
+    counts = _count_codes(df, ['RemoteWork'], db).value_counts()
     
     # Tính tỉ lệ phần trăm
-    percentages = df['RemoteWork'].value_counts(normalize=True) * 100
+    percentages = counts / counts.sum() * 100
     
     # Gộp thành bảng kết quả
     result = pd.DataFrame({
@@ -50,34 +198,27 @@ def analyze_remote_work_overall(df: pd.DataFrame) -> pd.DataFrame:
 
 # HÀM 2: CROSSTAB REMOTEWORK THEO KINH NGHIỆM
 
-def analyze_remote_by_experience(df: pd.DataFrame) -> pd.DataFrame:
+def analyze_remote_by_experience(df: pd.DataFrame, cube: SurveyCube = None, db: SQLBackend = None) -> pd.DataFrame:
     """
     Phân tích tỉ lệ RemoteWork theo từng nhóm kinh nghiệm.
     Giúp trả lời: "Developer senior có làm remote nhiều hơn junior không?"
     
     Tham số:
         df: DataFrame chứa cột 'RemoteWork' và 'ExperienceLevel'
+        cube: SurveyCube đã build từ df (tuỳ chọn). Nếu có thì tính từ cube.
+        db: SQLBackend (tuỳ chọn). Nếu có thì tính bằng SQL trong database, bỏ qua df.
     
     Trả về:
         DataFrame crosstab với tỉ lệ % theo hàng
     """
-    # Tạo crosstab đếm số lượng
-    crosstab = pd.crosstab(
-        df['ExperienceLevel'], 
-        df['RemoteWork'],
-        margins=True,  # Thêm tổng ở cuối
-        margins_name='Total'
-    )
+    if cube is not None:
+        return row_percentages(cube.crosstab('ExperienceLevel', 'RemoteWork'))
     
-    # Chuyển sang tỉ lệ % theo hàng (mỗi hàng tổng = 100%)
-    crosstab_pct = pd.crosstab(
-        df['ExperienceLevel'], 
-        df['RemoteWork'],
-        normalize='index'  # Normalize theo hàng
-    ) * 100
+    # Đếm mọi cặp (ExperienceLevel, RemoteWork) bằng một lần bincount
+    counts = _count_codes(df, ['ExperienceLevel', 'RemoteWork'], db)
     
-    # Làm tròn 2 chữ số thập phân
-    crosstab_pct = crosstab_pct.round(2)
+    # Chuyển sang tỉ lệ % theo hàng (mỗi hàng tổng = 100%), làm tròn 2 chữ số thập phân
+    crosstab_pct = counts.percentages()
     
     return crosstab_pct
 
@@ -85,42 +226,43 @@ def analyze_remote_by_experience(df: pd.DataFrame) -> pd.DataFrame:
 
 # HÀM 3: CROSSTAB REMOTEWORK THEO DEVTYPE
 
-def analyze_remote_by_devtype(df: pd.DataFrame, top_n: int = 10) -> pd.DataFrame:
+def analyze_remote_by_devtype(df: pd.DataFrame, top_n: int = 10, cache: ExplodeCache = None,
+                              cube: SurveyCube = None, db: SQLBackend = None) -> pd.DataFrame:
     """
     Phân tích tỉ lệ RemoteWork theo từng loại developer (DevType).
     
     Lưu ý: DevType là cột multi-select (một người có thể chọn nhiều role),
-    nên cần explode trước khi phân tích.
+    nên được mã hoá multi-hot trước khi phân tích.
     
     Tham số:
         df: DataFrame chứa cột 'RemoteWork' và 'DevType'
         top_n: Số lượng DevType phổ biến nhất để phân tích (mặc định 10)
+        cache: ExplodeCache dùng chung trong một lần chạy (tuỳ chọn)
+        cube: SurveyCube đã build từ df (tuỳ chọn). Nếu có thì tính từ cube.
+        db: SQLBackend (tuỳ chọn). Nếu có thì tính bằng SQL trong database, bỏ qua df.
     
     Trả về:
         DataFrame crosstab với tỉ lệ % theo hàng
     """
-    # Tạo bản copy và explode cột DevType
-    df_exploded = df.copy()
-    df_exploded['DevType'] = df_exploded['DevType'].str.split(';')
-    df_exploded = df_exploded.explode('DevType')
-    df_exploded['DevType'] = df_exploded['DevType'].str.strip()
-    
-    # Lọc chỉ top N DevType phổ biến nhất
-    top_devtypes = df_exploded['DevType'].value_counts().head(top_n).index
-    df_filtered = df_exploded[df_exploded['DevType'].isin(top_devtypes)]
-    
-    # Tạo crosstab với tỉ lệ %
-    crosstab_pct = pd.crosstab(
-        df_filtered['DevType'], 
-        df_filtered['RemoteWork'],
-        normalize='index'
-    ) * 100
-    
-    crosstab_pct = crosstab_pct.round(2)
+    if cube is not None:
+        # Top N DevType (đếm trên cuboid DevType), crosstab sắp xếp theo tên như pd.crosstab
+        top_devtypes = cube.counts('DevType').sort_values(ascending=False, kind='stable').head(top_n).index
+        counts = cube.crosstab('DevType', 'RemoteWork', filters={'DevType': list(top_devtypes)})
+        crosstab_pct = row_percentages(counts.sort_index())
+    else:
+        # Mã hoá multi-hot cột DevType (không cần explode)
+        devtypes = _multi_hot(df, 'DevType', cache, db)
+        
+        # Lọc chỉ top N DevType phổ biến nhất
+        top_devtypes = devtypes.counts().head(top_n).index
+        
+        # Đếm cặp (DevType, RemoteWork) bằng bincount, tỉ lệ % theo hàng (sắp xếp theo tên như pd.crosstab)
+        counts = devtypes.crosstab(_column(df, 'RemoteWork', db)).loc[top_devtypes].sort_index()
+        crosstab_pct = row_percentages(counts)
     
     # Sắp xếp theo tỉ lệ Remote giảm dần
     if 'Remote' in crosstab_pct.columns:
-        crosstab_pct = crosstab_pct.sort_values('Remote', ascending=False)
+        crosstab_pct = crosstab_pct.sort_values('Remote', ascending=False, kind='stable')
     
     return crosstab_pct
 
@@ -128,28 +270,25 @@ def analyze_remote_by_devtype(df: pd.DataFrame, top_n: int = 10) -> pd.DataFrame
 
 # HÀM 4: TOP NGÔN NGỮ LẬP TRÌNH PHỔ BIẾN
 
-def analyze_top_languages(df: pd.DataFrame, top_n: int = 15) -> pd.DataFrame:
+def analyze_top_languages(df: pd.DataFrame, top_n: int = 15, cache: ExplodeCache = None,
+                          db: SQLBackend = None) -> pd.DataFrame:
     """
     Thống kê top ngôn ngữ lập trình được sử dụng nhiều nhất.
     
     Tham số:
         df: DataFrame chứa cột 'LanguageHaveWorkedWith'
         top_n: Số lượng ngôn ngữ top (mặc định 15)
+        cache: ExplodeCache dùng chung trong một lần chạy (tuỳ chọn)
+        db: SQLBackend (tuỳ chọn). Nếu có thì tính bằng SQL trong database, bỏ qua df.
     
     Trả về:
         DataFrame với số lượng và tỉ lệ % developer dùng mỗi ngôn ngữ
     """
-    # Explode cột LanguageHaveWorkedWith
-    df_exploded = df.copy()
-    df_exploded['LanguageHaveWorkedWith'] = df_exploded['LanguageHaveWorkedWith'].str.split(';')
-    df_exploded = df_exploded.explode('LanguageHaveWorkedWith')
-    df_exploded['LanguageHaveWorkedWith'] = df_exploded['LanguageHaveWorkedWith'].str.strip()
-    
-    # Đếm số lượng
-    lang_counts = df_exploded['LanguageHaveWorkedWith'].value_counts().head(top_n)
+    # Đếm số developer dùng mỗi ngôn ngữ (bincount trên mã token của mã hoá multi-hot)
+    lang_counts = _multi_hot(df, 'LanguageHaveWorkedWith', cache, db).counts().head(top_n)
     
     # Tính tỉ lệ % (so với tổng số developer)
-    total_developers = len(df)
+    total_developers = _n_rows(df, db)
     lang_pct = (lang_counts / total_developers * 100).round(2)
     
     # Tạo bảng kết quả
@@ -163,20 +302,172 @@ def analyze_top_languages(df: pd.DataFrame, top_n: int = 15) -> pd.DataFrame:
 
 
 
+# HÀM 4b: CHÊNH LỆCH LƯƠNG THEO NGÔN NGỮ (DÙNG / KHÔNG DÙNG)
+
+UPLIFT_COLUMNS = ['Language', 'ExperienceLevel', 'Users', 'Median_Users', 'NonUsers', 'Median_NonUsers',
+                  'Uplift', 'Uplift_Pct']
+
+
+def _uplift_table(vocabulary: list, levels: list, popular: pd.Index, users: np.ndarray, median_users: np.ndarray,
+                  non_users: np.ndarray, median_non_users: np.ndarray) -> pd.DataFrame:
+    """
+    Bảng kết quả của analyze_language_salary_uplift từ các mảng theo ô
+    (ngôn ngữ, nhóm), ô thứ i = ngôn ngữ i // số nhóm, nhóm i % số nhóm.
+    """
+    n_levels = len(levels)
+    
+    with np.errstate(invalid='ignore', divide='ignore'):
+        uplift = median_users - median_non_users
+        result = pd.DataFrame({
+            'Language': np.repeat(np.asarray(vocabulary, dtype=object), n_levels),
+            'ExperienceLevel': pd.Categorical.from_codes(np.tile(np.arange(n_levels), len(vocabulary)),
+                                                         categories=levels),
+            'Users': users,
+            'Median_Users': median_users,
+            'NonUsers': non_users,
+            'Median_NonUsers': median_non_users,
+            'Uplift': uplift,
+            'Uplift_Pct': uplift / median_non_users * 100
+        }, columns=UPLIFT_COLUMNS)
+    
+    # Ngôn ngữ theo thứ tự phổ biến (giống analyze_top_languages), bỏ ô không có người dùng
+    popularity = {token: rank for rank, token in enumerate(popular)}
+    result['_order'] = result['Language'].map(popularity)
+    result = result[result['Users'] > 0].sort_values(['_order', 'ExperienceLevel'], kind='stable')
+    
+    return result.drop(columns='_order').round(2).reset_index(drop=True)
+
+
+def _language_salary_uplift_sql(db: SQLBackend) -> pd.DataFrame:
+    """
+    analyze_language_salary_uplift trên database: số người và median lương
+    của người dùng / không dùng mỗi ngôn ngữ theo nhóm được tính bằng
+    window function trong SQL.
+    """
+    tokens = db.tokens('LanguageHaveWorkedWith')
+    levels = db.labels('ExperienceLevel')
+    medians = db.token_salary_medians('LanguageHaveWorkedWith', 'ExperienceLevel')
+    
+    cells = (medians['token_id'].to_numpy(dtype=np.int64) * len(levels)
+             + pd.Index(levels).get_indexer(medians['ExperienceLevel']))
+    uses = medians['uses'].to_numpy()
+    
+    size = tokens.n_tokens * len(levels)
+    counts = {flag: np.zeros(size, dtype=np.int64) for flag in (True, False)}
+    values = {flag: np.full(size, np.nan) for flag in (True, False)}
+    for flag in (True, False):
+        counts[flag][cells[uses == flag]] = medians['n'].to_numpy(dtype=np.int64)[uses == flag]
+        values[flag][cells[uses == flag]] = medians['median'].to_numpy(dtype=float)[uses == flag]
+    
+    if counts[True].sum() == 0:
+        return pd.DataFrame(columns=UPLIFT_COLUMNS)
+    
+    return _uplift_table(tokens.vocabulary, levels, tokens.counts().index,
+                         counts[True], values[True], counts[False], values[False])
+
+
+def analyze_language_salary_uplift(df: pd.DataFrame, cache: ExplodeCache = None,
+                                   db: SQLBackend = None) -> pd.DataFrame:
+    """
+    Median lương (CompTotal) của người dùng và không dùng từng ngôn ngữ
+    trong 'LanguageHaveWorkedWith', theo từng nhóm kinh nghiệm.
+    
+    Tính cho mọi ngôn ngữ cùng lúc từ ma trận chỉ báo respondent x ngôn ngữ:
+    respondent được sắp xếp một lần theo (ExperienceLevel, CompTotal), nên
+    người dùng một ngôn ngữ trong một nhóm là một đoạn vị trí tăng dần, median
+    là phần tử giữa đoạn; median người không dùng là phần tử giữa của phần bù,
+    tìm bằng searchsorted trên số người không dùng đứng trước mỗi người dùng.
+    
+    Tham số:
+        df: DataFrame chứa cột 'LanguageHaveWorkedWith', 'ExperienceLevel' và 'CompTotal'
+        cache: ExplodeCache dùng chung trong một lần chạy (tuỳ chọn)
+        db: SQLBackend (tuỳ chọn). Nếu có thì tính bằng SQL trong database, bỏ qua df.
+    
+    Trả về:
+        DataFrame: Language, ExperienceLevel, Users, Median_Users, NonUsers,
+        Median_NonUsers, Uplift (chênh lệch median), Uplift_Pct (% so với
+        người không dùng). Chỉ tính respondent có lương; ngôn ngữ theo thứ tự
+        phổ biến giảm dần, nhóm kinh nghiệm theo thứ tự nhóm.
+    """
+    required_cols = ['LanguageHaveWorkedWith', 'ExperienceLevel', 'CompTotal']
+    for col in required_cols:
+        if col not in _columns(df, db):
+            print(f"Warning: Cột '{col}' không tồn tại trong dữ liệu")
+            return pd.DataFrame()
+    
+    if db is not None:
+        return _language_salary_uplift_sql(db)
+    
+    encoding = _multi_hot(df, 'LanguageHaveWorkedWith', cache)
+    level_codes, levels = dimension_codes(df['ExperienceLevel'])
+    salary = df['CompTotal'].to_numpy(dtype=float, na_value=np.nan)
+    n_tokens, n_levels = encoding.n_tokens, len(levels)
+    
+    # Sắp xếp một lần theo (ExperienceLevel, CompTotal), bỏ dòng thiếu lương / nhóm
+    valid = np.flatnonzero((level_codes >= 0) & ~np.isnan(salary))
+    order = valid[np.lexsort((salary[valid], level_codes[valid]))]
+    sorted_salary, sorted_levels = salary[order], level_codes[order]
+    level_sizes = np.bincount(sorted_levels, minlength=n_levels)
+    level_starts = np.concatenate([[0], np.cumsum(level_sizes)[:-1]])
+    
+    # Ma trận chỉ báo theo thứ tự đã sắp xếp, dạng CSC: các phần tử khác 0 xếp
+    # theo (ngôn ngữ, vị trí), tức theo (ngôn ngữ, nhóm, lương)
+    indicator = encoding.matrix[order].tocsc()
+    indicator.sort_indices()
+    positions = indicator.indices
+    token_ids = np.repeat(np.arange(n_tokens), np.diff(indicator.indptr))
+    nz_levels = sorted_levels[positions]
+    
+    if len(positions) == 0:
+        return pd.DataFrame(columns=UPLIFT_COLUMNS)
+    
+    # Mỗi ô (ngôn ngữ, nhóm) là một đoạn liên tiếp
+    cells = token_ids * n_levels + nz_levels
+    users = np.bincount(cells, minlength=n_tokens * n_levels)
+    cell_starts = np.concatenate([[0], np.cumsum(users)[:-1]])
+    cell_levels = np.tile(np.arange(n_levels), n_tokens)
+    non_users = level_sizes[cell_levels] - users
+    
+    # Số người không dùng đứng trước mỗi người dùng trong nhóm (không giảm trong ô)
+    rank = np.arange(len(positions)) - cell_starts[cells]
+    before = positions - level_starts[nz_levels] - rank
+    stride = len(order) + 1
+    keys = cells * stride + before
+    
+    def user_salary(k):
+        # Lương của người dùng thứ k (theo thứ tự lương) trong mỗi ô
+        return sorted_salary[positions[np.minimum(cell_starts + k, len(positions) - 1)]]
+    
+    def non_user_salary(k):
+        # Người không dùng thứ k nằm ở vị trí k + số người dùng có before <= k
+        n_before = np.searchsorted(keys, np.arange(len(users)) * stride + k, side='right') - cell_starts
+        return sorted_salary[np.minimum(level_starts[cell_levels] + k + n_before, len(order) - 1)]
+    
+    with np.errstate(invalid='ignore', divide='ignore'):
+        median_users = np.where(users > 0, (user_salary((users - 1) // 2) + user_salary(users // 2)) / 2, np.nan)
+        median_non_users = np.where(non_users > 0, (non_user_salary((non_users - 1) // 2)
+                                                    + non_user_salary(non_users // 2)) / 2, np.nan)
+    
+    return _uplift_table(encoding.vocabulary, levels, encoding.counts().index,
+                         users, median_users, non_users, median_non_users)
+
+
+
 # HÀM 5: THỐNG KÊ AI USAGE
 
-def analyze_ai_usage(df: pd.DataFrame) -> pd.DataFrame:
+def analyze_ai_usage(df: pd.DataFrame, db: SQLBackend = None) -> pd.DataFrame:
     """
     Thống kê tỉ lệ developer sử dụng AI.
     
     Tham số:
         df: DataFrame chứa cột 'AISelect'
+        db: SQLBackend (tuỳ chọn). Nếu có thì tính bằng SQL trong database, bỏ qua df.
     
     Trả về:
         DataFrame với số lượng và tỉ lệ % của mỗi nhóm AI usage
     """
-    counts = df['AISelect'].value_counts()
-    percentages = df['AISelect'].value_counts(normalize=True) * 100
+    counts = _count_codes(df, ['AISelect'], db).value_counts()
+    percentages = counts / counts.sum() * 100
     
     result = pd.DataFrame({
         'AIUsage': counts.index,
@@ -190,28 +481,33 @@ def analyze_ai_usage(df: pd.DataFrame) -> pd.DataFrame:
 
 # HÀM 6: THỐNG KÊ LƯƠNG THEO NHÓM KINH NGHIỆM
 
-def analyze_compensation_by_experience(df: pd.DataFrame) -> pd.DataFrame:
+def analyze_compensation_by_experience(df: pd.DataFrame, cube: SurveyCube = None,
+                                       db: SQLBackend = None) -> pd.DataFrame:
     """
     Thống kê lương (CompTotal) theo từng nhóm kinh nghiệm.
     
     Tham số:
         df: DataFrame chứa cột 'CompTotal' và 'ExperienceLevel'
+        cube: SurveyCube đã build từ df (tuỳ chọn). Nếu có và cube.exact thì tính từ
+            cube (cube dạng sketch cho median xấp xỉ nên không dùng).
+        db: SQLBackend (tuỳ chọn). Nếu có thì tính bằng SQL trong database, bỏ qua df.
     
     Trả về:
         DataFrame với các thống kê lương (mean, median, min, max) theo nhóm
     """
-    # Nhóm theo ExperienceLevel và tính các thống kê
-    stats = df.groupby('ExperienceLevel')['CompTotal'].agg([
-        ('Count', 'count'),
-        ('Mean', 'mean'),
-        ('Median', 'median'),
-        ('Min', 'min'),
-        ('Max', 'max'),
-        ('Std', 'std')
-    ]).round(2)
+    if cube is not None and cube.exact:
+        stats = cube.aggregate(['ExperienceLevel'], quantiles=[0.5])
+        stats = stats.drop(columns='Count').rename(columns={
+            'CompCount': 'Count', 'CompMean': 'Mean', 'CompQ50': 'Median',
+            'CompMin': 'Min', 'CompMax': 'Max', 'CompStd': 'Std'
+        })
+        return stats[['ExperienceLevel', 'Count', 'Mean', 'Median', 'Min', 'Max', 'Std']].round(2)
     
-    # Reset index để ExperienceLevel thành cột
-    stats = stats.reset_index()
+    if db is not None:
+        return db.salary_summary(['ExperienceLevel']).round(2)
+    
+    # Sắp xếp lương một lần theo ExperienceLevel, tính mọi thống kê từ các đoạn đã sắp xếp
+    stats = SalaryIndex.build(df, ['ExperienceLevel']).summary().round(2)
     
     return stats
 
@@ -219,85 +515,152 @@ def analyze_compensation_by_experience(df: pd.DataFrame) -> pd.DataFrame:
 
 # HÀM 7: THỐNG KÊ LƯƠNG THEO KINH NGHIỆM VÀ DEVTYPE
 
-def analyze_compensation_by_experience_and_devtype(df: pd.DataFrame, top_n_devtypes: int = 10) -> pd.DataFrame:
+# Tên ngắn gọn của các DevType trong bảng lương
+DEVTYPE_SHORT_NAMES = {
+    "Developer, back-end": "Backend",
+    "Developer, front-end": "Frontend",
+    "Developer, mobile": "Mobile",
+    "Developer, full-stack": "Full-stack",
+    "Data engineer": "Data Engineer",
+    "Engineering manager": "Engineering Manager",
+    "DevOps specialist": "DevOps",
+    "Developer, desktop or enterprise applications": "Desktop/Enterprise",
+    "Developer, embedded applications or devices": "Embedded",
+    "Other (please specify):": "Other"
+}
+
+
+def analyze_compensation_by_experience_and_devtype(df: pd.DataFrame, top_n_devtypes: int = 10,
+                                                   cache: ExplodeCache = None,
+                                                   cube: SurveyCube = None, n_boot: int = 1000,
+                                                   confidence: float = 0.95, seed: int = 0,
+                                                   db: SQLBackend = None) -> pd.DataFrame:
     """
     Thống kê lương (CompTotal) theo từng nhóm kinh nghiệm VÀ loại Developer.
     
     Tham số:
         df: DataFrame chứa cột 'CompTotal', 'ExperienceLevel' và 'DevType'
         top_n_devtypes: Số lượng DevType phổ biến nhất để phân tích (mặc định 10)
+        cache: ExplodeCache dùng chung trong một lần chạy (tuỳ chọn)
+        cube: SurveyCube đã build từ df (tuỳ chọn). Nếu có và cube.exact thì tính từ
+            cube (cube dạng sketch cho median xấp xỉ nên không dùng).
+        n_boot: Số mẫu bootstrap cho khoảng tin cậy của median (0 = không tính)
+        confidence: Mức tin cậy của khoảng (mặc định 0.95)
+        seed: Seed của bootstrap
+        db: SQLBackend (tuỳ chọn). Nếu có thì tính bằng SQL trong database, bỏ qua df.
     
     Trả về:
-        DataFrame với các thống kê lương (count, median) theo nhóm kinh nghiệm và DevType
+        DataFrame với các thống kê lương (count, median) theo nhóm kinh nghiệm và DevType,
+        kèm Median_CI_Low / Median_CI_High nếu n_boot > 0
     """
     # Kiểm tra cột cần thiết
     required_cols = ['CompTotal', 'ExperienceLevel', 'DevType']
     for col in required_cols:
-        if col not in df.columns:
+        if col not in _columns(df, db):
             print(f"Warning: Cột '{col}' không tồn tại trong dữ liệu")
             return pd.DataFrame()
     
-    # Explode DevType (vì 1 người có thể làm nhiều role)
-    df_exploded = df.copy()
-    df_exploded['DevType'] = df_exploded['DevType'].str.split(';')
-    df_exploded = df_exploded.explode('DevType')
-    df_exploded['DevType'] = df_exploded['DevType'].str.strip()
-    
-    # Loại bỏ giá trị rỗng
-    df_exploded = df_exploded[df_exploded['DevType'].notna() & (df_exploded['DevType'] != '')]
-    
-    # Lọc top N DevType phổ biến
-    top_devtypes = df_exploded['DevType'].value_counts().head(top_n_devtypes).index
-    df_filtered = df_exploded[df_exploded['DevType'].isin(top_devtypes)].copy()
-    
-    # Rename DevType cho ngắn gọn
-    rename_map = {
-        "Developer, back-end": "Backend",
-        "Developer, front-end": "Frontend",
-        "Developer, mobile": "Mobile",
-        "Developer, full-stack": "Full-stack",
-        "Data engineer": "Data Engineer",
-        "Engineering manager": "Engineering Manager",
-        "DevOps specialist": "DevOps",
-        "Developer, desktop or enterprise applications": "Desktop/Enterprise",
-        "Developer, embedded applications or devices": "Embedded",
-        "Other (please specify):": "Other"
-    }
-    df_filtered['DevType'] = df_filtered['DevType'].replace(rename_map)
-    
-    # Group theo cả ExperienceLevel và DevType
-    stats = df_filtered.groupby(['DevType', 'ExperienceLevel'])['CompTotal'].agg([
-        ('Count', 'count'),
-        ('Mean', 'mean'),
-        ('Median', 'median')
-    ]).round(2)
-    
-    stats = stats.reset_index()
+    columns = ['DevType', 'ExperienceLevel', 'Count', 'Mean', 'Median']
     
-    return stats
+    if cube is not None and cube.exact:
+        top_devtypes = cube.counts('DevType').sort_values(ascending=False, kind='stable').head(top_n_devtypes).index
+        filters = {'DevType': list(top_devtypes)}
+        stats = cube.aggregate(['DevType', 'ExperienceLevel'], filters=filters, quantiles=[0.5])
+        stats = stats[stats['CompCount'] > 0]
+        
+        # Sắp xếp như groupby: DevType theo tên ngắn gọn, ExperienceLevel theo thứ tự nhóm
+        stats['DevType'] = stats['DevType'].astype(object).replace(DEVTYPE_SHORT_NAMES)
+        stats = stats.sort_values(['DevType', 'ExperienceLevel'], kind='stable')
+        stats = stats.drop(columns='Count').rename(columns={'CompCount': 'Count', 'CompMean': 'Mean',
+                                                            'CompQ50': 'Median'})
+        
+        if n_boot:
+            values = cube.salary_values(['DevType', 'ExperienceLevel'], filters=filters)
+            segments = [values[i] for i in stats.index]
+        stats = stats[columns].reset_index(drop=True)
+    elif db is not None:
+        # Thống kê theo (token DevType, ExperienceLevel) bằng GROUP BY trên bảng token
+        top_devtypes = db.tokens('DevType').counts().head(top_n_devtypes).index
+        stats = db.salary_summary(['DevType', 'ExperienceLevel'], token_col='DevType', tokens=list(top_devtypes))
+        
+        # Sắp xếp như groupby theo tên ngắn gọn (giữ thứ tự nhóm kinh nghiệm)
+        keys = stats[['DevType', 'ExperienceLevel']].to_numpy()
+        stats['DevType'] = stats['DevType'].replace(DEVTYPE_SHORT_NAMES)
+        stats = stats.sort_values('DevType', kind='stable')
+        
+        if n_boot:
+            segments = [db.salary_values({'DevType': devtype, 'ExperienceLevel': level}, token_col='DevType')
+                        for devtype, level in keys[stats.index]]
+        stats = stats[columns].reset_index(drop=True)
+    else:
+        # Explode DevType (vì 1 người có thể làm nhiều role), giá trị rỗng đã được loại bỏ
+        df_exploded = _explode(df, 'DevType', cache)
+        
+        # Lọc top N DevType phổ biến
+        top_devtypes = df_exploded['DevType'].value_counts().head(top_n_devtypes).index
+        df_filtered = df_exploded[df_exploded['DevType'].isin(top_devtypes)].copy()
+        
+        # Rename DevType cho ngắn gọn
+        df_filtered['DevType'] = df_filtered['DevType'].replace(DEVTYPE_SHORT_NAMES)
+        
+        # Nhóm theo cả DevType và ExperienceLevel (lương sắp xếp một lần trong từng nhóm)
+        index = SalaryIndex.build(df_filtered, ['DevType', 'ExperienceLevel'])
+        stats = index.summary()[columns]
+        segments = index.segments() if n_boot else None
+    
+    # Khoảng tin cậy bootstrap của median (theo thứ tự dòng cuối cùng, nên
+    # hai nhánh cho cùng kết quả)
+    if n_boot:
+        stats['Median_CI_Low'], stats['Median_CI_High'] = bootstrap_median_ci(
+            segments, n_boot=n_boot, confidence=confidence, seed=seed)
+    
+    return stats.round(2)
+
+
+# HÀM 7b: PERCENTILE LƯƠNG THEO NHÓM (CHO ROADMAP)
+
+def analyze_compensation_percentiles(df: pd.DataFrame, by: list = None, percentiles: list = None,
+                                     db: SQLBackend = None) -> pd.DataFrame:
+    """
+    Bảng percentile lương (mặc định P10, P25, P50, P75, P90) theo nhóm.
+    
+    Tham số:
+        df: DataFrame chứa cột 'CompTotal' và các cột nhóm
+        by: List cột nhóm (mặc định ['ExperienceLevel'])
+        percentiles: List mức percentile 0-100 (mặc định salary_index.DEFAULT_PERCENTILES)
+        db: SQLBackend (tuỳ chọn). Nếu có thì tính bằng SQL trong database, bỏ qua df.
+    
+    Trả về:
+        DataFrame: các cột nhóm, Count và một cột P<mức> cho mỗi percentile
+    """
+    by = ['ExperienceLevel'] if by is None else by
+    
+    if db is not None:
+        return db.salary_percentiles(by, DEFAULT_PERCENTILES if percentiles is None else percentiles).round(2)
+    
+    return SalaryIndex.build(df, by).percentile_table(percentiles).round(2)
 
 
 
 # HÀM 8: THỐNG KÊ AI USAGE THEO KINH NGHIỆM
 
-def analyze_ai_by_experience(df: pd.DataFrame) -> pd.DataFrame:
+def analyze_ai_by_experience(df: pd.DataFrame, cube: SurveyCube = None, db: SQLBackend = None) -> pd.DataFrame:
     """
     Phân tích tỉ lệ sử dụng AI theo từng nhóm kinh nghiệm.
     Giúp trả lời: "Developer junior hay senior dùng AI nhiều hơn?"
     
     Tham số:
         df: DataFrame chứa cột 'AISelect' và 'ExperienceLevel'
+        cube: SurveyCube đã build từ df (tuỳ chọn). Nếu có thì tính từ cube.
+        db: SQLBackend (tuỳ chọn). Nếu có thì tính bằng SQL trong database, bỏ qua df.
     
     Trả về:
         DataFrame crosstab với tỉ lệ % theo hàng
     """
-    crosstab_pct = pd.crosstab(
-        df['ExperienceLevel'], 
-        df['AISelect'],
-        normalize='index'
-    ) * 100
+    if cube is not None:
+        return row_percentages(cube.crosstab('ExperienceLevel', 'AISelect'))
     
-    crosstab_pct = crosstab_pct.round(2)
+    crosstab_pct = _count_codes(df, ['ExperienceLevel', 'AISelect'], db).percentages()
     
     return crosstab_pct
 
@@ -305,7 +668,8 @@ def analyze_ai_by_experience(df: pd.DataFrame) -> pd.DataFrame:
 
 # HÀM 9: TOP FRUSTRATIONS (THÁCH THỨC/KHÓ KHĂN)
 
-def analyze_top_frustrations(df: pd.DataFrame, top_n: int = 10) -> pd.DataFrame:
+def analyze_top_frustrations(df: pd.DataFrame, top_n: int = 10, cache: ExplodeCache = None,
+                            db: SQLBackend = None) -> pd.DataFrame:
     """
     Thống kê top các frustration (khó khăn/thách thức) của developer.
     
@@ -315,29 +679,22 @@ def analyze_top_frustrations(df: pd.DataFrame, top_n: int = 10) -> pd.DataFrame:
     Tham số:
         df: DataFrame chứa cột 'Frustration'
         top_n: Số lượng frustration top (mặc định 10)
+        cache: ExplodeCache dùng chung trong một lần chạy (tuỳ chọn)
+        db: SQLBackend (tuỳ chọn). Nếu có thì tính bằng SQL trong database, bỏ qua df.
     
     Trả về:
         DataFrame với số lượng và tỉ lệ % developer gặp mỗi frustration
     """
     # Kiểm tra cột Frustration tồn tại
-    if 'Frustration' not in df.columns:
+    if 'Frustration' not in _columns(df, db):
         print("Warning: Cột 'Frustration' không tồn tại trong dữ liệu")
         return pd.DataFrame()
     
-    # Explode cột Frustration
-    df_exploded = df.copy()
-    df_exploded['Frustration'] = df_exploded['Frustration'].str.split(';')
-    df_exploded = df_exploded.explode('Frustration')
-    df_exploded['Frustration'] = df_exploded['Frustration'].str.strip()
-    
-    # Loại bỏ giá trị rỗng
-    df_exploded = df_exploded[df_exploded['Frustration'].notna() & (df_exploded['Frustration'] != '')]
-    
-    # Đếm số lượng
-    frust_counts = df_exploded['Frustration'].value_counts().head(top_n)
+    # Đếm số lượng (bincount trên mã token, giá trị rỗng không được mã hoá)
+    frust_counts = _multi_hot(df, 'Frustration', cache, db).counts().head(top_n)
     
     # Tính tỉ lệ % (so với tổng số developer)
-    total_developers = len(df)
+    total_developers = _n_rows(df, db)
     frust_pct = (frust_counts / total_developers * 100).round(2)
     
     # Tạo bảng kết quả
@@ -353,7 +710,8 @@ def analyze_top_frustrations(df: pd.DataFrame, top_n: int = 10) -> pd.DataFrame:
 
 # HÀM 9: TOP DEVTYPE
 
-def analyze_top_devtypes(df: pd.DataFrame, top_n: int = 15) -> pd.DataFrame:
+def analyze_top_devtypes(df: pd.DataFrame, top_n: int = 15, cache: ExplodeCache = None,
+                           db: SQLBackend = None) -> pd.DataFrame:
     """
     Thống kê top các loại developer (DevType) phổ biến nhất.
     
@@ -363,29 +721,22 @@ def analyze_top_devtypes(df: pd.DataFrame, top_n: int = 15) -> pd.DataFrame:
     Tham số:
         df: DataFrame chứa cột 'DevType'
         top_n: Số lượng DevType top (mặc định 15)
+        cache: ExplodeCache dùng chung trong một lần chạy (tuỳ chọn)
+        db: SQLBackend (tuỳ chọn). Nếu có thì tính bằng SQL trong database, bỏ qua df.
     
     Trả về:
         DataFrame với số lượng và tỉ lệ % developer thuộc mỗi DevType
     """
     # Kiểm tra cột DevType tồn tại
-    if 'DevType' not in df.columns:
+    if 'DevType' not in _columns(df, db):
         print("Warning: Cột 'DevType' không tồn tại trong dữ liệu")
         return pd.DataFrame()
     
-    # Explode cột DevType
-    df_exploded = df.copy()
-    df_exploded['DevType'] = df_exploded['DevType'].str.split(';')
-    df_exploded = df_exploded.explode('DevType')
-    df_exploded['DevType'] = df_exploded['DevType'].str.strip()
-    
-    # Loại bỏ giá trị rỗng
-    df_exploded = df_exploded[df_exploded['DevType'].notna() & (df_exploded['DevType'] != '')]
-    
-    # Đếm số lượng
-    devtype_counts = df_exploded['DevType'].value_counts().head(top_n)
+    # Đếm số lượng (bincount trên mã token, giá trị rỗng không được mã hoá)
+    devtype_counts = _multi_hot(df, 'DevType', cache, db).counts().head(top_n)
     
     # Tính tỉ lệ % (so với tổng số developer)
-    total_developers = len(df)
+    total_developers = _n_rows(df, db)
     devtype_pct = (devtype_counts / total_developers * 100).round(2)
     
     # Tạo bảng kết quả
@@ -400,142 +751,629 @@ def analyze_top_devtypes(df: pd.DataFrame, top_n: int = 15) -> pd.DataFrame:
 
 
 # HÀM 10: TOP LANGUAGES THEO DEVTYPE
-def analyze_languages_by_devtype(df: pd.DataFrame, top_n_devtypes: int = 10, top_n_languages: int = 5) -> pd.DataFrame:
+def analyze_languages_by_devtype(df: pd.DataFrame, top_n_devtypes: int = 10, top_n_languages: int = 5,
+                                 cache: ExplodeCache = None, db: SQLBackend = None) -> pd.DataFrame:
     """
     Phân tích top ngôn ngữ lập trình phổ biến cho từng loại Developer.
+    Tính bằng analyze_cooccurrence (DevType x LanguageHaveWorkedWith).
     
     Tham số:
         df: DataFrame chứa cột 'DevType' và 'LanguageHaveWorkedWith'
         top_n_devtypes: Số lượng DevType phổ biến nhất để phân tích (mặc định 10)
         top_n_languages: Số lượng ngôn ngữ top cho mỗi DevType (mặc định 5)
+        cache: ExplodeCache dùng chung trong một lần chạy (tuỳ chọn)
+        db: SQLBackend (tuỳ chọn). Nếu có thì tính bằng SQL trong database, bỏ qua df.
     
     Trả về:
         DataFrame với các cột: DevType, Language, Count, Percentage, Rank
     """
     # Kiểm tra cột tồn tại
-    if 'DevType' not in df.columns or 'LanguageHaveWorkedWith' not in df.columns:
+    if 'DevType' not in _columns(df, db) or 'LanguageHaveWorkedWith' not in _columns(df, db):
         print("Warning: Thiếu cột 'DevType' hoặc 'LanguageHaveWorkedWith'")
         return pd.DataFrame()
     
-    # Bước 1: Explode cả DevType và Language
-    df_work = df[['DevType', 'LanguageHaveWorkedWith']].copy()
-    df_work = df_work.dropna()
+    result_df = analyze_cooccurrence(
+        df, 'DevType', 'LanguageHaveWorkedWith',
+        top_n_rows=top_n_devtypes, top_n_cols=top_n_languages, cache=cache, db=db
+    )
+    
+    return result_df.rename(columns={'LanguageHaveWorkedWith': 'Language'})
+
+
+
+# HÀM 11: CO-OCCURRENCE GIỮA HAI CỘT MULTI-SELECT
+def analyze_cooccurrence(df: pd.DataFrame, row_col: str, col_col: str, top_n_rows: int = 10,
+                         top_n_cols: int = 5, cache: ExplodeCache = None, db: SQLBackend = None) -> pd.DataFrame:
+    """
+    Top giá trị của cột col_col cho từng giá trị phổ biến của cột row_col,
+    với hai cột multi-select bất kỳ (VD: DevType x LanguageHaveWorkedWith,
+    DevType x Frustration).
+    
+    Toàn bộ ma trận đếm row_col x col_col được tính bằng một phép nhân ma trận
+    thưa trên mã hoá multi-hot (ô (a, b) = số developer chọn cả a và b),
+    sau đó chọn top-k theo từng hàng bằng argsort, không explode hai lần và
+    không lặp qua từng giá trị.
     
-    # Explode DevType
-    df_work['DevType'] = df_work['DevType'].str.split(';')
-    df_work = df_work.explode('DevType')
-    df_work['DevType'] = df_work['DevType'].str.strip()
+    Cách tính giống explode cả hai cột rồi value_counts:
+    - Mức phổ biến của một giá trị row_col = tổng số cặp (row, col) của nó
+    - Percentage = số cặp (row, col) / tổng số cặp của row * 100
     
-    # Explode Language
-    df_work['LanguageHaveWorkedWith'] = df_work['LanguageHaveWorkedWith'].str.split(';')
-    df_work = df_work.explode('LanguageHaveWorkedWith')
-    df_work['LanguageHaveWorkedWith'] = df_work['LanguageHaveWorkedWith'].str.strip()
+    Tham số:
+        df: DataFrame chứa hai cột multi-select
+        row_col: Cột dùng làm hàng (VD: 'DevType')
+        col_col: Cột dùng để xếp hạng trong mỗi hàng (VD: 'LanguageHaveWorkedWith')
+        top_n_rows: Số giá trị row_col phổ biến nhất (mặc định 10)
+        top_n_cols: Số giá trị col_col top cho mỗi hàng (mặc định 5)
+        cache: ExplodeCache dùng chung trong một lần chạy (tuỳ chọn)
+        db: SQLBackend (tuỳ chọn). Nếu có thì đếm bằng JOIN hai bảng token, bỏ qua df.
+    
+    Trả về:
+        DataFrame với các cột: row_col, col_col, Count, Percentage, Rank
+    """
+    # Ma trận đồng xuất hiện (dòng thiếu một trong hai cột không đóng góp gì)
+    counts = _multi_hot(df, row_col, cache, db).cooccurrence(_multi_hot(df, col_col, cache, db))
     
-    # Loại bỏ giá trị rỗng
-    df_work = df_work[
-        (df_work['DevType'].notna()) & (df_work['DevType'] != '') &
-        (df_work['LanguageHaveWorkedWith'].notna()) & (df_work['LanguageHaveWorkedWith'] != '')
-    ]
+    return top_k_cooccurrence(counts, top_n_rows, top_n_cols)
+
+
+def top_k_cooccurrence(counts: pd.DataFrame, top_n_rows: int = 10, top_n_cols: int = 5) -> pd.DataFrame:
+    """
+    Chọn top-k từ ma trận đếm đồng xuất hiện (xem analyze_cooccurrence).
     
-    # Bước 2: Lấy top N DevType phổ biến nhất
-    top_devtypes = df_work['DevType'].value_counts().head(top_n_devtypes).index.tolist()
-    df_work = df_work[df_work['DevType'].isin(top_devtypes)]
+    Tham số:
+        counts: DataFrame đếm, index/columns có tên là tên hai cột. Khi số
+            đếm bằng nhau, hàng/cột đứng trước được ưu tiên.
+        top_n_rows: Số hàng có tổng số cặp lớn nhất
+        top_n_cols: Số cột top cho mỗi hàng
     
-    # Bước 3: Với mỗi DevType, đếm số lần xuất hiện của mỗi Language
-    results = []
+    Trả về:
+        DataFrame với các cột: tên hàng, tên cột, Count, Percentage, Rank
+    """
+    row_col, col_col = counts.index.name, counts.columns.name
+    columns = [row_col, col_col, 'Count', 'Percentage', 'Rank']
+    matrix = counts.to_numpy()
+    
+    # Bước 1: Top N hàng theo tổng số cặp (sắp xếp ổn định, giữ thứ tự xuất hiện khi bằng nhau)
+    totals = matrix.sum(axis=1)
+    top_rows = np.argsort(-totals, kind='stable')[:top_n_rows]
+    top_rows = top_rows[totals[top_rows] > 0]
+    
+    if len(top_rows) == 0:
+        return pd.DataFrame(columns=columns)
+    
+    # Bước 2: Top-k cột cho mỗi hàng cùng lúc
+    sub = matrix[top_rows]
+    order = np.argsort(-sub, axis=1, kind='stable')[:, :top_n_cols]
+    top_counts = np.take_along_axis(sub, order, axis=1)
+    ranks = np.broadcast_to(np.arange(1, order.shape[1] + 1), order.shape)
+    percentages = top_counts / totals[top_rows][:, None] * 100
+    
+    # Bỏ các ô đếm bằng 0 (value_counts không liệt kê giá trị không xuất hiện)
+    keep = top_counts > 0
+    row_labels = counts.index.to_numpy()[top_rows]
+    col_labels = counts.columns.to_numpy()
+    
+    result_df = pd.DataFrame({
+        row_col: np.repeat(row_labels, keep.sum(axis=1)),
+        col_col: col_labels[order[keep]],
+        'Count': top_counts[keep],
+        'Percentage': percentages[keep].round(2),
+        'Rank': ranks[keep]
+    })
     
-    for devtype in top_devtypes:
-        df_devtype = df_work[df_work['DevType'] == devtype]
-        total_in_devtype = len(df_devtype)
+    return result_df
+
+
+
+# HÀM 12: TỔ HỢP NGÔN NGỮ PHỔ BIẾN THEO DEVTYPE
+def rank_language_sets(devtype: str, itemsets: list, n: int, vocabulary, min_size: int = 2,
+                       top_n_sets: int = 5) -> list:
+    """
+    Các dòng kết quả của analyze_language_sets_by_devtype cho một DevType.
+    
+    Tham số:
+        devtype: Tên DevType
+        itemsets: List (tuple chỉ số ngôn ngữ tăng dần, support) theo thứ tự khai
+            phá (xem itemsets.frequent_itemsets), chứa mọi tập con của mỗi tập
+        n: Số respondent của DevType
+        vocabulary: Mảng tên ngôn ngữ theo chỉ số
+        min_size, top_n_sets: Xem analyze_language_sets_by_devtype
+    
+    Trả về:
+        List dictionary, mỗi phần tử là một dòng (một bộ ngôn ngữ)
+    """
+    supports = dict(itemsets)
+    rows = []
+    
+    # Bộ có support cao nhất, bằng nhau thì giữ thứ tự khai phá
+    candidates = [(items, count) for items, count in itemsets if len(items) >= min_size]
+    candidates.sort(key=lambda pair: -pair[1])
+    
+    # Hiển thị ngôn ngữ theo mức phổ biến trong DevType
+    def names(indices):
+        indices = sorted(indices, key=lambda i: -supports[(i,)])
+        return ' + '.join(vocabulary[indices])
+    
+    for rank, (items, count) in enumerate(candidates[:top_n_sets], start=1):
+        antecedent, consequent, confidence, lift = strongest_rule(items, supports, n)
         
-        # Đếm languages trong DevType này
-        lang_counts = df_devtype['LanguageHaveWorkedWith'].value_counts().head(top_n_languages)
+        rows.append({
+            'DevType': devtype,
+            'Languages': names(items),
+            'Size': len(items),
+            'Count': count,
+            'Support': count / n * 100,
+            'Rule': f'{names(antecedent)} -> {vocabulary[consequent]}',
+            'Confidence': confidence * 100,
+            'Lift': lift,
+            'Rank': rank
+        })
+    
+    return rows
+
+
+def analyze_language_sets_by_devtype(df: pd.DataFrame, top_n_devtypes: int = 10, min_support: float = 0.05,
+                                     min_size: int = 2, max_size: int = 4, top_n_sets: int = 5,
+                                     cache: ExplodeCache = None, db: SQLBackend = None) -> pd.DataFrame:
+    """
+    Các bộ ngôn ngữ (LanguageHaveWorkedWith) hay được dùng cùng nhau nhất
+    trong từng loại Developer, kèm luật kết hợp mạnh nhất của mỗi bộ.
+    
+    Respondent được chia theo DevType; trong mỗi phần, mỗi ngôn ngữ là một
+    bitset và support của một bộ là popcount của AND các bitset (xem itemsets.py).
+    
+    Tham số:
+        df: DataFrame chứa cột 'DevType' và 'LanguageHaveWorkedWith'
+        top_n_devtypes: Số lượng DevType phổ biến nhất để phân tích (mặc định 10)
+        min_support: Tỉ lệ respondent tối thiểu của DevType dùng bộ ngôn ngữ (mặc định 0.05)
+        min_size, max_size: Số ngôn ngữ nhỏ nhất / lớn nhất của một bộ (mặc định 2 - 4)
+        top_n_sets: Số bộ có support cao nhất cho mỗi DevType (mặc định 5)
+        cache: ExplodeCache dùng chung trong một lần chạy (tuỳ chọn)
+        db: SQLBackend (tuỳ chọn). Nếu có thì chỉ đọc hai cột từ database (dựng lại
+            từ số đếm của từng tổ hợp giá trị), phần khai phá giống bản pandas.
+    
+    Trả về:
+        DataFrame với các cột: DevType, Languages (nối bằng ' + '), Size, Count,
+        Support (% respondent của DevType), Rule (X -> y), Confidence (%), Lift, Rank
+    """
+    if 'DevType' not in _columns(df, db) or 'LanguageHaveWorkedWith' not in _columns(df, db):
+        print("Warning: Thiếu cột 'DevType' hoặc 'LanguageHaveWorkedWith'")
+        return pd.DataFrame()
+    
+    if db is not None:
+        df, cache = db.value_rows(['DevType', 'LanguageHaveWorkedWith']), None
+    
+    devtypes = _multi_hot(df, 'DevType', cache)
+    languages = _multi_hot(df, 'LanguageHaveWorkedWith', cache)
+    vocabulary = np.asarray(languages.vocabulary, dtype=object)
+    rows = []
+    
+    for devtype in devtypes.counts().head(top_n_devtypes).index:
+        # Bitset ngôn ngữ trên các respondent của DevType này
+        members = np.flatnonzero(devtypes.token_mask(devtype))
+        bits = pack_columns(languages.matrix[members])
+        n = len(members)
         
-        for rank, (lang, count) in enumerate(lang_counts.items(), 1):
-            percentage = round(count / total_in_devtype * 100, 2)
-            results.append({
-                'DevType': devtype,
-                'Language': lang,
-                'Count': count,
-                'Percentage': percentage,
-                'Rank': rank
-            })
-    
-    result_df = pd.DataFrame(results)
+        itemsets = frequent_itemsets(bits, np.ceil(min_support * n), max_size)
+        rows.extend(rank_language_sets(devtype, itemsets, n, vocabulary, min_size, top_n_sets))
     
-    return result_df
+    columns = ['DevType', 'Languages', 'Size', 'Count', 'Support', 'Rule', 'Confidence', 'Lift', 'Rank']
+    
+    return pd.DataFrame(rows, columns=columns).round(2)
+
+
+
+# DANH SÁCH CÁC BẢNG PHÂN TÍCH
+# Mỗi phần tử: (khoá kết quả, hàm phân tích, tham số, file CSV, ghi index, bỏ qua nếu rỗng,
+#               các đối tượng dùng chung mà hàm nhận: 'cache' = ExplodeCache, 'cube' = SurveyCube,
+#               'db' = SQLBackend)
+ANALYSIS_SPECS = [
+    # 1. RemoteWork Overall
+    ('remote_overall', analyze_remote_work_overall, {}, 'remote_work_overall.csv', False, False, ('db',)),
+    # 2. RemoteWork by Experience
+    ('remote_by_exp', analyze_remote_by_experience, {}, 'remote_by_experience.csv', True, False,
+     ('cube', 'db')),
+    # 3. RemoteWork by DevType
+    ('remote_by_devtype', analyze_remote_by_devtype, {'top_n': 10}, 'remote_by_devtype.csv', True, False,
+     ('cache', 'cube', 'db')),
+    # 4. Top Languages
+    ('top_languages', analyze_top_languages, {'top_n': 15}, 'top_languages.csv', False, False,
+     ('cache', 'db')),
+    # 4b. Language salary uplift by Experience
+    ('language_uplift', analyze_language_salary_uplift, {}, 'language_salary_uplift.csv', False, True,
+     ('cache', 'db')),
+    # 5. AI Usage
+    ('ai_usage', analyze_ai_usage, {}, 'ai_usage.csv', False, False, ('db',)),
+    # 6. Compensation by Experience
+    ('comp_by_exp', analyze_compensation_by_experience, {}, 'compensation_by_experience.csv', False, False,
+     ('cube', 'db')),
+    # 6b. Compensation by Experience AND DevType (chi tiết theo ngành)
+    ('comp_by_exp_devtype', analyze_compensation_by_experience_and_devtype, {'top_n_devtypes': 10},
+     'compensation_by_experience_devtype.csv', False, True, ('cache', 'cube', 'db')),
+    # 6c. Compensation percentiles by Experience (cho Roadmap)
+    ('comp_percentiles', analyze_compensation_percentiles, {}, 'compensation_percentiles.csv', False, False,
+     ('db',)),
+    # 7. AI by Experience
+    ('ai_by_exp', analyze_ai_by_experience, {}, 'ai_by_experience.csv', True, False, ('cube', 'db')),
+    # 8. Top Frustrations
+    ('top_frustrations', analyze_top_frustrations, {'top_n': 10}, 'top_frustrations.csv', False, True,
+     ('cache', 'db')),
+    # 9. Top DevTypes
+    ('top_devtypes', analyze_top_devtypes, {'top_n': 15}, 'top_devtypes.csv', False, True,
+     ('cache', 'db')),
+    # 10. Languages by DevType (cho Roadmap)
+    ('languages_by_devtype', analyze_languages_by_devtype, {'top_n_devtypes': 10, 'top_n_languages': 5},
+     'languages_by_devtype.csv', False, True, ('cache', 'db')),
+    # 10b. Frequent language sets by DevType
+    ('language_sets_by_devtype', analyze_language_sets_by_devtype, {'top_n_devtypes': 10},
+     'language_sets_by_devtype.csv', False, True, ('cache', 'db')),
+]
+
+
+def _with_shared(kwargs: dict, uses: tuple, shared: dict) -> dict:
+    """
+    Thêm các đối tượng dùng chung (khác None) mà hàm phân tích nhận vào tham số.
+    """
+    return {**kwargs, **{name: shared[name] for name in uses if shared.get(name) is not None}}
+
+
+def save_table(table: pd.DataFrame, filename: str, index: bool = False, skip_empty: bool = False) -> str:
+    """
+    Ghi một bảng kết quả ra OUTPUT_DIR.
+
+    Trả về:
+        Đường dẫn file đã ghi (None nếu bảng rỗng và skip_empty=True)
+    """
+    if skip_empty and table.empty:
+        return None
+
+    path = f'{OUTPUT_DIR}/{filename}'
+    table.to_csv(path, index=index)
+
+    return path
+
+
+def _load_input(input_path: str, cache: ExplodeCache, multi_hot_path: str = None) -> pd.DataFrame:
+    """
+    Đọc dữ liệu đã transform và nạp sẵn mã hoá multi-hot (nếu có) vào cache.
+    """
+    # ExperienceLevel giữ kiểu category có thứ tự
+    df = read_table(input_path, categories={'ExperienceLevel': EXPERIENCE_LABELS})
+
+    # File .npz phải được build từ đúng file input_path (so dấu vân tay)
+    if multi_hot_path is not None and os.path.exists(multi_hot_path):
+        cache.put_multi_hot(df, load_multi_hot(multi_hot_path, table_fingerprint(input_path, len(df))))
+
+    return df
 
 
+def _load_cube(cube_path: str, input_path: str, df: pd.DataFrame) -> SurveyCube:
+    """
+    Đọc cube lưu cùng lúc với dữ liệu (None nếu không có), báo lỗi nếu cube
+    không được build từ file input_path.
+    """
+    if cube_path is not None and os.path.exists(cube_path):
+        return load_cube(cube_path, table_fingerprint(input_path, len(df)))
+
+    return None
+
+
+def select_respondents(df: pd.DataFrame, index: BitmapIndex, filters: dict = None,
+                       all_of: dict = None) -> pd.DataFrame:
+    """
+    Các respondent thoả bộ lọc, tìm bằng chỉ mục bitmap (xem BitmapIndex.select).
+    
+    Tham số:
+        df: DataFrame đã transform (cùng thứ tự dòng với index)
+        index: BitmapIndex build từ df
+        filters: Dictionary {cột: giá trị hoặc list giá trị} (OR trong một cột, AND giữa các cột)
+        all_of: Dictionary {cột: list giá trị} (respondent có mọi giá trị)
+    
+    Trả về:
+        DataFrame con (giữ thứ tự dòng), dùng được cho mọi hàm analyze_*
+    """
+    if index.n_rows != len(df):
+        raise ValueError("Chỉ mục bitmap không khớp với dữ liệu (số dòng khác nhau)")
+    
+    return df.iloc[index.rows(index.select(filters, all_of))].reset_index(drop=True)
+
+
+def _load_db(input_path: str, backend: str, db_path: str = None, rebuild: bool = False) -> SQLBackend:
+    """
+    Mở database của backend SQL, nạp từ input_path (theo từng chunk) nếu chưa có.
+    """
+    if backend not in ENGINES:
+        raise ValueError(f"backend phải là 'pandas' hoặc một trong {ENGINES}")
+    
+    if db_path is None:
+        db_path = os.path.splitext(input_path)[0] + ('.sqlite' if backend == 'sqlite' else '.duckdb')
+    
+    if rebuild or not os.path.exists(db_path):
+        load_survey(input_path, db_path, engine=backend)
+    
+    return SQLBackend(db_path, engine=backend, categories={'ExperienceLevel': EXPERIENCE_LABELS})
+
 
 # HÀM CHÍNH: CHẠY TOÀN BỘ PHÂN TÍCH
-def run_analysis(input_path: str) -> dict:
+def run_analysis(input_path: str, cache: ExplodeCache = None, multi_hot_path: str = None,
+                 cube_path: str = None, backend: str = 'pandas', db_path: str = None,
+                 filters: dict = None, all_of: dict = None, bitmap_path: str = None, write: bool = None) -> dict:
     """
-    Hàm chính thực hiện toàn bộ phân tích và lưu kết quả.
+    Hàm chính thực hiện toàn bộ phân tích (theo ANALYSIS_SPECS) và lưu kết quả.
     
     Tham số:
-        input_path: Đường dẫn file CSV đã transform
+        input_path: Đường dẫn file đã transform (.parquet, .feather hoặc .csv)
+        cache: ExplodeCache dùng chung cho mọi hàm phân tích (None = tạo mới).
+            Truyền vào để xem cache.stats() sau khi chạy.
+        multi_hot_path: File .npz mã hoá multi-hot lưu cùng lúc với input_path
+            (transform.run_transform(multi_hot_path=...)). Nếu có thì dùng lại,
+            không mã hoá lại các cột multi-select.
+        cube_path: File .npz của SurveyCube lưu cùng lúc với input_path
+            (transform.run_transform(cube_path=...)). Nếu có thì các crosstab
+            được tính từ cube, thống kê lương theo nhóm chỉ khi cube chính xác
+            (SurveyCube.exact). Các file .npz (multi-hot, cube, bitmap) phải
+            được build từ đúng file input_path, nếu không sẽ báo lỗi.
+        backend: 'pandas' (đọc toàn bộ dữ liệu vào bộ nhớ) hoặc 'sqlite' /
+            'duckdb' (mọi bảng được tính bằng SQL trên file database, dữ liệu
+            không cần vừa bộ nhớ; cache, multi_hot_path và cube_path bị bỏ qua)
+        db_path: File database của backend SQL (mặc định cạnh input_path,
+            đuôi .sqlite / .duckdb). Nếu chưa có thì nạp từ input_path.
+        filters, all_of: Chỉ phân tích các respondent thoả bộ lọc (xem
+            select_respondents), VD: filters={'RemoteWork': 'Remote'},
+            all_of={'LanguageHaveWorkedWith': ['Python', 'Rust']}. Chỉ dùng
+            với backend 'pandas'; cube (tính trên toàn bộ dữ liệu) bị bỏ qua.
+        bitmap_path: File .npz chỉ mục bitmap lưu cùng lúc với input_path
+            (transform.run_transform(bitmap_path=...)). Nếu không có thì build
+            chỉ mục khi có bộ lọc.
+        write: Ghi các bảng ra OUTPUT_DIR (mặc định chỉ ghi khi không có bộ
+            lọc, để không ghi đè bảng của toàn bộ dữ liệu)
     
     Trả về:
         Dictionary chứa tất cả các bảng kết quả
     """
+    filtered = bool(filters or all_of)
+    write = not filtered if write is None else write
+    
+    if backend == 'pandas':
+        # Mỗi cột multi-select chỉ explode một lần trong cả lần chạy
+        if cache is None:
+            cache = ExplodeCache()
 
-    # Đọc dữ liệu
-    df = pd.read_csv(input_path)
+        # Đọc dữ liệu
+        df = _load_input(input_path, cache, multi_hot_path)
+        shared = {'cache': cache, 'cube': _load_cube(cube_path, input_path, df)}
+        
+        # Lọc respondent bằng chỉ mục bitmap, các phân tích chạy trên tập con
+        if filtered:
+            bitmaps = (load_bitmap_index(bitmap_path, table_fingerprint(input_path, len(df)))
+                       if bitmap_path is not None and os.path.exists(bitmap_path) else build_bitmap_index(df))
+            df = select_respondents(df, bitmaps, filters, all_of)
+            shared['cube'] = None
+    elif filtered:
+        raise ValueError("filters / all_of chỉ dùng được với backend 'pandas'")
+    else:
+        df, shared = None, {'db': _load_db(input_path, backend, db_path)}
     results = {}
     
-    # 1. RemoteWork Overall
-    results['remote_overall'] = analyze_remote_work_overall(df)
-    results['remote_overall'].to_csv(f'{OUTPUT_DIR}/remote_work_overall.csv', index=False)
+    for key, func, kwargs, filename, index, skip_empty, uses in ANALYSIS_SPECS:
+        results[key] = func(df, **_with_shared(kwargs, uses, shared))
+        if write:
+            save_table(results[key], filename, index=index, skip_empty=skip_empty)
     
-    # 2. RemoteWork by Experience
-    results['remote_by_exp'] = analyze_remote_by_experience(df)
-    results['remote_by_exp'].to_csv(f'{OUTPUT_DIR}/remote_by_experience.csv')
+    if 'db' in shared:
+        shared['db'].close()
     
-    # 3. RemoteWork by DevType
-    results['remote_by_devtype'] = analyze_remote_by_devtype(df, top_n=10)
-    results['remote_by_devtype'].to_csv(f'{OUTPUT_DIR}/remote_by_devtype.csv')
+    return results
+
+
+def check_backend_parity(input_path: str, backend: str = 'sqlite', db_path: str = None,
+                         rebuild: bool = True) -> pd.DataFrame:
+    """
+    So sánh từng bảng của ANALYSIS_SPECS giữa bản pandas và bản SQL (cùng
+    giá trị, thứ tự dòng / cột và nhãn; không so kiểu số nguyên), kèm thời gian.
+
+    Tham số:
+        input_path: File đã transform
+        backend: 'sqlite' hoặc 'duckdb'
+        db_path: File database (xem run_analysis)
+        rebuild: Nạp lại database từ input_path (thời gian nạp ở dòng 'load')
+
+    Trả về:
+        DataFrame: Key, Equal, Pandas_Seconds, SQL_Seconds
+    """
+    start = time.perf_counter()
+    df = _load_input(input_path, ExplodeCache())
+    pandas_load = time.perf_counter() - start
+
+    start = time.perf_counter()
+    db = _load_db(input_path, backend, db_path, rebuild=rebuild)
+    sql_load = time.perf_counter() - start
+
+    rows = [{'Key': 'load', 'Equal': True, 'Pandas_Seconds': pandas_load, 'SQL_Seconds': sql_load}]
+    shared = {'cache': ExplodeCache(), 'db': db}
+
+    for key, func, kwargs, filename, index, skip_empty, uses in ANALYSIS_SPECS:
+        start = time.perf_counter()
+        expected = func(df, **_with_shared(kwargs, tuple(name for name in uses if name == 'cache'), shared))
+        pandas_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        actual = func(None, **_with_shared(kwargs, ('db',), shared))
+        sql_seconds = time.perf_counter() - start
+
+        try:
+            pd.testing.assert_frame_equal(actual, expected, check_dtype=False, check_index_type=False,
+                                          check_column_type=False, check_categorical=False)
+            equal = True
+        except AssertionError as e:
+            print(f"Khác nhau ở '{key}': {e}")
+            equal = False
+
+        rows.append({'Key': key, 'Equal': equal, 'Pandas_Seconds': pandas_seconds, 'SQL_Seconds': sql_seconds})
+
+    db.close()
+
+    return pd.DataFrame(rows)
+
+
+
+# HÀM CHẠY PHÂN TÍCH SONG SONG (DAG)
+def build_analysis_dag(cache: ExplodeCache = None, cube: SurveyCube = None) -> list:
+    """
+    Khai báo các bước của run_analysis dưới dạng DAG: mỗi bảng là một node
+    tính toán (input: 'df') và một node ghi file 'write:<khoá>' (input: node
+    tính toán), để việc ghi file chạy xen kẽ với các node tính toán khác.
+
+    Tham số:
+        cache: ExplodeCache dùng chung (None = không dùng cache, VD khi chạy
+            bằng process pool)
+        cube: SurveyCube (tuỳ chọn, xem run_analysis)
+
+    Trả về:
+        List các executor.Node
+    """
+    nodes = []
+    shared = {'cache': cache, 'cube': cube}
+
+    for key, func, kwargs, filename, index, skip_empty, uses in ANALYSIS_SPECS:
+        nodes.append(Node(key, func, inputs=['df'], kwargs=_with_shared(kwargs, uses, shared)))
+        nodes.append(Node(f'write:{key}', save_table, inputs=[key],
+                          kwargs={'filename': filename, 'index': index, 'skip_empty': skip_empty}))
+
+    return nodes
+
+
+def run_analysis_dag(input_path: str, max_workers: int = 4, mode: str = 'thread',
+                     cache: ExplodeCache = None, multi_hot_path: str = None, cube_path: str = None) -> tuple:
+    """
+    Chạy toàn bộ phân tích giống run_analysis nhưng các bảng độc lập được tính
+    đồng thời (executor.run_dag), đồng thời đo thời gian từng node.
+
+    Tham số:
+        input_path: Đường dẫn file đã transform
+        max_workers: Số worker
+        mode: 'thread' (dùng chung ExplodeCache) hoặc 'process' (mỗi process
+            tự explode, không dùng cache)
+        cache: ExplodeCache dùng chung (None = tạo mới, chỉ dùng với mode='thread')
+        multi_hot_path: File .npz mã hoá multi-hot (xem run_analysis)
+        cube_path: File .npz của SurveyCube (xem run_analysis)
+
+    Trả về:
+        Tuple (results, timings, path):
+        - results: Dictionary các bảng kết quả (giống run_analysis)
+        - timings: DataFrame thời gian từng node (xem executor.run_dag)
+        - path: Tuple (list node trên đường găng, tổng số giây)
+    """
+    if cache is None:
+        cache = ExplodeCache()
+
+    df = _load_input(input_path, cache, multi_hot_path)
+    nodes = build_analysis_dag(cache if mode == 'thread' else None, _load_cube(cube_path, input_path, df))
+
+    values, timings = run_dag(nodes, {'df': df}, max_workers=max_workers, mode=mode)
+    results = {spec[0]: values[spec[0]] for spec in ANALYSIS_SPECS}
+
+    return results, timings, critical_path(nodes, timings)
+
+
+
+# HÀM TOP-N THEO KIỂU STREAMING (SPACE-SAVING)
+# Mỗi phần tử: (khoá kết quả, cột multi-select, nhãn cột kết quả, top_n, file CSV, bỏ qua nếu rỗng),
+# cùng khoá / top_n với các bảng top-N trong ANALYSIS_SPECS. File CSV có hậu tố
+# _streaming vì bảng có thêm cột Error/Guaranteed, không ghi đè bảng chính xác
+TOP_N_STREAMING_SPECS = [
+    ('top_languages', 'LanguageHaveWorkedWith', 'Language', 15, 'top_languages_streaming.csv', False),
+    ('top_frustrations', 'Frustration', 'Frustration', 10, 'top_frustrations_streaming.csv', True),
+    ('top_devtypes', 'DevType', 'DevType', 15, 'top_devtypes_streaming.csv', True),
+]
+
+
+def sketch_multi_select(chunks, columns: list, capacity: int = 1000) -> tuple:
+    """
+    Đếm token của các cột multi-select theo từng chunk bằng SpaceSavingSketch
+    (bộ nhớ chỉ phụ thuộc capacity, không phụ thuộc số dòng).
     
-    # 4. Top Languages
-    results['top_languages'] = analyze_top_languages(df, top_n=15)
-    results['top_languages'].to_csv(f'{OUTPUT_DIR}/top_languages.csv', index=False)
+    Mỗi chunk được mã hoá multi-hot (token lặp lại trong một dòng tính một
+    lần, giống analyze_top_*), số đếm chính xác của chunk được gộp vào sketch.
     
-    # 5. AI Usage
-    results['ai_usage'] = analyze_ai_usage(df)
-    results['ai_usage'].to_csv(f'{OUTPUT_DIR}/ai_usage.csv', index=False)
+    Tham số:
+        chunks: Iterable các DataFrame chunk (VD: storage.iter_table_chunks)
+        columns: List cột multi-select
+        capacity: Số bộ đếm của mỗi sketch
     
-    # 6. Compensation by Experience
-    results['comp_by_exp'] = analyze_compensation_by_experience(df)
-    results['comp_by_exp'].to_csv(f'{OUTPUT_DIR}/compensation_by_experience.csv', index=False)
+    Trả về:
+        Tuple (dictionary {cột: SpaceSavingSketch}, tổng số dòng)
+    """
+    sketches = {col: SpaceSavingSketch(capacity) for col in columns}
+    n_rows = 0
+    
+    for chunk in chunks:
+        n_rows += len(chunk)
+        for col in columns:
+            if col not in chunk.columns:
+                continue
+            encoding = encode_multi_select(chunk[col])
+            counts = np.bincount(encoding.matrix.indices, minlength=encoding.n_tokens)
+            sketches[col].update_counts(dict(zip(encoding.vocabulary, counts.tolist())))
+    
+    return sketches, n_rows
+
+
+def top_n_from_sketch(sketch: SpaceSavingSketch, label: str, top_n: int, total: int) -> pd.DataFrame:
+    """
+    Bảng top-N giống analyze_top_languages / analyze_top_devtypes /
+    analyze_top_frustrations, thêm cận sai số của sketch.
     
-    # 6b. Compensation by Experience AND DevType (chi tiết theo ngành)
-    results['comp_by_exp_devtype'] = analyze_compensation_by_experience_and_devtype(df, top_n_devtypes=10)
-    if not results['comp_by_exp_devtype'].empty:
-        results['comp_by_exp_devtype'].to_csv(f'{OUTPUT_DIR}/compensation_by_experience_devtype.csv', index=False)
+    Trả về:
+        DataFrame với các cột: label, Count, Percentage, Error (Count thật nằm
+        trong [Count - Error, Count]), Guaranteed (chắc chắn thuộc top-N thật)
+    """
+    top = sketch.top(top_n)
+    
+    return pd.DataFrame({
+        label: top.index,
+        'Count': top['Count'].values,
+        'Percentage': (top['Count'] / total * 100).round(2).values if total else np.nan,
+        'Error': top['Error'].values,
+        'Guaranteed': top['Guaranteed'].values
+    })
+
+
+def run_top_n_streaming(input_path: str, chunksize: int = 100_000, capacity: int = 1000,
+                        write: bool = True) -> dict:
+    """
+    Tính các bảng top-N (ngôn ngữ, frustration, DevType) trong một lần đọc
+    file theo chunk, bộ nhớ giới hạn, dùng cho file lớn hơn RAM.
     
-    # 7. AI by Experience
-    results['ai_by_exp'] = analyze_ai_by_experience(df)
-    results['ai_by_exp'].to_csv(f'{OUTPUT_DIR}/ai_by_experience.csv')
+    Khi số token khác nhau của một cột không vượt capacity, kết quả trùng với
+    run_analysis (Error = 0).
     
-    # 8. Top Frustrations
-    results['top_frustrations'] = analyze_top_frustrations(df, top_n=10)
-    if not results['top_frustrations'].empty:
-        results['top_frustrations'].to_csv(f'{OUTPUT_DIR}/top_frustrations.csv', index=False)
+    Tham số:
+        input_path: Đường dẫn file đã transform
+        chunksize: Số dòng mỗi chunk
+        capacity: Số bộ đếm của mỗi sketch
+        write: True = ghi các bảng ra OUTPUT_DIR (file *_streaming.csv, không
+            ghi đè các bảng top-N của run_analysis)
     
-    # 9. Top DevTypes
-    results['top_devtypes'] = analyze_top_devtypes(df, top_n=15)
-    if not results['top_devtypes'].empty:
-        results['top_devtypes'].to_csv(f'{OUTPUT_DIR}/top_devtypes.csv', index=False)
+    Trả về:
+        Dictionary {khoá: bảng top-N}
+    """
+    columns = [spec[1] for spec in TOP_N_STREAMING_SPECS]
+    chunks = iter_table_chunks(input_path, columns=columns, chunksize=chunksize)
+    sketches, n_rows = sketch_multi_select(chunks, columns, capacity)
     
-    # 10. Languages by DevType (cho Roadmap)
-    results['languages_by_devtype'] = analyze_languages_by_devtype(df, top_n_devtypes=10, top_n_languages=5)
-    if not results['languages_by_devtype'].empty:
-        results['languages_by_devtype'].to_csv(f'{OUTPUT_DIR}/languages_by_devtype.csv', index=False)
+    results = {}
+    for key, col, label, top_n, filename, skip_empty in TOP_N_STREAMING_SPECS:
+        results[key] = top_n_from_sketch(sketches[col], label, top_n, n_rows)
+        if write:
+            save_table(results[key], filename, skip_empty=skip_empty)
     
     return results
 
 
 
-
 if __name__ == "__main__":
-    INPUT_PATH = './data/processed/transformed_developer_survey.csv'
-    results = run_analysis(INPUT_PATH)
+    INPUT_PATH = './data/processed/transformed_developer_survey.parquet'
+    MULTI_HOT_PATH = './data/processed/multi_hot_encoding.npz'
+    CUBE_PATH = './data/processed/survey_cube.npz'
+    results = run_analysis(INPUT_PATH, multi_hot_path=MULTI_HOT_PATH, cube_path=CUBE_PATH)
@@ -0,0 +1,309 @@
+# benchmarks.py - Đo hiệu năng các bước pipeline trên dữ liệu tổng hợp
+# file này cung cấp:
+# 1. Sinh dữ liệu survey tổng hợp (cùng cấu trúc với dữ liệu sau khi clean)
+#    với số dòng tuỳ ý, để đo trên dữ liệu lớn
+# 2. Các hàm đo thời gian / bộ nhớ đỉnh
+# 3. Các benchmark so sánh cách làm cũ và mới của từng bước
+# 4. Benchmark chi phí thêm của khoảng tin cậy bootstrap cho median
+# 5. Benchmark backend SQL (SQLite / DuckDB) so với pandas, kèm kiểm tra cùng kết quả
+# 6. Benchmark phân tích map-reduce theo shard với 1, 2, 4, 8 process, so với run_analysis
+# 7. Benchmark update một batch mới vào AnalysisState so với chạy lại run_analysis
+
+import os
+import pickle
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+import analysis
+import incremental
+import transform
+from storage import write_table
+from salary_index import SalaryIndex, bootstrap_median_ci
+
+
+# Giá trị mẫu để sinh dữ liệu tổng hợp
+_LANGUAGES = ['JavaScript', 'SQL', 'HTML/CSS', 'Python', 'TypeScript', 'Bash/Shell', 'Java',
+              'C#', 'C++', 'PHP', 'Go', 'Rust', 'Kotlin', 'C', 'Swift', 'Ruby', 'Dart', 'R']
+_DEVTYPES = ['Developer, full-stack', 'Developer, back-end', 'Developer, front-end',
+             'Developer, desktop or enterprise applications', 'Developer, mobile',
+             'Developer, embedded applications or devices', 'Engineering manager',
+             'DevOps specialist', 'Data engineer', 'Other (please specify):',
+             'Data scientist or machine learning specialist']
+_FRUSTRATIONS = ['Amount of technical debt', 'Complexity of tech stack for build',
+                 'Complexity of tech stack for deployment', 'Number of software tools in use',
+                 'Tracking my work', 'Patching/updating core components', 'Maintaining security of code being produced']
+_REMOTE = ['Remote', 'Hybrid (some remote, some in-person)', 'In-person']
+_AI = ['Yes', 'No, but I plan to soon', "No, and I don't plan to"]
+_AGES = ['18-24 years old', '25-34 years old', '35-44 years old', '45-54 years old', '55-64 years old']
+
+
+def _multi_select(rng, pool: list, n_rows: int, max_items: int) -> list:
+    """
+    Sinh n_rows chuỗi multi-select (các giá trị phân cách bằng ';').
+    """
+    pool = np.asarray(pool, dtype=object)
+    # Trọng số giảm dần để có giá trị phổ biến / ít phổ biến như dữ liệu thật,
+    # chọn không lặp theo trọng số bằng khoá u^(1/w) (Efraimidis-Spirakis)
+    weights = 1.0 / np.arange(1, len(pool) + 1)
+    keys = rng.random((n_rows, len(pool))) ** (1.0 / weights)
+    order = np.argsort(-keys, axis=1)[:, :max_items]
+    sizes = rng.integers(1, max_items + 1, size=n_rows)
+    chosen = pool[order]
+
+    return [';'.join(row[:size]) for row, size in zip(chosen, sizes)]
+
+
+# HÀM SINH DỮ LIỆU TỔNG HỢP
+def make_synthetic_survey(n_rows: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Sinh bảng survey tổng hợp có cùng các cột với dữ liệu sau khi clean.
+
+    Tham số:
+        n_rows: Số dòng
+        seed: Seed sinh ngẫu nhiên
+
+    Trả về:
+        DataFrame giống output của cleaning.run_cleaning
+    """
+    rng = np.random.default_rng(seed)
+
+    return pd.DataFrame({
+        'MainBranch': 'I am a developer by profession',
+        'Age': rng.choice(_AGES, size=n_rows),
+        'YearsCodePro': rng.integers(0, 40, size=n_rows).astype(float),
+        'DevType': _multi_select(rng, _DEVTYPES, n_rows, 2),
+        'LanguageHaveWorkedWith': _multi_select(rng, _LANGUAGES, n_rows, 6),
+        'CompTotal': np.round(rng.lognormal(11, 0.6, size=n_rows)),
+        'RemoteWork': rng.choice(_REMOTE, size=n_rows),
+        'AISelect': rng.choice(_AI, size=n_rows),
+        'Frustration': _multi_select(rng, _FRUSTRATIONS, n_rows, 3),
+    })
+
+
+# HÀM ĐO
+def measure(func, *args, **kwargs) -> dict:
+    """
+    Chạy func một lần, đo thời gian và bộ nhớ đỉnh cấp phát thêm (tracemalloc).
+
+    Trả về:
+        Dictionary {'seconds', 'peak_mb', 'result'}
+    """
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {'seconds': seconds, 'peak_mb': peak / 1024 ** 2, 'result': result}
+
+
+# BENCHMARK: TRANSFORM COPY TỪNG BƯỚC VS TRANSFORM THEO CỘT
+def _transform_chained(df: pd.DataFrame) -> pd.DataFrame:
+    # Cách cũ: mỗi bước copy toàn bộ bảng
+    df = transform.create_experience_bins(df)
+    df = transform.standardize_remote_work(df)
+    return transform.standardize_ai_select(df)
+
+
+def benchmark_transform(n_rows: int = 1_000_000, seed: int = 0) -> pd.DataFrame:
+    """
+    So sánh bộ nhớ đỉnh và thời gian của transform gọi lần lượt 3 hàm
+    (mỗi hàm copy bảng) với transform_survey(inplace=True).
+
+    Trả về:
+        DataFrame với các cột Mode, Seconds, PeakMB
+    """
+    df = make_synthetic_survey(n_rows, seed)
+    rows = []
+
+    chained = measure(_transform_chained, df)
+    rows.append({'Mode': 'chained copy', 'Seconds': chained['seconds'], 'PeakMB': chained['peak_mb']})
+    del chained
+
+    inplace = measure(transform.transform_survey, df.copy(), inplace=True)
+    rows.append({'Mode': 'column-only inplace', 'Seconds': inplace['seconds'], 'PeakMB': inplace['peak_mb']})
+
+    return pd.DataFrame(rows).round(3)
+
+
+# BENCHMARK: MEDIAN THEO NHÓM VS MEDIAN + KHOẢNG TIN CẬY BOOTSTRAP
+def benchmark_bootstrap(n_rows: int = 100_000, n_boot: int = 1000, seed: int = 0) -> pd.DataFrame:
+    """
+    So sánh thời gian của bảng lương theo DevType x ExperienceLevel không có
+    và có khoảng tin cậy bootstrap, với cả hai cách lấy mẫu.
+
+    Trả về:
+        DataFrame với các cột Mode, Seconds, PeakMB, Ratio (so với chỉ tính median)
+    """
+    df = transform.transform_survey(make_synthetic_survey(n_rows, seed), inplace=True)
+    func = analysis.analyze_compensation_by_experience_and_devtype
+    rows = []
+
+    for mode, kwargs in [('median only', {'n_boot': 0}), ('median + CI (order statistic)', {'n_boot': n_boot})]:
+        run = measure(func, df, n_boot=kwargs['n_boot'], seed=seed)
+        rows.append({'Mode': mode, 'Seconds': run['seconds'], 'PeakMB': run['peak_mb']})
+
+    # Cách lấy mẫu bằng ma trận: chỉ đo phần bootstrap, cộng thời gian median
+    exploded = df.assign(DevType=df['DevType'].str.split(';')).explode('DevType')
+    segments = SalaryIndex.build(exploded, ['DevType', 'ExperienceLevel']).segments()
+    run = measure(bootstrap_median_ci, segments, n_boot=n_boot, seed=seed, method='resample')
+    rows.append({'Mode': 'median + CI (resample matrix)', 'Seconds': rows[0]['Seconds'] + run['seconds'],
+                 'PeakMB': run['peak_mb']})
+
+    result = pd.DataFrame(rows)
+    result['Ratio'] = result['Seconds'] / result['Seconds'].iloc[0]
+
+    return result.round(3)
+
+
+def benchmark_sql_backend(n_rows: int = 1_000_000, backend: str = 'sqlite', seed: int = 0) -> pd.DataFrame:
+    """
+    Chạy analysis.check_backend_parity trên dữ liệu tổng hợp đã transform
+    (ghi ra file parquet tạm): so sánh từng bảng giữa pandas và backend SQL,
+    kèm thời gian nạp dữ liệu và thời gian từng bảng.
+
+    Trả về:
+        DataFrame: Key, Equal, Pandas_Seconds, SQL_Seconds, Ratio (SQL / pandas),
+        dòng cuối 'total' là tổng các bảng (không gồm nạp dữ liệu)
+    """
+    df = transform.transform_survey(make_synthetic_survey(n_rows, seed), inplace=True)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        input_path = os.path.join(tmp, 'transformed.parquet')
+        write_table(df, input_path)
+        del df
+
+        result = analysis.check_backend_parity(input_path, backend=backend,
+                                               db_path=os.path.join(tmp, f'survey.{backend}'))
+
+    tables = result[result['Key'] != 'load']
+    total = {'Key': 'total', 'Equal': tables['Equal'].all(),
+             'Pandas_Seconds': tables['Pandas_Seconds'].sum(), 'SQL_Seconds': tables['SQL_Seconds'].sum()}
+    result = pd.concat([result, pd.DataFrame([total])], ignore_index=True)
+    result['Ratio'] = result['SQL_Seconds'] / result['Pandas_Seconds']
+
+    return result.round(3)
+
+
+def _same_tables(left: dict, right: dict) -> bool:
+    # Cùng khoá, cùng giá trị / thứ tự dòng / nhãn (không so kiểu số nguyên, giống check_backend_parity)
+    if left.keys() != right.keys():
+        return False
+
+    for key in left:
+        try:
+            pd.testing.assert_frame_equal(left[key], right[key], check_dtype=False, check_index_type=False,
+                                          check_column_type=False, check_categorical=False)
+        except AssertionError:
+            return False
+
+    return True
+
+
+def benchmark_sharded(n_rows: int = 1_000_000, workers: tuple = (1, 2, 4, 8), seed: int = 0) -> pd.DataFrame:
+    """
+    Đo incremental.run_sharded (một shard cho mỗi process) trên dữ liệu tổng
+    hợp đã transform, so với analysis.run_analysis trên cùng file (thời gian
+    và kết quả).
+
+    Lưu ý: tốc độ tăng phụ thuộc số CPU thật của máy (os.cpu_count()).
+
+    Trả về:
+        DataFrame: Method, Workers, Seconds, Speedup (so với run_analysis),
+        Equal (cùng bảng với run_analysis)
+    """
+    df = transform.transform_survey(make_synthetic_survey(n_rows, seed), inplace=True)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        input_path = os.path.join(tmp, 'transformed.parquet')
+        write_table(df, input_path)
+        del df
+
+        start = time.perf_counter()
+        expected = analysis.run_analysis(input_path, write=False)
+        rows = [{'Method': 'run_analysis', 'Workers': 1, 'Seconds': time.perf_counter() - start, 'Equal': True}]
+
+        for n_workers in workers:
+            start = time.perf_counter()
+            results = incremental.run_sharded(input_path, n_workers=n_workers, write_tables=False)
+            seconds = time.perf_counter() - start
+
+            rows.append({'Method': 'run_sharded', 'Workers': n_workers, 'Seconds': seconds,
+                         'Equal': _same_tables(expected, results)})
+
+    result = pd.DataFrame(rows)
+    result.insert(3, 'Speedup', result['Seconds'].iloc[0] / result['Seconds'])
+
+    return result.round(3)
+
+
+def benchmark_incremental_update(history_rows: int = 1_000_000, batch_sizes: tuple = (10_000, 20_000, 40_000),
+                                 seed: int = 0) -> pd.DataFrame:
+    """
+    Đo AnalysisState.update với một batch mới (trạng thái đã có history_rows
+    dòng) so với chạy lại analysis.run_analysis trên toàn bộ file và trên
+    riêng batch. Chi phí update cần tỉ lệ với số dòng của batch (gần bằng
+    run_analysis trên riêng batch), không phụ thuộc số dòng đã có.
+
+    Mỗi batch được update vào một bản sao của cùng trạng thái history; batch
+    lớn nhất được finalize và so với run_analysis trên history + batch.
+
+    Trả về:
+        DataFrame: Step, Rows, Seconds, Equal (chỉ ở dòng finalize: cùng
+        bảng với run_analysis trên history + batch)
+    """
+    df = transform.transform_survey(make_synthetic_survey(history_rows + max(batch_sizes), seed), inplace=True)
+    history = df.iloc[:history_rows]
+
+    # Trạng thái của history (không tính thời gian), giữ toàn bộ lương để so chính xác
+    snapshot = pickle.dumps(incremental.AnalysisState(sketch_k=None).update(history))
+    rows = []
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for batch_rows in batch_sizes:
+            batch = df.iloc[history_rows:history_rows + batch_rows]
+            batch_path = os.path.join(tmp, f'batch_{batch_rows}.parquet')
+            write_table(batch, batch_path)
+
+            state = pickle.loads(snapshot)
+            start = time.perf_counter()
+            state.update(batch)
+            rows.append({'Step': 'update', 'Rows': batch_rows, 'Seconds': time.perf_counter() - start})
+
+            start = time.perf_counter()
+            analysis.run_analysis(batch_path, write=False)
+            rows.append({'Step': 'run_analysis (batch)', 'Rows': batch_rows,
+                         'Seconds': time.perf_counter() - start})
+
+        full_path = os.path.join(tmp, 'full.parquet')
+        write_table(df, full_path)
+        del df, history, batch
+
+        start = time.perf_counter()
+        results = state.finalize()
+        finalize_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        expected = analysis.run_analysis(full_path, write=False)
+        rows.append({'Step': 'run_analysis (history + batch)', 'Rows': state.n_rows,
+                     'Seconds': time.perf_counter() - start})
+        rows.append({'Step': 'finalize', 'Rows': state.n_rows, 'Seconds': finalize_seconds,
+                     'Equal': _same_tables(expected, results)})
+
+    result = pd.DataFrame(rows).round(3)
+    result['Equal'] = result['Equal'].astype(object).fillna('')
+
+    return result
+
+
+if __name__ == "__main__":
+    print(benchmark_transform())
+    print(benchmark_bootstrap())
+    print(benchmark_sql_backend())
+    print(benchmark_sharded())
+    print(benchmark_incremental_update())
@@ -0,0 +1,234 @@
+# bitmap_index.py - Chỉ mục bitmap trên các thuộc tính của respondent
+# file này cho phép lọc respondent theo nhiều điều kiện cùng lúc (VD: nhóm
+# kinh nghiệm + hình thức làm việc + dùng AI + biết Python và Rust):
+# 1. Mỗi giá trị của một cột (cột đơn hoặc token của cột multi-select) là một
+#    bitset nén uint64 trên các respondent: bit i = 1 nếu respondent i có giá trị đó
+# 2. Build một lần sau run_transform và lưu cạnh bảng respondent (.npz)
+# 3. Bộ lọc AND / OR bất kỳ = phép & / | trên bitset (mỗi word 64 respondent),
+#    số respondent = popcount, không cần quét lại DataFrame
+# 4. Tập respondent thu được (mask / vị trí dòng) dùng cho các hàm phân tích
+#    sẵn có (analysis.run_analysis(filters=...), query.SurveyQuery)
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from counting import dimension_codes
+from encoding import MULTI_SELECT_COLUMNS, encode_multi_select
+from itemsets import pack_columns, popcount
+from storage import check_fingerprint
+
+
+# Các cột được đánh chỉ mục mặc định
+BITMAP_COLUMNS = ['ExperienceLevel', 'RemoteWork', 'AISelect', 'DevType', 'LanguageHaveWorkedWith', 'Frustration']
+
+
+def _values(values) -> list:
+    return [values] if isinstance(values, str) or np.isscalar(values) else list(values)
+
+
+# CHỈ MỤC BITMAP
+class BitmapIndex:
+    """
+    Bitset của từng giá trị trên từng cột.
+
+    Thuộc tính:
+        n_rows: Số respondent
+        labels: Dictionary {cột: list nhãn}
+        bits: Dictionary {cột: mảng uint64 (số nhãn x số word)}, hàng j là
+            bitset của labels[cột][j]
+    """
+
+    def __init__(self, n_rows: int, labels: dict, bits: dict):
+        self.n_rows = n_rows
+        self.labels = labels
+        self.bits = bits
+        self._index = {col: {label: j for j, label in enumerate(col_labels)}
+                       for col, col_labels in labels.items()}
+
+    @property
+    def columns(self) -> list:
+        return list(self.labels)
+
+    @property
+    def n_words(self) -> int:
+        return max(1, (self.n_rows + 63) // 64)
+
+    # TẬP RESPONDENT
+    def full(self) -> np.ndarray:
+        """
+        Bitset của mọi respondent.
+        """
+        bits = np.full(self.n_words, np.iinfo(np.uint64).max, dtype=np.uint64)
+        if self.n_rows % 64:
+            bits[-1] = np.uint64((1 << (self.n_rows % 64)) - 1)
+        if self.n_rows == 0:
+            bits[:] = 0
+
+        return bits
+
+    def empty(self) -> np.ndarray:
+        return np.zeros(self.n_words, dtype=np.uint64)
+
+    def invert(self, bits: np.ndarray) -> np.ndarray:
+        """
+        Phần bù của một tập respondent (NOT).
+        """
+        return ~bits & self.full()
+
+    def bitmap(self, col: str, values, how: str = 'any') -> np.ndarray:
+        """
+        Respondent có giá trị values ở cột col.
+
+        Tham số:
+            col: Cột đã đánh chỉ mục
+            values: Một giá trị hoặc list giá trị
+            how: 'any' = có ít nhất một giá trị (OR), 'all' = có mọi giá trị (AND,
+                dùng cho cột multi-select, VD: biết cả Python và Rust)
+
+        Trả về:
+            Bitset uint64
+        """
+        if col not in self.bits:
+            raise ValueError(f"Cột '{col}' chưa được đánh chỉ mục bitmap")
+        if how not in ('any', 'all'):
+            raise ValueError("how phải là 'any' hoặc 'all'")
+
+        rows = [self._index[col].get(value) for value in _values(values)]
+
+        if how == 'all':
+            if any(j is None for j in rows):
+                return self.empty()
+            return np.bitwise_and.reduce(self.bits[col][rows], axis=0) if rows else self.full()
+
+        rows = [j for j in rows if j is not None]
+        return np.bitwise_or.reduce(self.bits[col][rows], axis=0) if rows else self.empty()
+
+    def select(self, filters: dict = None, all_of: dict = None) -> np.ndarray:
+        """
+        AND của mọi điều kiện.
+
+        Tham số:
+            filters: Dictionary {cột: giá trị hoặc list giá trị}, respondent có
+                ít nhất một giá trị trong list (OR trong một cột)
+                (VD: {'ExperienceLevel': ['Senior (6-10)', 'Lead/Staff (11-20)'], 'RemoteWork': 'Remote'})
+            all_of: Dictionary {cột: list giá trị}, respondent có mọi giá trị
+                (VD: {'LanguageHaveWorkedWith': ['Python', 'Rust']})
+
+        Trả về:
+            Bitset uint64
+        """
+        bits = self.full()
+
+        for col, values in (filters or {}).items():
+            bits &= self.bitmap(col, values, how='any')
+        for col, values in (all_of or {}).items():
+            bits &= self.bitmap(col, values, how='all')
+
+        return bits
+
+    def count(self, bits: np.ndarray) -> int:
+        return int(popcount(bits))
+
+    def mask(self, bits: np.ndarray) -> np.ndarray:
+        """
+        Mảng bool độ dài n_rows từ bitset (bit i của word i // 64 = respondent i).
+        """
+        as_bytes = np.ascontiguousarray(bits, dtype='<u8').view(np.uint8)
+        return np.unpackbits(as_bytes, bitorder='little')[:self.n_rows].astype(bool)
+
+    def rows(self, bits: np.ndarray) -> np.ndarray:
+        """
+        Vị trí dòng (tăng dần) của các respondent trong bitset.
+        """
+        return np.flatnonzero(self.mask(bits))
+
+    # ĐẾM TRÊN BITMAP
+    def counts(self, col: str, bits: np.ndarray = None) -> pd.Series:
+        """
+        Số respondent có từng giá trị của cột col trong một tập respondent
+        (mặc định tất cả), theo thứ tự nhãn.
+        """
+        if col not in self.bits:
+            raise ValueError(f"Cột '{col}' chưa được đánh chỉ mục bitmap")
+
+        col_bits = self.bits[col] if bits is None else self.bits[col] & bits
+        return pd.Series(popcount(col_bits), index=pd.Index(self.labels[col], name=col), name='count')
+
+
+# HÀM BUILD CHỈ MỤC
+def build_bitmap_index(df: pd.DataFrame, columns: list = None, encodings: dict = None) -> BitmapIndex:
+    """
+    Build bitset cho mọi giá trị của các cột.
+
+    Tham số:
+        df: DataFrame đã transform
+        columns: Các cột cần đánh chỉ mục (mặc định BITMAP_COLUMNS, bỏ qua cột không có)
+        encodings: Dictionary {cột: MultiHotEncoding} đã mã hoá (tuỳ chọn,
+            VD encoding.encode_survey(df)), cột multi-select khác được mã hoá ở đây
+
+    Trả về:
+        BitmapIndex
+    """
+    columns = BITMAP_COLUMNS if columns is None else columns
+    encodings = encodings or {}
+    labels, bits = {}, {}
+
+    for col in columns:
+        if col not in df.columns:
+            continue
+
+        if col in MULTI_SELECT_COLUMNS:
+            encoded = encodings.get(col)
+            if encoded is None or encoded.n_respondents != len(df):
+                encoded = encode_multi_select(df[col])
+            labels[col] = list(encoded.vocabulary)
+            matrix = encoded.matrix
+        else:
+            # Cột đơn: ma trận chỉ báo respondent x nhãn (dòng rỗng không có bit nào)
+            codes, col_labels = dimension_codes(df[col])
+            codes = np.asarray(codes, dtype=np.int64)
+            rows = np.flatnonzero(codes >= 0)
+            labels[col] = list(col_labels)
+            matrix = sparse.csr_matrix((np.ones(len(rows), dtype=np.int8), (rows, codes[rows])),
+                                       shape=(len(df), len(col_labels)))
+
+        bits[col] = pack_columns(matrix)
+
+    return BitmapIndex(len(df), labels, bits)
+
+
+# HÀM LƯU / ĐỌC CHỈ MỤC
+def save_bitmap_index(index: BitmapIndex, path: str, fingerprint: str = None):
+    """
+    Lưu BitmapIndex vào một file .npz (lưu cạnh bảng respondent, thứ tự dòng
+    trùng với bảng respondent được lưu cùng lúc), kèm dấu vân tay của bảng
+    (storage.table_fingerprint) nếu có.
+    """
+    arrays = {'n_rows': np.asarray(index.n_rows)}
+    if fingerprint is not None:
+        arrays['fingerprint'] = np.asarray(fingerprint)
+    for col in index.columns:
+        arrays[f'{col}.bits'] = index.bits[col]
+        arrays[f'{col}.labels'] = np.asarray(index.labels[col], dtype=str)
+
+    np.savez_compressed(path, **arrays)
+
+
+def load_bitmap_index(path: str, fingerprint: str = None) -> BitmapIndex:
+    """
+    Đọc BitmapIndex đã lưu bằng save_bitmap_index. Báo lỗi nếu fingerprint
+    (dấu vân tay của bảng đang dùng) khác với dấu vân tay lưu trong file.
+    """
+    labels, bits = {}, {}
+
+    with np.load(path) as data:
+        check_fingerprint(str(data['fingerprint']) if 'fingerprint' in data.files else None, fingerprint, path)
+        n_rows = int(data['n_rows'])
+        columns = [key.rsplit('.', 1)[0] for key in data.files if key.endswith('.bits')]
+
+        for col in columns:
+            bits[col] = data[f'{col}.bits']
+            labels[col] = data[f'{col}.labels'].tolist()
+
+    return BitmapIndex(n_rows, labels, bits)
@@ -1,40 +1,363 @@
 # Làm sạch dữ liệu
+import argparse
+
 import pandas as pd
 import numpy as np
 
-# dọc dữ liệu gốc
-file_path = './data/raw/survey_results_public.csv'
-df = pd.read_csv(file_path)
+from schema import apply_dtype_plan, fixed_dtype_plan
+from sketches import KLLSketch
+from storage import ChunkWriter, write_table
+from transform import create_experience_bins
+
 
-# lọc các cột cần thiết
+# các cột cần thiết (chỉ đọc đúng các cột này từ file gốc)
 selected_columns = [
-    'MainBranch', 'Age', 'YearsCodePro', 'DevType', 
-    'LanguageHaveWorkedWith', 'CompTotal', 'RemoteWork', 'AISelect','Frustration', 'DevType'
+    'MainBranch', 'Age', 'YearsCodePro', 'DevType',
+    'LanguageHaveWorkedWith', 'CompTotal', 'RemoteWork', 'AISelect','Frustration'
 ]
-df = df[selected_columns].copy()
 
-df = df[df['MainBranch'] == 'I am a developer by profession']
+# kiểu dữ liệu khi đọc: đọc tất cả dạng chuỗi để pandas không phải đoán kiểu,
+# các cột số sẽ được ép kiểu sau khi lọc ở từng chunk
+RAW_DTYPES = {col: str for col in selected_columns}
+
+# số dòng mỗi chunk khi đọc theo kiểu streaming
+DEFAULT_CHUNK_SIZE = 50_000
+
+
+# HÀM CHUẨN HOÁ DANH SÁCH CỘT CỦA MỘT CHUNK
+def _project_columns(chunk: pd.DataFrame) -> pd.DataFrame:
+    """
+    Sắp xếp lại các cột theo selected_columns. Survey các năm cũ có thể
+    thiếu một số cột (VD: AISelect, Frustration), các cột này được thêm vào
+    với giá trị rỗng.
+    """
+    missing = [col for col in selected_columns if col not in chunk.columns]
+    chunk = chunk.reindex(columns=selected_columns)
+
+    if missing:
+        chunk[missing] = chunk[missing].astype(object)
+
+    return chunk
+
+
+# HÀM ĐỌC DỮ LIỆU GỐC THEO TỪNG CHUNK
+def iter_raw_chunks(file_path: str, chunksize: int = DEFAULT_CHUNK_SIZE):
+    """
+    Đọc file survey gốc theo từng chunk, chỉ lấy các cột trong selected_columns.
+
+    File gốc có hàng trăm cột, nên chỉ đọc đúng các cột cần (usecols) với
+    kiểu dữ liệu cố định (dtype) để giảm bộ nhớ khi đọc. Cột không có
+    trong file được thêm vào với giá trị rỗng.
+
+    Tham số:
+        file_path: Đường dẫn file CSV gốc
+        chunksize: Số dòng mỗi chunk (None = đọc một lần toàn bộ các cột đã chọn)
+
+    Trả về:
+        Generator các DataFrame chunk
+    """
+    reader = pd.read_csv(
+        file_path,
+        usecols=lambda col: col in RAW_DTYPES,
+        dtype=RAW_DTYPES,
+        chunksize=chunksize
+    )
+
+    if chunksize is None:
+        yield _project_columns(reader)
+        return
+
+    with reader:
+        for chunk in reader:
+            yield _project_columns(chunk)
+
+
+# HÀM LÀM SẠCH MỘT CHUNK
+def clean_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+    """
+    Lọc developer chuyên nghiệp, ép kiểu số và loại bỏ dòng không hợp lệ
+    trên một chunk dữ liệu gốc.
+
+    Tham số:
+        chunk: DataFrame chunk đọc từ iter_raw_chunks
+
+    Trả về:
+        DataFrame chunk đã làm sạch (chưa lọc outlier)
+    """
+    df = chunk[chunk['MainBranch'] == 'I am a developer by profession']
+
+    # cột kinh nghiệm có 'Less than 1 year', chuyển nó thành 0 và ép kiểu số
+    years = df['YearsCodePro'].replace('Less than 1 year', '0')
+
+    # ép kiểu kinh nghiệm và lương sang số
+    df = df.assign(
+        YearsCodePro=pd.to_numeric(years, errors='coerce'),
+        CompTotal=pd.to_numeric(df['CompTotal'], errors='coerce')
+    )
+
+    # Loại bỏ giá trị rỗng và lương không hợp lệ
+    df = df.dropna(subset=['CompTotal', 'YearsCodePro', 'LanguageHaveWorkedWith'])
+    df = df[df['CompTotal'] > 0]
+
+    return df
+
+
+# HÀM ĐỌC + LÀM SẠCH THEO KIỂU STREAMING
+def read_filtered_survey(file_path: str, chunksize: int = DEFAULT_CHUNK_SIZE) -> pd.DataFrame:
+    """
+    Đọc file gốc theo từng chunk và làm sạch từng chunk ngay khi đọc,
+    chỉ giữ lại các dòng hợp lệ. Bảng gốc đầy đủ không bao giờ được
+    nạp toàn bộ vào bộ nhớ.
+
+    Tham số:
+        file_path: Đường dẫn file CSV gốc
+        chunksize: Số dòng mỗi chunk
+
+    Trả về:
+        DataFrame đã lọc (chưa lọc outlier)
+    """
+    chunks = [clean_chunk(chunk) for chunk in iter_raw_chunks(file_path, chunksize)]
+
+    if not chunks:
+        return pd.DataFrame(columns=selected_columns)
+
+    return pd.concat(chunks, ignore_index=True)
+
+
+# HÀM LẤY KHOÁ NHÓM KHI LỌC OUTLIER
+def _outlier_group_keys(df: pd.DataFrame, group_by) -> list:
+    """
+    Chuyển tham số group_by thành list các Series dùng làm khoá groupby.
+    'ExperienceLevel' chưa có ở bước cleaning nên được tính từ YearsCodePro.
+    """
+    if isinstance(group_by, str):
+        group_by = [group_by]
+
+    keys = []
+    for name in group_by:
+        if name == 'ExperienceLevel' and name not in df.columns:
+            keys.append(create_experience_bins(df[['YearsCodePro']])['ExperienceLevel'])
+        else:
+            keys.append(df[name])
+
+    return keys
+
+
+# HÀM LỌC OUTLIER BẰNG IQR
+def filter_outliers_iqr(df: pd.DataFrame, col: str = 'CompTotal', k: float = 1.5,
+                        group_by=None) -> pd.DataFrame:
+    """
+    Xác định nhóm thu nhập hợp lý bằng phương pháp IQR và loại bỏ outlier.
+
+    Khi có group_by, ngưỡng IQR được tính riêng cho từng nhóm (VD: mỗi
+    ExperienceLevel) bằng một lần groupby quantile duy nhất, sau đó ngưỡng
+    được gán ngược lại cho từng dòng theo mã nhóm (không lặp qua từng nhóm).
+    Dòng có khoá nhóm rỗng dùng ngưỡng IQR toàn cục.
+
+    Tham số:
+        df: DataFrame đã làm sạch
+        col: Tên cột cần lọc outlier (mặc định 'CompTotal')
+        k: Hệ số nhân IQR (mặc định 1.5)
+        group_by: None (IQR toàn cục), tên cột hoặc list tên cột để tính IQR
+            theo nhóm (VD: 'ExperienceLevel', ['ExperienceLevel', 'DevType']).
+            DevType được nhóm theo nguyên chuỗi multi-select.
+
+    Trả về:
+        DataFrame chỉ gồm các dòng nằm trong khoảng [Q1 - k*IQR, Q3 + k*IQR]
+        của nhóm tương ứng
+    """
+    values = df[col].to_numpy(dtype=float)
+
+    if len(values) == 0:
+        return df.copy()
+
+    q1, q3 = np.percentile(values, [25, 75])
+
+    if group_by is None:
+        q1 = np.full(len(values), q1)
+        q3 = np.full(len(values), q3)
+    else:
+        grouped = df[col].groupby(_outlier_group_keys(df, group_by), observed=True, sort=True)
+
+        # Một lần tính quantile cho mọi nhóm, thứ tự nhóm trùng với ngroup()
+        fences = grouped.quantile([0.25, 0.75]).unstack()
+        codes = grouped.ngroup().fillna(-1).to_numpy(dtype=np.int64)
+        has_group = codes >= 0
+
+        # Chỉ tra ngưỡng nhóm ở dòng có nhóm (không có nhóm nào thì fences rỗng)
+        q1, q3 = np.full(len(values), q1), np.full(len(values), q3)
+        if has_group.any():
+            q1[has_group] = fences[0.25].to_numpy()[codes[has_group]]
+            q3[has_group] = fences[0.75].to_numpy()[codes[has_group]]
+
+    iqr = q3 - q1
+    lo = q1 - k * iqr
+    up = q3 + k * iqr
+
+    return df[(values >= lo) & (values <= up)].copy()
+
+
+# HÀM TÍNH NGƯỠNG IQR BẰNG SKETCH (MỘT LẦN DUYỆT)
+def sketch_iqr_fences(file_path: str, col: str = 'CompTotal', k: float = 1.5,
+                      chunksize: int = DEFAULT_CHUNK_SIZE, sketch_k: int = 200, seed: int = 0) -> tuple:
+    """
+    Tính ngưỡng IQR [lo, up] của cột lương trong một lần duyệt file gốc,
+    dùng KLLSketch thay cho np.percentile nên không cần giữ cả cột trong bộ nhớ.
+
+    Tham số:
+        file_path: Đường dẫn file CSV gốc
+        col: Tên cột cần lọc outlier (mặc định 'CompTotal')
+        k: Hệ số nhân IQR
+        chunksize: Số dòng mỗi chunk
+        sketch_k: Độ chính xác của sketch (xem KLLSketch)
+        seed: Seed của sketch
+
+    Trả về:
+        Tuple (lo, up)
+    """
+    sketch = KLLSketch(k=sketch_k, seed=seed)
+
+    for chunk in iter_raw_chunks(file_path, chunksize):
+        sketch.update(clean_chunk(chunk)[col].to_numpy())
+
+    q1, q3 = sketch.quantile([0.25, 0.75])
+    iqr = q3 - q1
+
+    return q1 - k * iqr, q3 + k * iqr
+
+
+# HÀM CLEANING HAI LẦN DUYỆT (CHO FILE LỚN HƠN RAM)
+def run_cleaning_two_pass(input_path: str, output_path: str,
+                          chunksize: int = DEFAULT_CHUNK_SIZE, iqr_k: float = 1.5,
+                          sketch_k: int = 200, compact_dtypes: bool = True) -> dict:
+    """
+    Làm sạch dữ liệu theo kiểu streaming hoàn toàn:
+    - Lần 1: duyệt file, ước lượng Q1/Q3 của CompTotal bằng sketch
+    - Lần 2: duyệt lại file, lọc outlier và ghi dần từng chunk ra file đầu ra
+
+    Bộ nhớ chỉ phụ thuộc chunksize, không phụ thuộc kích thước file.
+
+    Tham số:
+        input_path: Đường dẫn file CSV gốc
+        output_path: Đường dẫn file đầu ra (.parquet hoặc .csv)
+        chunksize: Số dòng mỗi chunk
+        iqr_k: Hệ số nhân IQR khi lọc outlier
+        sketch_k: Độ chính xác của sketch
+        compact_dtypes: True = chuyển kiểu theo schema.DTYPE_PLAN như run_cleaning;
+            kiểu được chốt ở chunk đầu tiên (fixed_dtype_plan) để mọi chunk cùng kiểu
+
+    Trả về:
+        Dictionary thông tin: {'lo', 'up', 'rows'}
+    """
+    lo, up = sketch_iqr_fences(input_path, k=iqr_k, chunksize=chunksize, sketch_k=sketch_k)
+
+    rows, plan = 0, None
+    with ChunkWriter(output_path, columns=selected_columns) as writer:
+        for chunk in iter_raw_chunks(input_path, chunksize):
+            df = clean_chunk(chunk)
+            df = df[(df['CompTotal'] >= lo) & (df['CompTotal'] <= up)]
+
+            if compact_dtypes:
+                plan = fixed_dtype_plan(df) if plan is None else plan
+                df = apply_dtype_plan(df, plan)
+
+            writer.write(df)
+            rows += len(df)
+
+    return {'lo': lo, 'up': up, 'rows': rows}
+
+
+# HÀM CHẠY TOÀN BỘ QUY TRÌNH CLEANING
+def run_cleaning(input_path: str, output_path: str,
+                 chunksize: int = DEFAULT_CHUNK_SIZE, iqr_k: float = 1.5,
+                 two_pass: bool = False, sketch_k: int = 200,
+                 outlier_group_by=None, compact_dtypes: bool = True) -> pd.DataFrame:
+    """
+    Hàm chính thực hiện toàn bộ quy trình làm sạch dữ liệu.
+
+    Các bước:
+    1. Đọc dữ liệu gốc theo từng chunk và làm sạch từng chunk
+    2. Lọc outlier lương bằng IQR
+    3. Lưu kết quả
+
+    Tham số:
+        input_path: Đường dẫn file CSV gốc (survey_results_public.csv)
+        output_path: Đường dẫn file đầu ra, định dạng theo đuôi file
+            (.parquet mặc định, .csv để xuất CSV; None = không ghi file)
+        chunksize: Số dòng mỗi chunk khi đọc (None = đọc một lần)
+        iqr_k: Hệ số nhân IQR khi lọc outlier
+        two_pass: True = dùng run_cleaning_two_pass (ngưỡng IQR xấp xỉ bằng
+            sketch, ghi file theo từng chunk, không trả về DataFrame)
+        sketch_k: Độ chính xác của sketch khi two_pass=True
+        outlier_group_by: Cột dùng để tính IQR theo nhóm (xem filter_outliers_iqr),
+            chưa hỗ trợ cùng two_pass
+        compact_dtypes: True = chuyển sang kiểu dữ liệu gọn nhẹ theo
+            schema.DTYPE_PLAN (cả khi two_pass=True)
+
+    Trả về:
+        DataFrame đã được làm sạch (None nếu two_pass=True)
+    """
+    if two_pass:
+        if outlier_group_by is not None:
+            raise ValueError("outlier_group_by chưa hỗ trợ ở chế độ two_pass")
+
+        run_cleaning_two_pass(input_path, output_path, chunksize=chunksize,
+                              iqr_k=iqr_k, sketch_k=sketch_k, compact_dtypes=compact_dtypes)
+        return None
+
+    # Bước 1: Đọc + làm sạch theo chunk
+    df = read_filtered_survey(input_path, chunksize=chunksize)
+
+    if compact_dtypes:
+        df = apply_dtype_plan(df)
+
+    # Bước 2: Lọc outlier
+    df_cleaned = filter_outliers_iqr(df, col='CompTotal', k=iqr_k, group_by=outlier_group_by)
+
+    # Bước 3: Lưu kết quả
+    if output_path is not None:
+        write_table(df_cleaned, output_path)
+
+    return df_cleaned
 
-# cột kinh nghiệm có      'Less than 1 year', chuyển nó thành 0 và ép kiểu số
-df['YearsCodePro'] = df['YearsCodePro'].replace('Less than 1 year', 0)
-df['YearsCodePro'] = pd.to_numeric(df['YearsCodePro'], errors='coerce')
 
-# ép kiểu lương sang số
-df['CompTotal'] = pd.to_numeric(df['CompTotal'], errors='coerce')
+def parse_args(argv=None):
+    """
+    Đọc tham số dòng lệnh cho bước cleaning.
+    """
+    parser = argparse.ArgumentParser(description='Làm sạch dữ liệu survey gốc')
+    parser.add_argument('--input', default='./data/raw/survey_results_public.csv',
+                        help='File CSV gốc')
+    parser.add_argument('--output', default='./data/processed/cleaned_developer_survey.parquet',
+                        help='File đầu ra (.parquet, .feather hoặc .csv)')
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help='Số dòng mỗi chunk (0 = đọc một lần)')
+    parser.add_argument('--iqr-k', type=float, default=1.5,
+                        help='Hệ số nhân IQR khi lọc outlier lương')
+    parser.add_argument('--two-pass', action='store_true',
+                        help='Lọc outlier bằng quantile sketch, ghi file theo từng chunk')
+    parser.add_argument('--sketch-k', type=int, default=200,
+                        help='Độ chính xác của quantile sketch (dùng với --two-pass)')
+    parser.add_argument('--outlier-group-by', nargs='+', default=None,
+                        help='Tính IQR theo nhóm, VD: --outlier-group-by ExperienceLevel')
+    parser.add_argument('--no-compact-dtypes', action='store_true',
+                        help='Giữ kiểu dữ liệu gốc, không áp dụng schema.DTYPE_PLAN')
 
-# Loại bỏ giá trị rỗng và lương không hợp lệ
-df = df.dropna(subset=['CompTotal', 'YearsCodePro', 'LanguageHaveWorkedWith'])
-df = df[df['CompTotal'] > 0]
+    return parser.parse_args(argv)
 
-# xác định nhóm thu nhập hợp lý bằng phương pháp iqr
-q1, q3 = np.percentile(df['CompTotal'], [25, 75])
-iqr = q3 - q1
-lo = q1 - 1.5 * iqr
-up = q3 + 1.5 * iqr
 
-df_cleaned = df[(df['CompTotal'] >= lo) &(df['CompTotal'] <= up)].copy()
 
+if __name__ == "__main__":
+    args = parse_args()
 
-# xuất dữ liệu sạch ra 
-output_path = './data/processed/cleaned_developer_survey.csv'
-df_cleaned.to_csv(output_path, index=False)
+    # Chạy cleaning
+    df = run_cleaning(
+        args.input,
+        args.output,
+        chunksize=args.chunksize or None,
+        iqr_k=args.iqr_k,
+        two_pass=args.two_pass,
+        sketch_k=args.sketch_k,
+        outlier_group_by=args.outlier_group_by,
+        compact_dtypes=not args.no_compact_dtypes
+    )
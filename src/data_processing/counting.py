@@ -0,0 +1,160 @@
+# counting.py - Bộ đếm trên mã số nguyên (np.bincount)
+# file này thay pd.crosstab / value_counts trên cột chuỗi bằng một kernel đếm:
+# 1. Mỗi chiều (cột) được mã hoá thành mã số nguyên (cột category dùng luôn mã category)
+# 2. Các chiều được gộp thành một chỉ số phẳng (np.ravel_multi_index)
+# 3. Đếm tất cả tổ hợp bằng một lần np.bincount
+# Kết quả (CountTable) cho số đếm, tỉ lệ % theo hàng và tổng (margins) với
+# số chiều bất kỳ.
+
+import numpy as np
+import pandas as pd
+
+
+def dimension_codes(values: pd.Series):
+    """
+    Mã số nguyên và nhãn của một cột; giá trị rỗng có mã -1.
+    Cột category giữ nguyên thứ tự category, cột khác sắp xếp theo nhãn.
+
+    Trả về:
+        Tuple (mảng mã, list nhãn)
+    """
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values.cat.codes.to_numpy(), list(values.cat.categories)
+
+    codes, labels = pd.factorize(values, sort=True)
+    return codes, list(labels)
+
+
+def bincount_codes(codes: list, shape: tuple) -> np.ndarray:
+    """
+    Kernel đếm: số dòng của mỗi tổ hợp mã.
+
+    Tham số:
+        codes: List mảng mã (mỗi chiều một mảng, cùng độ dài), mã -1 = rỗng
+        shape: Số nhãn của từng chiều
+
+    Trả về:
+        Mảng số đếm có kích thước shape (dòng có mã rỗng ở bất kỳ chiều nào bị bỏ qua)
+    """
+    valid = np.ones(len(codes[0]), dtype=bool)
+    for dim_codes in codes:
+        valid &= dim_codes >= 0
+
+    flat = np.ravel_multi_index([np.asarray(dim_codes)[valid] for dim_codes in codes], shape)
+
+    return np.bincount(flat, minlength=int(np.prod(shape))).reshape(shape)
+
+
+def row_percentages(counts: pd.DataFrame, decimals: int = 2) -> pd.DataFrame:
+    """
+    Tỉ lệ % theo hàng của bảng đếm (giống pd.crosstab(normalize='index') * 100),
+    bỏ các hàng/cột toàn 0.
+    """
+    counts = counts.loc[counts.sum(axis=1) > 0, counts.sum(axis=0) > 0]
+    return (counts.div(counts.sum(axis=1), axis=0) * 100).round(decimals)
+
+
+# BẢNG ĐẾM NHIỀU CHIỀU
+class CountTable:
+    """
+    Kết quả đếm theo một hoặc nhiều chiều.
+
+    Thuộc tính:
+        dims: Tên các chiều
+        labels: List nhãn của từng chiều
+        counts: Mảng số đếm, counts[i, j, ...] ứng với (labels[0][i], labels[1][j], ...)
+    """
+
+    def __init__(self, dims: list, labels: list, counts: np.ndarray):
+        self.dims = list(dims)
+        self.labels = [list(dim_labels) for dim_labels in labels]
+        self.counts = counts
+
+    @property
+    def total(self) -> int:
+        return int(self.counts.sum())
+
+    def _index(self, dims: list, labels: list) -> pd.Index:
+        if len(dims) == 1:
+            return pd.Index(labels[0], name=dims[0])
+        return pd.MultiIndex.from_product(labels, names=dims)
+
+    def series(self) -> pd.Series:
+        """
+        Số đếm của các tổ hợp có xuất hiện (index là nhãn, MultiIndex nếu nhiều chiều).
+        """
+        result = pd.Series(self.counts.ravel(), index=self._index(self.dims, self.labels), name='count')
+        return result[result > 0]
+
+    def value_counts(self, normalize: bool = False) -> pd.Series:
+        """
+        Giống value_counts(): số đếm (hoặc tỉ lệ) giảm dần, bằng nhau thì giữ
+        thứ tự nhãn.
+        """
+        result = self.series().sort_values(ascending=False, kind='stable')
+        if normalize:
+            result = result / self.total
+        return result
+
+    def frame(self, margins: bool = False, margins_name: str = 'Total') -> pd.DataFrame:
+        """
+        Bảng crosstab: chiều cuối là cột, các chiều còn lại là hàng (giống
+        pd.crosstab, chỉ gồm hàng/cột có xuất hiện).
+
+        Tham số:
+            margins: True = thêm hàng và cột tổng
+            margins_name: Nhãn của hàng/cột tổng
+        """
+        if len(self.dims) < 2:
+            raise ValueError("frame() cần ít nhất 2 chiều, dùng series() cho 1 chiều")
+
+        matrix = self.counts.reshape(-1, self.counts.shape[-1])
+        table = pd.DataFrame(matrix, index=self._index(self.dims[:-1], self.labels[:-1]),
+                             columns=pd.Index(self.labels[-1], name=self.dims[-1]))
+        table = table.loc[table.sum(axis=1) > 0, table.sum(axis=0) > 0]
+
+        if margins:
+            table[margins_name] = table.sum(axis=1)
+            total_row = table.sum(axis=0)
+            if isinstance(table.index, pd.MultiIndex):
+                key = (margins_name,) + ('',) * (table.index.nlevels - 1)
+            else:
+                key = margins_name
+            table.loc[key] = total_row
+
+        return table
+
+    def percentages(self, margins: bool = False, margins_name: str = 'Total', decimals: int = 2) -> pd.DataFrame:
+        """
+        Tỉ lệ % theo hàng (mỗi hàng tổng = 100%). Với margins=True, hàng tổng
+        là phân bố chung của cột.
+        """
+        table = self.frame(margins=margins, margins_name=margins_name)
+        if margins:
+            table = table.drop(columns=margins_name)
+
+        return row_percentages(table, decimals)
+
+
+# HÀM ĐẾM
+def count_codes(df: pd.DataFrame, dims: list) -> CountTable:
+    """
+    Đếm số dòng theo mọi tổ hợp giá trị của các cột dims bằng một lần
+    np.bincount (dòng có giá trị rỗng ở bất kỳ cột nào bị bỏ qua).
+
+    Tham số:
+        df: DataFrame
+        dims: List cột (VD: ['ExperienceLevel', 'RemoteWork'])
+
+    Trả về:
+        CountTable
+    """
+    codes, labels = [], []
+    for dim in dims:
+        dim_codes, dim_labels = dimension_codes(df[dim])
+        codes.append(dim_codes)
+        labels.append(dim_labels)
+
+    counts = bincount_codes(codes, tuple(len(dim_labels) for dim_labels in labels))
+
+    return CountTable(dims, labels, counts)
@@ -0,0 +1,449 @@
+# cube.py - Cube OLAP tính sẵn trên các chiều của respondent
+# file này tổng hợp bảng respondent một lần theo mọi tổ hợp giá trị của các
+# chiều (ExperienceLevel, RemoteWork, AISelect, tuỳ chọn Age, và DevType):
+# 1. Mỗi ô (cell) lưu số dòng và count/sum/M2/min/max của CompTotal
+# 2. Lương của từng ô được lưu dạng tóm tắt để tính median khi roll-up: mặc
+#    định KLLSketch (bộ nhớ theo số ô, không theo số dòng), hoặc mọi giá trị
+#    đã sắp xếp (median chính xác, bộ nhớ O(số dòng))
+# 3. Mọi phép slice / roll-up (crosstab, thống kê lương theo nhóm) được trả
+#    lời từ các ô, không cần duyệt lại dữ liệu gốc
+#
+# DevType là cột multi-select nên có hai cuboid:
+# - 'respondent': mỗi respondent một dòng, không có chiều DevType
+# - 'devtype': mỗi cặp (respondent, DevType) một dòng, có thêm chiều DevType
+# Truy vấn có dùng DevType đọc cuboid 'devtype', các truy vấn khác đọc
+# cuboid 'respondent' (để không đếm một respondent nhiều lần).
+
+import numpy as np
+import pandas as pd
+
+from counting import dimension_codes
+from encoding import encode_multi_select
+from sketches import KLLSketch
+from storage import check_fingerprint
+
+
+# Các chiều mặc định của cube (thêm 'Age' nếu cần)
+CUBE_DIMENSIONS = ['ExperienceLevel', 'RemoteWork', 'AISelect']
+MULTI_DIMENSION = 'DevType'
+SALARY_COLUMN = 'CompTotal'
+
+MEASURES = ['Count', 'CompCount', 'CompSum', 'CompM2', 'CompMin', 'CompMax']
+
+# Độ chính xác mặc định của KLLSketch trong mỗi ô (ô ít hơn khoảng k giá trị vẫn chính xác)
+DEFAULT_SKETCH_K = 200
+
+
+def _salary_summary(cell_ids: np.ndarray, salary: np.ndarray, n_cells: int, sketch_k: int = None):
+    """
+    Tóm tắt lương của từng ô: (items, weights, offsets), ô c gồm
+    items[offsets[c]:offsets[c + 1]] với trọng số tương ứng.
+
+    sketch_k=None: giữ mọi giá trị (đã sắp xếp), median chính xác.
+    sketch_k=k: mỗi ô là một KLLSketch(k), bộ nhớ O(k) mỗi ô.
+    """
+    order = np.lexsort((salary, cell_ids))
+    cell_ids, salary = cell_ids[order], salary[order]
+    offsets = np.concatenate([[0], np.cumsum(np.bincount(cell_ids, minlength=n_cells))])
+
+    if sketch_k is None:
+        return salary, np.ones(len(salary), dtype=np.uint32), offsets
+
+    items, weights, sizes = [], [], []
+    for c in range(n_cells):
+        sketch = KLLSketch(k=sketch_k, seed=0).update(salary[offsets[c]:offsets[c + 1]])
+        for level, level_items in enumerate(sketch.levels):
+            items.append(level_items)
+            weights.append(np.full(len(level_items), 2 ** level, dtype=np.uint32))
+        sizes.append(sum(len(level_items) for level_items in sketch.levels))
+
+    offsets = np.concatenate([[0], np.cumsum(sizes)]).astype(np.int64)
+    if not items:
+        return np.empty(0), np.empty(0, dtype=np.uint32), offsets
+
+    return np.concatenate(items), np.concatenate(weights), offsets
+
+
+def _weighted_quantile(items: np.ndarray, weights: np.ndarray, q: float) -> float:
+    """
+    Quantile của tập giá trị có trọng số (trọng số đều 1 -> np.percentile).
+    """
+    if len(items) == 0:
+        return np.nan
+
+    if np.all(weights == 1):
+        return float(np.percentile(items, q * 100))
+
+    order = np.argsort(items, kind='stable')
+    cum_weights = np.cumsum(weights[order], dtype=float)
+    idx = min(np.searchsorted(cum_weights, q * cum_weights[-1], side='left'), len(items) - 1)
+
+    return float(items[order][idx])
+
+
+def _split_groups(positions: np.ndarray, group_ids: np.ndarray, n_groups: int) -> list:
+    """
+    Tách vị trí ô thành từng nhóm theo group_ids.
+    """
+    if n_groups == 0:
+        return []
+
+    order = np.argsort(group_ids, kind='stable')
+    return np.split(positions[order], np.cumsum(np.bincount(group_ids, minlength=n_groups))[:-1])
+
+
+# MỘT CUBOID: CÁC Ô Ở MỨC CHI TIẾT NHẤT
+class Cuboid:
+    """
+    Các ô của cube ở mức chi tiết nhất.
+
+    Thuộc tính:
+        dimensions: Tên các chiều
+        cells: DataFrame, mỗi dòng là một ô: mã các chiều (-1 = rỗng) + MEASURES
+        items, weights, offsets: Tóm tắt lương của từng ô (xem _salary_summary)
+    """
+
+    def __init__(self, dimensions: list, cells: pd.DataFrame, items, weights, offsets):
+        self.dimensions = list(dimensions)
+        self.cells = cells
+        self.items = np.asarray(items)
+        self.weights = np.asarray(weights)
+        self.offsets = np.asarray(offsets)
+
+    @classmethod
+    def build(cls, codes: dict, salary: np.ndarray, sketch_k: int = None) -> "Cuboid":
+        """
+        Tổng hợp các dòng thành ô.
+
+        Tham số:
+            codes: Dictionary {chiều: mảng mã số nguyên, mỗi dòng một mã}
+            salary: Mảng lương cùng độ dài (NaN = không có lương)
+            sketch_k: Xem _salary_summary
+        """
+        dimensions = list(codes)
+        stacked = np.column_stack([codes[dim] for dim in dimensions]) if dimensions else np.zeros((len(salary), 0))
+        keys, cell_ids = np.unique(stacked, axis=0, return_inverse=True)
+        cell_ids = cell_ids.ravel()
+        n_cells = len(keys)
+
+        valid = ~np.isnan(salary)
+        valid_ids, valid_salary = cell_ids[valid], salary[valid]
+
+        comp_count = np.bincount(valid_ids, minlength=n_cells)
+        comp_sum = np.bincount(valid_ids, weights=valid_salary, minlength=n_cells)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            comp_mean = comp_sum / comp_count
+        comp_m2 = np.bincount(valid_ids, weights=(valid_salary - comp_mean[valid_ids]) ** 2, minlength=n_cells)
+
+        comp_min = np.full(n_cells, np.nan)
+        comp_max = np.full(n_cells, np.nan)
+        np.fmin.at(comp_min, valid_ids, valid_salary)
+        np.fmax.at(comp_max, valid_ids, valid_salary)
+
+        cells = pd.DataFrame({dim: keys[:, i].astype(np.int16) for i, dim in enumerate(dimensions)})
+        cells['Count'] = np.bincount(cell_ids, minlength=n_cells).astype(np.int32)
+        cells['CompCount'] = comp_count.astype(np.int32)
+        cells['CompSum'] = comp_sum
+        cells['CompM2'] = comp_m2
+        cells['CompMin'] = comp_min
+        cells['CompMax'] = comp_max
+
+        items, weights, offsets = _salary_summary(valid_ids, valid_salary, n_cells, sketch_k)
+
+        # Lưu lương dạng float32 nếu không mất giá trị
+        if np.array_equal(items.astype(np.float32).astype(float), items):
+            items = items.astype(np.float32)
+
+        return cls(dimensions, cells, items, weights, offsets)
+
+    def select(self, filters: dict) -> np.ndarray:
+        """
+        Vị trí các ô thoả điều kiện filters {chiều: list mã}.
+        """
+        mask = np.ones(len(self.cells), dtype=bool)
+        for dim, codes in filters.items():
+            mask &= self.cells[dim].isin(codes).to_numpy()
+
+        return np.flatnonzero(mask)
+
+    def quantile(self, positions, q: float) -> float:
+        """
+        Quantile lương của tập ô (theo vị trí dòng trong cells).
+        """
+        slices = [slice(self.offsets[c], self.offsets[c + 1]) for c in positions]
+        if not slices:
+            return np.nan
+
+        items = np.concatenate([self.items[s] for s in slices]).astype(float)
+        weights = np.concatenate([self.weights[s] for s in slices])
+
+        return _weighted_quantile(items, weights, q)
+
+    def salary_values(self, positions) -> np.ndarray:
+        """
+        Lương của tập ô, đã sắp xếp (ô lưu dạng sketch: mỗi phần tử lặp lại
+        theo trọng số).
+        """
+        slices = [slice(self.offsets[c], self.offsets[c + 1]) for c in positions]
+        if not slices:
+            return np.empty(0)
+
+        items = np.concatenate([self.items[s] for s in slices]).astype(float)
+        weights = np.concatenate([self.weights[s] for s in slices])
+
+        return np.sort(np.repeat(items, weights))
+
+
+# CUBE
+class SurveyCube:
+    """
+    Cube OLAP trên bảng respondent (xem đầu file).
+
+    Thuộc tính:
+        labels: Dictionary {chiều: list nhãn}, mã i ứng với labels[chiều][i]
+        cuboids: Dictionary {'respondent': Cuboid, 'devtype': Cuboid}
+        salary_dtype: Kiểu của cột lương gốc, min/max trả về cùng kiểu này
+            (mean, std và quantile luôn là float64)
+    """
+
+    def __init__(self, labels: dict, cuboids: dict, salary_dtype: str = 'float64'):
+        self.labels = labels
+        self.cuboids = cuboids
+        self.salary_dtype = salary_dtype
+
+    @property
+    def dimensions(self) -> list:
+        return list(self.labels)
+
+    @property
+    def exact(self) -> bool:
+        """
+        True nếu mọi ô còn giữ đủ giá trị lương (chưa ô nào bị sketch nén),
+        khi đó median / quantile / salary_values là chính xác.
+        """
+        return all(bool(np.all(cuboid.weights == 1)) for cuboid in self.cuboids.values())
+
+    def _cuboid(self, dims) -> Cuboid:
+        if MULTI_DIMENSION in dims:
+            if 'devtype' not in self.cuboids:
+                raise ValueError(f"Cube không có chiều '{MULTI_DIMENSION}'")
+            return self.cuboids['devtype']
+        return self.cuboids['respondent']
+
+    def _filter_codes(self, filters: dict) -> dict:
+        codes = {}
+        for dim, values in (filters or {}).items():
+            if dim not in self.labels:
+                raise ValueError(f"Cube không có chiều '{dim}'")
+
+            values = [values] if isinstance(values, str) or np.isscalar(values) else list(values)
+            index = {label: i for i, label in enumerate(self.labels[dim])}
+            codes[dim] = [index[v] for v in values if v in index]
+
+        return codes
+
+    def _group_cells(self, dims: list, filters: dict):
+        """
+        Các ô thoả filters và nhóm của chúng theo dims (bỏ ô có mã rỗng ở dims).
+        Chỉ gồm các nhóm có ít nhất một ô: filters không khớp ô nào thì không có nhóm nào.
+
+        Trả về:
+            Tuple (cuboid, vị trí ô, DataFrame ô, mảng mã của từng nhóm, mảng nhóm của từng ô)
+        """
+        filters = filters or {}
+        for dim in dims:
+            if dim not in self.labels:
+                raise ValueError(f"Cube không có chiều '{dim}'")
+
+        cuboid = self._cuboid(dims + list(filters))
+        positions = cuboid.select(self._filter_codes(filters))
+        cells = cuboid.cells.iloc[positions]
+
+        if dims:
+            keep = (cells[dims] >= 0).all(axis=1).to_numpy()
+            positions, cells = positions[keep], cells[keep]
+            keys, group_ids = np.unique(cells[dims].to_numpy(), axis=0, return_inverse=True)
+            group_ids = group_ids.ravel()
+        else:
+            # Không có chiều nào: một nhóm tổng (nếu còn ô)
+            keys, group_ids = np.zeros((int(len(cells) > 0), 0), dtype=int), np.zeros(len(cells), dtype=int)
+
+        return cuboid, positions, cells, keys, group_ids
+
+    # HÀM TRUY VẤN CHÍNH: ROLL-UP THEO CÁC CHIỀU
+    def aggregate(self, dims: list, filters: dict = None, quantiles: list = None) -> pd.DataFrame:
+        """
+        Roll-up cube theo các chiều dims (cộng dồn các chiều còn lại) sau khi
+        lọc theo filters. Giá trị rỗng của các chiều trong dims/filters bị bỏ
+        qua (giống groupby / crosstab).
+
+        Tham số:
+            dims: List chiều cần giữ (VD: ['ExperienceLevel', 'RemoteWork'])
+            filters: Dictionary {chiều: giá trị hoặc list giá trị}
+                (VD: {'AISelect': 'Using AI'})
+            quantiles: List mức quantile của lương cần tính (VD: [0.5])
+
+        Trả về:
+            DataFrame: các cột dims (category theo thứ tự nhãn của cube) và
+            Count, CompCount, CompMean, CompStd, CompMin, CompMax,
+            CompQ<mức> (VD: CompQ50), sắp xếp theo thứ tự nhãn
+        """
+        dims = list(dims)
+        cuboid, positions, cells, keys, group_ids = self._group_cells(dims, filters)
+        n_groups = len(keys)
+
+        def total(col):
+            return np.bincount(group_ids, weights=cells[col].to_numpy(dtype=float), minlength=n_groups)
+
+        # Cộng dồn count/sum, gộp M2 theo công thức Chan
+        comp_count = total('CompCount')
+        with np.errstate(invalid='ignore', divide='ignore'):
+            cell_mean = (cells['CompSum'] / cells['CompCount']).to_numpy()
+            group_mean = total('CompSum') / comp_count
+
+        spread = cells['CompCount'].to_numpy() * (cell_mean - group_mean[group_ids]) ** 2
+        comp_m2 = total('CompM2') + np.bincount(group_ids, weights=np.nan_to_num(spread), minlength=n_groups)
+
+        comp_min = np.full(n_groups, np.nan)
+        comp_max = np.full(n_groups, np.nan)
+        np.fmin.at(comp_min, group_ids, cells['CompMin'].to_numpy())
+        np.fmax.at(comp_max, group_ids, cells['CompMax'].to_numpy())
+
+        result = pd.DataFrame({
+            dim: pd.Categorical.from_codes(keys[:, i], categories=self.labels[dim])
+            for i, dim in enumerate(dims)
+        })
+        result['Count'] = total('Count').astype(np.int64)
+        result['CompCount'] = comp_count.astype(np.int64)
+        result['CompMean'] = group_mean
+        with np.errstate(invalid='ignore', divide='ignore'):
+            result['CompStd'] = np.where(comp_count > 1, np.sqrt(comp_m2 / (comp_count - 1)), np.nan)
+        result['CompMin'] = comp_min
+        result['CompMax'] = comp_max
+
+        # Quantile: gộp tóm tắt lương của các ô trong từng nhóm
+        if quantiles:
+            groups = _split_groups(positions, group_ids, n_groups)
+
+            for q in quantiles:
+                result[f'CompQ{q * 100:g}'] = [cuboid.quantile(group, q) for group in groups]
+
+        # Min/max là giá trị gốc nên giữ kiểu cột lương, mean/std/quantile là float64
+        result[['CompMin', 'CompMax']] = result[['CompMin', 'CompMax']].astype(self.salary_dtype)
+
+        return result
+
+    def salary_values(self, dims: list, filters: dict = None) -> list:
+        """
+        Lương đã sắp xếp của từng nhóm, cùng thứ tự dòng với aggregate(dims, filters)
+        (dùng cho bootstrap).
+        """
+        cuboid, positions, cells, keys, group_ids = self._group_cells(list(dims), filters)
+        return [cuboid.salary_values(group) for group in _split_groups(positions, group_ids, len(keys))]
+
+    def counts(self, dim: str, filters: dict = None) -> pd.Series:
+        """
+        Số dòng theo từng giá trị của một chiều (theo thứ tự nhãn của cube).
+        """
+        table = self.aggregate([dim], filters)
+        return pd.Series(table['Count'].to_numpy(), index=pd.Index(table[dim].astype(object), name=dim),
+                         name='count')
+
+    def crosstab(self, row: str, col: str, filters: dict = None) -> pd.DataFrame:
+        """
+        Bảng đếm row x col (tương đương pd.crosstab), chỉ gồm các giá trị có xuất hiện.
+        """
+        table = self.aggregate([row, col], filters)
+        table = table.pivot_table(index=row, columns=col, values='Count', aggfunc='sum',
+                                  fill_value=0, observed=True)
+        table.index = pd.Index(table.index.astype(object), name=row)
+        table.columns = pd.Index(table.columns.astype(object), name=col)
+
+        return table
+
+
+# HÀM XÂY DỰNG CUBE
+def build_cube(df: pd.DataFrame, dimensions: list = None, sketch_k: int = DEFAULT_SKETCH_K) -> SurveyCube:
+    """
+    Tổng hợp bảng respondent (đã transform) thành SurveyCube.
+
+    Tham số:
+        df: DataFrame respondent
+        dimensions: Các chiều đơn (mặc định CUBE_DIMENSIONS, thêm 'Age' nếu
+            cần; chiều không có trong df được bỏ qua). DevType được thêm vào
+            cuboid 'devtype' nếu df có cột này.
+        sketch_k: k = tóm tắt mỗi ô bằng KLLSketch(k) (mặc định DEFAULT_SKETCH_K,
+            bộ nhớ giới hạn theo số ô, median xấp xỉ khi ô bị nén, xem SurveyCube.exact),
+            None = lưu mọi giá trị lương (median chính xác, bộ nhớ O(số dòng))
+
+    Trả về:
+        SurveyCube
+    """
+    dimensions = [dim for dim in (dimensions or CUBE_DIMENSIONS) if dim in df.columns]
+    salary = df[SALARY_COLUMN].to_numpy(dtype=float, na_value=np.nan)
+    salary_dtype = 'float32' if df[SALARY_COLUMN].dtype == np.float32 else 'float64'
+
+    labels, codes = {}, {}
+    for dim in dimensions:
+        codes[dim], labels[dim] = dimension_codes(df[dim])
+
+    cuboids = {'respondent': Cuboid.build(codes, salary, sketch_k)}
+
+    if MULTI_DIMENSION in df.columns:
+        # Mỗi cặp (respondent, DevType) là một dòng (nhãn theo thứ tự xuất hiện đầu tiên)
+        enc = encode_multi_select(df[MULTI_DIMENSION])
+        rows, tokens = enc.matrix.nonzero()
+
+        labels[MULTI_DIMENSION] = enc.vocabulary
+        pair_codes = {dim: codes[dim][rows] for dim in dimensions}
+        pair_codes[MULTI_DIMENSION] = tokens
+        cuboids['devtype'] = Cuboid.build(pair_codes, salary[rows], sketch_k)
+
+    return SurveyCube(labels, cuboids, salary_dtype)
+
+
+# HÀM LƯU / ĐỌC CUBE
+def save_cube(cube: SurveyCube, path: str, fingerprint: str = None):
+    """
+    Lưu cube vào một file .npz (mã các chiều int16, đếm int32, lương float32 nếu được),
+    kèm dấu vân tay của bảng respondent (storage.table_fingerprint) nếu có.
+    """
+    arrays = {f'labels.{dim}': np.asarray(labels, dtype=str) for dim, labels in cube.labels.items()}
+    arrays['salary_dtype'] = np.asarray(cube.salary_dtype)
+    if fingerprint is not None:
+        arrays['fingerprint'] = np.asarray(fingerprint)
+
+    for name, cuboid in cube.cuboids.items():
+        arrays[f'{name}.dimensions'] = np.asarray(cuboid.dimensions, dtype=str)
+        for col in cuboid.cells.columns:
+            arrays[f'{name}.cells.{col}'] = cuboid.cells[col].to_numpy()
+        arrays[f'{name}.items'] = cuboid.items
+        arrays[f'{name}.weights'] = cuboid.weights
+        arrays[f'{name}.offsets'] = cuboid.offsets
+
+    np.savez_compressed(path, **arrays)
+
+
+def load_cube(path: str, fingerprint: str = None) -> SurveyCube:
+    """
+    Đọc cube đã lưu bằng save_cube. Báo lỗi nếu fingerprint (dấu vân tay của
+    bảng đang dùng) khác với dấu vân tay lưu trong file.
+    """
+    with np.load(path) as data:
+        check_fingerprint(str(data['fingerprint']) if 'fingerprint' in data.files else None, fingerprint, path)
+        labels = {key.split('.', 1)[1]: data[key].tolist() for key in data.files if key.startswith('labels.')}
+        names = sorted({key.split('.', 1)[0] for key in data.files if '.' in key and not key.startswith('labels.')})
+        salary_dtype = str(data['salary_dtype'])
+
+        cuboids = {}
+        for name in names:
+            dimensions = data[f'{name}.dimensions'].tolist()
+            cells = pd.DataFrame({col: data[f'{name}.cells.{col}'] for col in dimensions + MEASURES})
+            cuboids[name] = Cuboid(dimensions, cells, data[f'{name}.items'],
+                                   data[f'{name}.weights'], data[f'{name}.offsets'])
+
+    # Giữ thứ tự chiều: các chiều đơn trước, DevType sau
+    order = cuboids['devtype'].dimensions if 'devtype' in cuboids else cuboids['respondent'].dimensions
+    labels = {dim: labels[dim] for dim in order}
+
+    return SurveyCube(labels, cuboids, salary_dtype)
@@ -0,0 +1,211 @@
+# encoding.py - Mã hoá multi-hot cho các cột multi-select
+# file này mã hoá các cột multi-select (LanguageHaveWorkedWith, DevType,
+# Frustration) một lần duy nhất thành:
+# 1. Bộ từ vựng (vocabulary): danh sách các giá trị riêng lẻ (token)
+# 2. Ma trận thưa CSR respondent x token (1 = developer đã chọn token đó)
+# thay cho việc split + explode làm tăng số dòng. Các phép đếm, crosstab và
+# co-occurrence trở thành phép toán trên ma trận thưa.
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from counting import bincount_codes, dimension_codes
+from storage import check_fingerprint
+
+
+# Các cột multi-select được mã hoá mặc định
+MULTI_SELECT_COLUMNS = ['LanguageHaveWorkedWith', 'DevType', 'Frustration']
+
+
+# KẾT QUẢ MÃ HOÁ MULTI-HOT CỦA MỘT CỘT
+class MultiHotEncoding:
+    """
+    Mã hoá multi-hot của một cột multi-select.
+
+    Dòng i của matrix ứng với dòng thứ i (theo vị trí) của bảng respondent
+    dùng để mã hoá, cột j ứng với vocabulary[j].
+
+    Thuộc tính:
+        column: Tên cột gốc
+        vocabulary: List token, theo thứ tự xuất hiện đầu tiên trong dữ liệu
+        matrix: scipy.sparse.csr_matrix (số respondent x số token), giá trị 0/1
+    """
+
+    def __init__(self, column: str, vocabulary, matrix):
+        self.column = column
+        self.vocabulary = list(vocabulary)
+        self.matrix = sparse.csr_matrix(matrix)
+        self._token_index = {token: i for i, token in enumerate(self.vocabulary)}
+
+    @property
+    def n_respondents(self) -> int:
+        return self.matrix.shape[0]
+
+    @property
+    def n_tokens(self) -> int:
+        return self.matrix.shape[1]
+
+    def token_mask(self, token: str) -> np.ndarray:
+        """
+        Mảng bool: respondent nào đã chọn token này.
+        """
+        mask = np.zeros(self.n_respondents, dtype=bool)
+        j = self._token_index.get(token)
+
+        if j is not None:
+            mask[self.matrix[:, j].nonzero()[0]] = True
+
+        return mask
+
+    def _row_ids(self) -> np.ndarray:
+        # Số thứ tự respondent của từng phần tử khác 0 trong ma trận CSR
+        return np.repeat(np.arange(self.n_respondents), np.diff(self.matrix.indptr))
+
+    def counts(self) -> pd.Series:
+        """
+        Số respondent chọn mỗi token (tương đương explode + value_counts),
+        sắp xếp giảm dần (bằng nhau thì giữ thứ tự xuất hiện).
+        """
+        counts = np.bincount(self.matrix.indices, minlength=self.n_tokens)
+        order = np.argsort(-counts, kind='stable')
+
+        return pd.Series(counts[order], index=pd.Index(np.asarray(self.vocabulary, dtype=object)[order],
+                                                        name=self.column), name='count')
+
+    def crosstab(self, values: pd.Series) -> pd.DataFrame:
+        """
+        Bảng đếm token x giá trị của một cột đơn (VD: RemoteWork), tính bằng
+        np.bincount trên cặp (mã token, mã giá trị) thay cho explode + pd.crosstab.
+
+        Tham số:
+            values: Series cùng số dòng (cùng thứ tự) với bảng đã mã hoá
+
+        Trả về:
+            DataFrame đếm, index là token, cột là các giá trị của values
+        """
+        codes, labels = dimension_codes(values)
+        table = bincount_codes([self.matrix.indices, codes[self._row_ids()]], (self.n_tokens, len(labels)))
+
+        return pd.DataFrame(table, index=pd.Index(self.vocabulary, name=self.column),
+                            columns=pd.Index(labels, name=values.name))
+
+    def cooccurrence(self, other: "MultiHotEncoding") -> pd.DataFrame:
+        """
+        Ma trận đồng xuất hiện token của cột này x token của cột khác
+        (VD: DevType x LanguageHaveWorkedWith): ô (a, b) là số respondent
+        chọn cả a và b.
+        """
+        table = (self.matrix.T @ other.matrix).toarray()
+
+        return pd.DataFrame(table, index=pd.Index(self.vocabulary, name=self.column),
+                            columns=pd.Index(other.vocabulary, name=other.column))
+
+
+# HÀM MÃ HOÁ MỘT CỘT MULTI-SELECT
+def encode_multi_select(series: pd.Series, sep: str = ';') -> MultiHotEncoding:
+    """
+    Mã hoá một cột multi-select thành MultiHotEncoding.
+
+    Chỉ các tổ hợp giá trị khác nhau được split (thay vì split từng dòng),
+    sau đó mỗi dòng lấy lại hàng tương ứng của tổ hợp đó.
+
+    Tham số:
+        series: Cột multi-select (VD: df['LanguageHaveWorkedWith'])
+        sep: Ký tự phân cách (mặc định ';')
+
+    Trả về:
+        MultiHotEncoding
+    """
+    # Bước 1: Mã hoá các tổ hợp khác nhau theo thứ tự xuất hiện
+    combo_codes, combos = pd.factorize(series, sort=False)
+    combos = pd.Series(np.asarray(combos, dtype=object))
+
+    # Bước 2: Split + strip chỉ trên các tổ hợp
+    tokens = combos.str.split(sep).explode().str.strip()
+    tokens = tokens[tokens.notna() & (tokens != '')]
+    token_codes, vocabulary = pd.factorize(tokens, sort=False)
+
+    # Bước 3: Ma trận tổ hợp x token, thêm một dòng rỗng cho giá trị NaN
+    n_combos, n_tokens = len(combos), len(vocabulary)
+    combo_matrix = sparse.csr_matrix(
+        (np.ones(len(token_codes), dtype=np.int32), (tokens.index.to_numpy(), token_codes)),
+        shape=(n_combos + 1, n_tokens)
+    )
+    # Token lặp lại trong cùng một dòng chỉ tính một lần
+    combo_matrix.data[:] = 1
+
+    # Bước 4: Mỗi respondent lấy hàng của tổ hợp tương ứng
+    row_codes = np.where(combo_codes >= 0, combo_codes, n_combos)
+    matrix = combo_matrix[row_codes]
+
+    return MultiHotEncoding(series.name, [str(token) for token in vocabulary], matrix)
+
+
+# HÀM MÃ HOÁ TẤT CẢ CÁC CỘT MULTI-SELECT
+def encode_survey(df: pd.DataFrame, columns: list = None, sep: str = ';') -> dict:
+    """
+    Mã hoá các cột multi-select của bảng respondent.
+
+    Tham số:
+        df: DataFrame respondent (đã transform)
+        columns: Các cột cần mã hoá (mặc định MULTI_SELECT_COLUMNS, bỏ qua cột không có)
+
+    Trả về:
+        Dictionary {tên cột: MultiHotEncoding}
+    """
+    columns = MULTI_SELECT_COLUMNS if columns is None else columns
+
+    return {col: encode_multi_select(df[col], sep=sep) for col in columns if col in df.columns}
+
+
+# HÀM LƯU / ĐỌC MÃ HOÁ
+def save_multi_hot(encodings: dict, path: str, fingerprint: str = None):
+    """
+    Lưu các MultiHotEncoding vào một file .npz (lưu cạnh bảng respondent,
+    thứ tự dòng trùng với bảng respondent được lưu cùng lúc).
+
+    Tham số:
+        encodings: Dictionary {tên cột: MultiHotEncoding}
+        path: File .npz
+        fingerprint: Dấu vân tay của bảng respondent (storage.table_fingerprint)
+    """
+    arrays = {}
+    if fingerprint is not None:
+        arrays['fingerprint'] = np.asarray(fingerprint)
+    for col, enc in encodings.items():
+        arrays[f'{col}.indptr'] = enc.matrix.indptr
+        arrays[f'{col}.indices'] = enc.matrix.indices
+        arrays[f'{col}.shape'] = np.asarray(enc.matrix.shape)
+        arrays[f'{col}.vocabulary'] = np.asarray(enc.vocabulary, dtype=str)
+
+    np.savez_compressed(path, **arrays)
+
+
+def load_multi_hot(path: str, fingerprint: str = None) -> dict:
+    """
+    Đọc các MultiHotEncoding đã lưu bằng save_multi_hot.
+
+    Tham số:
+        path: File .npz
+        fingerprint: Dấu vân tay của bảng respondent đang dùng, báo lỗi nếu
+            file được build từ bảng khác (None = không kiểm tra)
+
+    Trả về:
+        Dictionary {tên cột: MultiHotEncoding}
+    """
+    encodings = {}
+
+    with np.load(path) as data:
+        check_fingerprint(str(data['fingerprint']) if 'fingerprint' in data.files else None, fingerprint, path)
+        columns = sorted({key.rsplit('.', 1)[0] for key in data.files if key != 'fingerprint'})
+
+        for col in columns:
+            indices = data[f'{col}.indices']
+            matrix = sparse.csr_matrix(
+                (np.ones(len(indices), dtype=np.int32), indices, data[f'{col}.indptr']),
+                shape=tuple(data[f'{col}.shape'])
+            )
+            encodings[col] = MultiHotEncoding(col, data[f'{col}.vocabulary'].tolist(), matrix)
+
+    return encodings
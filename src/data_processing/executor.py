@@ -0,0 +1,151 @@
+# executor.py - Chạy các bước xử lý dạng DAG song song
+# file này cung cấp một executor đơn giản:
+# 1. Mỗi bước là một Node gồm hàm, danh sách input (tên node khác hoặc giá trị
+#    khởi tạo) và tham số
+# 2. Các node không phụ thuộc nhau được chạy đồng thời trong thread pool
+#    hoặc process pool (số worker cấu hình được)
+# 3. Ghi lại thời gian chạy từng node và tìm đường găng (critical path)
+
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+import pandas as pd
+
+
+class Node:
+    """
+    Một bước trong DAG.
+
+    Tham số:
+        name: Tên node (cũng là tên kết quả của node)
+        func: Hàm được gọi là func(*[giá trị của từng input], **kwargs)
+        inputs: List tên các node/giá trị khởi tạo làm input
+        kwargs: Tham số thêm cho func
+    """
+
+    def __init__(self, name: str, func, inputs=(), kwargs: dict = None):
+        self.name = name
+        self.func = func
+        self.inputs = list(inputs)
+        self.kwargs = kwargs or {}
+
+    def __repr__(self):
+        return f"Node({self.name!r}, inputs={self.inputs})"
+
+
+def _timed_call(func, args, kwargs):
+    """
+    Gọi hàm trong worker, trả về kết quả kèm thời điểm bắt đầu/kết thúc.
+    """
+    start = time.time()
+    result = func(*args, **kwargs)
+    end = time.time()
+    worker = f"{os.getpid()}:{threading.current_thread().name}"
+
+    return result, start, end, worker
+
+
+# HÀM CHẠY DAG
+def run_dag(nodes: list, values: dict = None, max_workers: int = 4, mode: str = 'thread') -> tuple:
+    """
+    Chạy các node theo thứ tự phụ thuộc, node nào đủ input thì được đưa
+    vào pool ngay, nên các node độc lập chạy đồng thời.
+
+    Tham số:
+        nodes: List các Node
+        values: Dictionary các giá trị khởi tạo {tên: giá trị} (VD: {'df': df})
+        max_workers: Số worker tối đa
+        mode: 'thread' (dùng chung bộ nhớ) hoặc 'process' (input/kết quả
+            được pickle qua lại, hàm phải định nghĩa ở cấp module)
+
+    Trả về:
+        Tuple (values, timings):
+        - values: Dictionary giá trị khởi tạo + kết quả của mọi node
+        - timings: DataFrame các cột Node, Start, End, Seconds, Worker
+          (Start/End tính bằng giây từ lúc bắt đầu chạy)
+    """
+    values = dict(values or {})
+    pending = {node.name: node for node in nodes}
+
+    # Kiểm tra input hợp lệ
+    known = set(values) | set(pending)
+    for node in nodes:
+        missing = [name for name in node.inputs if name not in known]
+        if missing:
+            raise ValueError(f"Node '{node.name}' có input không tồn tại: {missing}")
+
+    if mode == 'thread':
+        pool_class = ThreadPoolExecutor
+    elif mode == 'process':
+        pool_class = ProcessPoolExecutor
+    else:
+        raise ValueError("mode phải là 'thread' hoặc 'process'")
+
+    timings = []
+    futures = {}
+    t0 = time.time()
+
+    with pool_class(max_workers=max_workers) as pool:
+
+        def submit_ready():
+            for name, node in list(pending.items()):
+                if all(inp in values for inp in node.inputs):
+                    args = [values[inp] for inp in node.inputs]
+                    futures[pool.submit(_timed_call, node.func, args, node.kwargs)] = name
+                    del pending[name]
+
+        submit_ready()
+
+        while futures:
+            finished, _ = wait(futures, return_when=FIRST_COMPLETED)
+
+            for future in finished:
+                name = futures.pop(future)
+                result, start, end, worker = future.result()
+                values[name] = result
+                timings.append({
+                    'Node': name,
+                    'Start': start - t0,
+                    'End': end - t0,
+                    'Seconds': end - start,
+                    'Worker': worker
+                })
+
+            submit_ready()
+
+    if pending:
+        raise ValueError(f"Không chạy được các node (phụ thuộc vòng): {list(pending)}")
+
+    timings = pd.DataFrame(timings, columns=['Node', 'Start', 'End', 'Seconds', 'Worker'])
+
+    return values, timings.sort_values('Start', ignore_index=True)
+
+
+# HÀM TÌM ĐƯỜNG GĂNG
+def critical_path(nodes: list, timings: pd.DataFrame) -> tuple:
+    """
+    Tìm chuỗi node phụ thuộc nhau có tổng thời gian chạy lớn nhất, tức thời
+    gian tối thiểu của cả DAG dù có bao nhiêu worker.
+
+    Tham số:
+        nodes: List các Node đã chạy
+        timings: DataFrame thời gian từ run_dag
+
+    Trả về:
+        Tuple (list tên node trên đường găng, tổng số giây)
+    """
+    seconds = dict(zip(timings['Node'], timings['Seconds']))
+    by_name = {node.name: node for node in nodes}
+    best = {}
+
+    def longest(name):
+        # Đường dài nhất kết thúc tại node name
+        if name not in best:
+            parents = [inp for inp in by_name[name].inputs if inp in by_name]
+            prev = max((longest(p) for p in parents), key=lambda item: item[1], default=([], 0.0))
+            best[name] = (prev[0] + [name], prev[1] + seconds.get(name, 0.0))
+        return best[name]
+
+    return max((longest(node.name) for node in nodes), key=lambda item: item[1], default=([], 0.0))
@@ -0,0 +1,729 @@
+# incremental.py - Phân tích tăng dần bằng trạng thái tổng hợp có thể gộp
+# file này lưu các đại lượng trung gian của analysis.py thay cho bảng kết quả:
+# 1. Bộ đếm: số dòng, số lần xuất hiện của từng giá trị / cặp giá trị
+# 2. Count, sum, mean/variance (Welford), min/max của CompTotal theo nhóm
+# 3. KLLSketch theo nhóm để tính median (hoặc toàn bộ giá trị đã sắp xếp khi
+#    cần chính xác)
+# 4. Số respondent của từng bộ ngôn ngữ (đúng tập ngôn ngữ đã chọn) theo
+#    DevType, các bộ ngôn ngữ phổ biến chỉ được khai phá một lần khi finalize
+# Mỗi batch dữ liệu mới chỉ cần update() với các dòng mới (chi phí tỉ lệ với
+# số dòng mới), trạng thái gộp được với nhau (merge), lưu ra file và
+# finalize() thành đúng các bảng của run_analysis.
+# run_sharded dùng cùng trạng thái theo kiểu map-reduce: mỗi process tính
+# trạng thái của một shard respondent (tự đọc đoạn dòng của shard từ file),
+# sau đó gộp theo thứ tự shard.
+
+import argparse
+import os
+import pickle
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from analysis import ANALYSIS_SPECS, DEVTYPE_SHORT_NAMES, rank_language_sets, save_table, top_k_cooccurrence
+from encoding import MULTI_SELECT_COLUMNS, encode_multi_select
+from itemsets import frequent_itemsets, pack_columns
+from salary_index import DEFAULT_PERCENTILES, SalaryIndex, bootstrap_median_ci
+from sketches import KLLSketch, SortedValues
+from storage import count_table_rows, read_table, read_table_rows
+from transform import EXPERIENCE_LABELS, explode_multi_select
+
+
+# Các cột đơn và các cặp cột cần đếm
+VALUE_COLUMNS = ['RemoteWork', 'AISelect']
+PAIR_COLUMNS = [
+    ('ExperienceLevel', 'RemoteWork'),
+    ('ExperienceLevel', 'AISelect'),
+    ('DevType', 'RemoteWork'),
+    ('DevType', 'LanguageHaveWorkedWith'),
+]
+
+DEFAULT_STATE_PATH = './data/processed/analysis_state.pkl'
+
+
+# MEAN / VARIANCE CÓ THỂ GỘP
+class MomentState:
+    """
+    Count, sum, mean, M2 (tổng bình phương độ lệch), min, max của một nhóm.
+
+    Hai trạng thái được gộp bằng công thức Welford/Chan nên không cần giữ
+    lại dữ liệu gốc: var = M2 / (n - 1).
+    """
+
+    def __init__(self):
+        self.n = 0
+        self.total = 0.0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = np.nan
+        self.max = np.nan
+
+    def merge_moments(self, n: int, total: float, mean: float, m2: float, vmin: float, vmax: float):
+        """
+        Gộp thống kê của một nhóm giá trị mới (VD: một nhóm của batch mới).
+        """
+        if n == 0:
+            return self
+
+        combined = self.n + n
+        delta = mean - self.mean
+
+        self.mean += delta * n / combined
+        self.m2 += m2 + delta ** 2 * self.n * n / combined
+        self.total += total
+        self.n = combined
+        self.min = np.fmin(self.min, vmin)
+        self.max = np.fmax(self.max, vmax)
+
+        return self
+
+    def merge(self, other: "MomentState"):
+        return self.merge_moments(other.n, other.total, other.mean, other.m2, other.min, other.max)
+
+    @property
+    def std(self) -> float:
+        return np.sqrt(self.m2 / (self.n - 1)) if self.n > 1 else np.nan
+
+
+class GroupedMoments:
+    """
+    MomentState + KLLSketch (cho median) của cột giá trị theo từng nhóm.
+
+    Tham số:
+        sketch_k: Độ chính xác của sketch (xem KLLSketch). Nhóm có ít hơn
+            khoảng sketch_k giá trị thì median là chính xác.
+            None = giữ toàn bộ giá trị (SortedValues), median luôn chính xác.
+        seed: Seed của sketch
+    """
+
+    def __init__(self, sketch_k: int = 200, seed: int = 0):
+        self.sketch_k = sketch_k
+        self.seed = seed
+        self.groups = {}
+
+    def _group(self, key):
+        if key not in self.groups:
+            sketch = SortedValues() if self.sketch_k is None else KLLSketch(k=self.sketch_k, seed=self.seed)
+            self.groups[key] = (MomentState(), sketch)
+        return self.groups[key]
+
+    def update(self, df: pd.DataFrame, by: list, col: str):
+        """
+        Thêm các dòng của df, nhóm theo các cột by, giá trị là cột col.
+        """
+        # Kiểu cột lương gốc (mean/median/min/max của bảng chính xác giữ kiểu này, giống SalaryIndex)
+        self.dtype = df[col].dtype if df[col].dtype == np.float32 else np.float64
+
+        grouped = df.groupby(by, observed=True, sort=False)[col]
+        stats = grouped.agg(['count', 'sum', 'mean', 'var', 'min', 'max'])
+        values = df[col].to_numpy(dtype=float, na_value=np.nan)
+
+        for key, positions in grouped.indices.items():
+            row = stats.loc[key]
+            n = int(row['count'])
+            m2 = row['var'] * (n - 1) if n > 1 else 0.0
+
+            moments, sketch = self._group(key)
+            moments.merge_moments(n, row['sum'], row['mean'] if n else 0.0, m2, row['min'], row['max'])
+            sketch.update(values[positions])
+
+        return self
+
+    def merge(self, other: "GroupedMoments"):
+        for key, (moments, sketch) in other.groups.items():
+            own_moments, own_sketch = self._group(key)
+            own_moments.merge(moments)
+            own_sketch.merge(sketch)
+
+        return self
+
+    def _exact_table(self, names: list) -> pd.DataFrame:
+        # Giữ toàn bộ giá trị: tính bằng SalaryIndex.summary trên các mảng đã
+        # sắp xếp, cùng phép tính (và cùng kết quả) với run_analysis
+        groups = [(key, sketch.values()) for key, (_, sketch) in self.groups.items()]
+        groups = [(key, values) for key, values in groups if len(values)]
+        segments = [values for _, values in groups]
+        sizes = np.array([len(values) for values in segments], dtype=np.int64)
+        index = SalaryIndex(['_group'], [np.arange(len(groups))], np.concatenate(segments) if segments else np.empty(0),
+                            np.concatenate([[0], np.cumsum(sizes)]), getattr(self, 'dtype', np.float64))
+        summary = index.summary()
+
+        table = pd.DataFrame([dict(zip(names, key if isinstance(key, tuple) else (key,))) for key, _ in groups],
+                             columns=names)
+        for col in ['Count', 'Mean', 'Median', 'Min', 'Max', 'Std']:
+            table[col] = summary[col].to_numpy()
+
+        return table
+
+    def table(self, names: list) -> pd.DataFrame:
+        """
+        Bảng Count, Mean, Median, Min, Max, Std theo nhóm (chưa làm tròn).
+        Nhóm không có giá trị nào (chỉ có lương rỗng) bị bỏ qua, giống SalaryIndex.summary.
+        """
+        if self.sketch_k is None:
+            return self._exact_table(names)
+
+        rows = []
+        for key, (moments, sketch) in self.groups.items():
+            if moments.n == 0:
+                continue
+
+            key = key if isinstance(key, tuple) else (key,)
+            rows.append(dict(zip(names, key), **{
+                'Count': moments.n,
+                'Mean': moments.total / moments.n,
+                'Median': float(sketch.quantile(0.5)),
+                'Min': moments.min,
+                'Max': moments.max,
+                'Std': moments.std
+            }))
+
+        return pd.DataFrame(rows, columns=names + ['Count', 'Mean', 'Median', 'Min', 'Max', 'Std'])
+
+
+def _experience_order(labels: pd.Series) -> pd.Series:
+    """
+    Vị trí của nhãn ExperienceLevel trong EXPERIENCE_LABELS (nhãn lạ xếp cuối).
+    """
+    order = {label: i for i, label in enumerate(EXPERIENCE_LABELS)}
+    return labels.map(lambda label: order.get(label, len(order)))
+
+
+def _complement_median(total: np.ndarray, part: np.ndarray) -> float:
+    """
+    Median của phần bù: các giá trị của total (đã sắp xếp) trừ đi các giá trị
+    của part (đã sắp xếp, là tập con của total). Chính xác khi hai mảng là dữ
+    liệu đầy đủ, xấp xỉ khi lấy từ sketch đã nén.
+    """
+    m = len(total) - len(part)
+    if m <= 0:
+        return np.nan
+
+    # Phần tử thứ t của phần bù là total[i] với i nhỏ nhất có c(i) >= t, trong đó
+    # c(i) = số phần tử của total <= total[i] trừ số phần tử của part <= total[i].
+    # Vì i + 1 - len(part) <= c(i) nên chỉ cần xét total[t - 1 : t + len(part)]
+    # (vị trí trước t - 1 có c(i) >= t thì cùng giá trị với total[t - 1]),
+    # chi phí theo len(part) thay vì len(total)
+    targets = np.array([(m - 1) // 2 + 1, m // 2 + 1])
+    window = total[targets[0] - 1:targets[1] + len(part)]
+    counts = np.searchsorted(total, window, side='right') - np.searchsorted(part, window, side='right')
+    reached = counts[:, None] >= targets
+    values = np.where(reached.any(axis=0), window[reached.argmax(axis=0)], total[-1])
+
+    return float(values.mean())
+
+
+def _ranked_counts(counter: Counter) -> pd.Series:
+    """
+    Số đếm giảm dần, bằng nhau thì theo thứ tự nhãn (giống value_counts của
+    counting.dimension_codes: các cột category đã transform có nhãn sắp xếp).
+    """
+    counts = pd.Series(counter, dtype='int64').sort_index()
+    return counts.sort_values(ascending=False, kind='stable')
+
+
+def _value_counts(series: pd.Series) -> pd.Series:
+    """
+    Đếm giá trị theo thứ tự xuất hiện đầu tiên (bỏ qua giá trị rỗng).
+    """
+    return series.astype(object).value_counts(sort=False)
+
+
+# TRẠNG THÁI TỔNG HỢP CỦA TOÀN BỘ PHÂN TÍCH
+class AnalysisState:
+    """
+    Trạng thái tổng hợp đủ để tính lại mọi bảng trong ANALYSIS_SPECS.
+
+    Các bộ đếm giữ thứ tự xuất hiện đầu tiên của giá trị (giống value_counts
+    trên toàn bộ dữ liệu), nên các batch cần được update theo đúng thứ tự.
+    Median tính từ KLLSketch: chính xác khi nhóm còn nhỏ, xấp xỉ (sai số
+    hạng khoảng 2 / sketch_k) khi nhóm lớn.
+
+    Bộ ngôn ngữ theo DevType được lưu dưới dạng số respondent của từng tập
+    ngôn ngữ khác nhau (chính xác, gộp được); bộ bằng số tập ngôn ngữ khác
+    nhau thực sự xuất hiện (thường nhỏ hơn nhiều so với số dòng).
+
+    Tham số:
+        sketch_k: Độ chính xác của sketch median (None = giữ toàn bộ lương
+            đã sắp xếp, median / percentile / bootstrap luôn chính xác)
+        seed: Seed của sketch
+
+    Thuộc tính:
+        n_rows: Tổng số dòng đã update
+        columns: Các cột đã xuất hiện trong ít nhất một batch
+    """
+
+    def __init__(self, sketch_k: int = 200, seed: int = 0):
+        self.n_rows = 0
+        self.columns = set()
+        self.values = {col: Counter() for col in VALUE_COLUMNS}
+        self.tokens = {col: Counter() for col in MULTI_SELECT_COLUMNS}
+        self.pairs = {pair: Counter() for pair in PAIR_COLUMNS}
+        self.comp_by_level = GroupedMoments(sketch_k, seed)
+        self.comp_by_devtype_level = GroupedMoments(sketch_k, seed)
+        self.comp_by_language_level = GroupedMoments(sketch_k, seed)
+        # {DevType: Counter {tuple tên ngôn ngữ đã sắp xếp: số respondent}}
+        self.language_sets = {}
+
+    # CẬP NHẬT / GỘP
+    def update(self, df: pd.DataFrame):
+        """
+        Thêm một batch dòng đã transform (cùng cấu trúc với input của run_analysis).
+        """
+        self.n_rows += len(df)
+        self.columns.update(df.columns)
+
+        for col in VALUE_COLUMNS:
+            if col in df.columns:
+                self.values[col].update(_value_counts(df[col]).to_dict())
+
+        # Mã hoá multi-hot một lần cho mỗi cột multi-select của batch
+        encodings = {col: encode_multi_select(df[col]) for col in MULTI_SELECT_COLUMNS if col in df.columns}
+
+        for col, enc in encodings.items():
+            counts = np.asarray(enc.matrix.sum(axis=0)).ravel()
+            self.tokens[col].update(dict(zip(enc.vocabulary, counts.tolist())))
+
+        for row_col, col_col in PAIR_COLUMNS:
+            if row_col not in df.columns or col_col not in df.columns:
+                continue
+
+            if row_col in encodings and col_col in encodings:
+                table = encodings[row_col].cooccurrence(encodings[col_col])
+            elif row_col in encodings:
+                table = encodings[row_col].crosstab(df[col_col])
+            else:
+                table = pd.crosstab(df[row_col].astype(object), df[col_col].astype(object))
+
+            pairs = table.stack()
+            pairs = pairs[pairs > 0]
+            self.pairs[(row_col, col_col)].update(dict(zip(pairs.index, pairs.tolist())))
+
+        if {'DevType', 'LanguageHaveWorkedWith'} <= set(df.columns):
+            self._update_language_sets(encodings['DevType'], encodings['LanguageHaveWorkedWith'])
+
+        if {'ExperienceLevel', 'CompTotal'} <= set(df.columns):
+            self.comp_by_level.update(df, ['ExperienceLevel'], 'CompTotal')
+
+            if 'DevType' in df.columns:
+                exploded = explode_multi_select(df[['DevType', 'ExperienceLevel', 'CompTotal']], 'DevType')
+                self.comp_by_devtype_level.update(exploded, ['DevType', 'ExperienceLevel'], 'CompTotal')
+
+            if 'LanguageHaveWorkedWith' in df.columns:
+                # Mỗi cặp (dòng, ngôn ngữ) của mã hoá multi-hot (ngôn ngữ lặp lại trong
+                # một dòng tính một lần, giống analyze_language_salary_uplift), không split lại chuỗi
+                languages = encodings['LanguageHaveWorkedWith'].matrix.tocsr()
+                rows = np.repeat(np.arange(languages.shape[0]), np.diff(languages.indptr))
+                exploded = df[['ExperienceLevel', 'CompTotal']].iloc[rows]
+                exploded.insert(0, 'LanguageHaveWorkedWith',
+                                np.asarray(encodings['LanguageHaveWorkedWith'].vocabulary, dtype=object)[languages.indices])
+                self.comp_by_language_level.update(exploded, ['LanguageHaveWorkedWith', 'ExperienceLevel'],
+                                                   'CompTotal')
+
+        return self
+
+    def merge(self, other: "AnalysisState"):
+        """
+        Gộp trạng thái của phần dữ liệu khác (VD: một shard hoặc một năm khác).
+        """
+        self.n_rows += other.n_rows
+        self.columns |= other.columns
+
+        for own, theirs in [(self.values, other.values), (self.tokens, other.tokens), (self.pairs, other.pairs)]:
+            for key, counter in theirs.items():
+                own.setdefault(key, Counter()).update(counter)
+
+        self.comp_by_level.merge(other.comp_by_level)
+        self.comp_by_devtype_level.merge(other.comp_by_devtype_level)
+        self.comp_by_language_level.merge(other.comp_by_language_level)
+        for devtype, counter in other.language_sets.items():
+            self.language_sets.setdefault(devtype, Counter()).update(counter)
+
+        return self
+
+    def _update_language_sets(self, devtypes, languages):
+        # Khoá của tập ngôn ngữ mỗi dòng: mỗi nhóm 62 ngôn ngữ thành một số
+        # nguyên (tổng 2^cột), np.unique gom các dòng cùng tập (chi phí tỉ lệ
+        # với số dòng của batch)
+        matrix = languages.matrix.tocsc()
+        n_rows, n_tokens = matrix.shape
+        groups = [(start, min(62, n_tokens - start)) for start in range(0, n_tokens, 62)]
+        keys = np.column_stack([matrix[:, start:start + width].astype(np.int64) @ (np.int64(1) << np.arange(width))
+                                for start, width in groups] or [np.zeros(n_rows, dtype=np.int64)])
+
+        if keys.shape[1] == 1:
+            combos, combo_ids = np.unique(keys[:, 0], return_inverse=True)
+            combos = combos[:, None]
+        else:
+            combos, combo_ids = np.unique(keys, axis=0, return_inverse=True)
+        combo_ids = combo_ids.ravel()
+
+        # Tên các ngôn ngữ của từng tập khác nhau
+        vocabulary = np.asarray(languages.vocabulary, dtype=object)
+        names = [()] * len(combos)
+        if groups:
+            bits = np.concatenate([(combos[:, [i]] >> np.arange(width)) & 1 for i, (_, width) in enumerate(groups)],
+                                  axis=1).astype(bool)
+            names = [tuple(sorted(vocabulary[row])) for row in bits]
+
+        # Số respondent của từng cặp (DevType, tập ngôn ngữ)
+        dev_matrix = devtypes.matrix.tocsr()
+        dev_rows = np.repeat(np.arange(dev_matrix.shape[0]), np.diff(dev_matrix.indptr))
+        pairs, counts = np.unique(dev_matrix.indices.astype(np.int64) * len(combos) + combo_ids[dev_rows],
+                                  return_counts=True)
+
+        counters = [self.language_sets.setdefault(devtype, Counter()) for devtype in devtypes.vocabulary]
+        for pair, count in zip(pairs.tolist(), counts.tolist()):
+            counters[pair // len(combos)][names[pair % len(combos)]] += count
+
+    # LƯU / ĐỌC
+    def save(self, path: str):
+        with open(path, 'wb') as f:
+            pickle.dump(self, f)
+
+    @staticmethod
+    def load(path: str) -> "AnalysisState":
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+
+    # CÁC BẢNG KẾT QUẢ (tên hàm = khoá trong ANALYSIS_SPECS)
+    def _has(self, *cols) -> bool:
+        return all(col in self.columns for col in cols)
+
+    def _top_tokens(self, col: str, top_n: int) -> pd.Series:
+        return pd.Series(self.tokens[col], dtype='int64').sort_values(ascending=False, kind='stable').head(top_n)
+
+    def _share_table(self, counts: pd.Series, label: str, total: int) -> pd.DataFrame:
+        return pd.DataFrame({
+            label: counts.index,
+            'Count': counts.values,
+            'Percentage': (counts / total * 100).round(2).values
+        })
+
+    def _pair_table(self, pair: tuple, rows=None) -> pd.DataFrame:
+        """
+        Bảng đếm hàng x cột của một cặp cột (cột sắp xếp theo nhãn).
+        """
+        counter = self.pairs[pair]
+        if rows is not None:
+            counter = {key: count for key, count in counter.items() if key[0] in rows}
+
+        if not counter:
+            return pd.DataFrame()
+
+        table = pd.Series(counter, dtype='int64').unstack(fill_value=0)
+        table.index.name, table.columns.name = pair
+
+        return table.reindex(columns=sorted(table.columns))
+
+    def _row_percentages(self, table: pd.DataFrame) -> pd.DataFrame:
+        table = table[table.sum(axis=1) > 0]
+        return (table.div(table.sum(axis=1), axis=0) * 100).round(2)
+
+    def _by_experience(self, col: str) -> pd.DataFrame:
+        table = self._pair_table(('ExperienceLevel', col))
+        if table.empty:
+            return table
+
+        table = table.iloc[np.argsort(_experience_order(table.index.to_series()).to_numpy(), kind='stable')]
+        return self._row_percentages(table)
+
+    def remote_overall(self) -> pd.DataFrame:
+        counts = _ranked_counts(self.values['RemoteWork'])
+        return self._share_table(counts, 'RemoteWork', counts.sum())
+
+    def remote_by_exp(self) -> pd.DataFrame:
+        return self._by_experience('RemoteWork')
+
+    def remote_by_devtype(self, top_n: int = 10) -> pd.DataFrame:
+        top_devtypes = set(self._top_tokens('DevType', top_n).index)
+        table = self._pair_table(('DevType', 'RemoteWork'), rows=top_devtypes)
+        if table.empty:
+            return table
+
+        table = self._row_percentages(table.sort_index())
+        if 'Remote' in table.columns:
+            table = table.sort_values('Remote', ascending=False, kind='stable')
+
+        return table
+
+    def top_languages(self, top_n: int = 15) -> pd.DataFrame:
+        return self._share_table(self._top_tokens('LanguageHaveWorkedWith', top_n), 'Language', self.n_rows)
+
+    def language_uplift(self) -> pd.DataFrame:
+        if not self._has('LanguageHaveWorkedWith', 'ExperienceLevel', 'CompTotal'):
+            return pd.DataFrame()
+
+        # Người không dùng = cả nhóm kinh nghiệm trừ người dùng (median của phần bù)
+        rows, everyone_by_level = [], {}
+        for (language, level), (moments, sketch) in self.comp_by_language_level.groups.items():
+            if moments.n == 0:
+                continue
+
+            level_moments, level_sketch = self.comp_by_level.groups[level]
+            if level not in everyone_by_level:
+                everyone_by_level[level] = level_sketch.values()
+            users, everyone = sketch.values(), everyone_by_level[level]
+            rows.append({
+                'Language': language,
+                'ExperienceLevel': level,
+                'Users': moments.n,
+                'Median_Users': float(np.median(users)),
+                'NonUsers': level_moments.n - moments.n,
+                'Median_NonUsers': _complement_median(everyone, users)
+            })
+
+        stats = pd.DataFrame(rows, columns=['Language', 'ExperienceLevel', 'Users', 'Median_Users', 'NonUsers',
+                                            'Median_NonUsers'])
+        stats['Uplift'] = stats['Median_Users'] - stats['Median_NonUsers']
+        stats['Uplift_Pct'] = stats['Uplift'] / stats['Median_NonUsers'] * 100
+
+        # Ngôn ngữ theo thứ tự phổ biến, nhóm kinh nghiệm theo thứ tự nhóm
+        popularity = pd.Series(self.tokens['LanguageHaveWorkedWith'], dtype='int64')
+        popularity = {token: rank for rank, token in
+                      enumerate(popularity.sort_values(ascending=False, kind='stable').index)}
+        stats['_order'] = stats['Language'].map(popularity)
+        stats['_level'] = _experience_order(stats['ExperienceLevel'])
+        stats = stats.sort_values(['_order', '_level'], kind='stable')
+
+        return stats.drop(columns=['_order', '_level']).round(2).reset_index(drop=True)
+
+    def ai_usage(self) -> pd.DataFrame:
+        counts = _ranked_counts(self.values['AISelect'])
+        return self._share_table(counts, 'AIUsage', counts.sum())
+
+    def comp_by_exp(self) -> pd.DataFrame:
+        stats = self.comp_by_level.table(['ExperienceLevel'])
+        order = np.argsort(_experience_order(stats['ExperienceLevel']).to_numpy(), kind='stable')
+
+        return stats.iloc[order].round(2).reset_index(drop=True)
+
+    def comp_by_exp_devtype(self, top_n_devtypes: int = 10, n_boot: int = 1000, confidence: float = 0.95,
+                            seed: int = 0) -> pd.DataFrame:
+        if not self._has('CompTotal', 'ExperienceLevel', 'DevType'):
+            return pd.DataFrame()
+
+        stats = self.comp_by_devtype_level.table(['DevType', 'ExperienceLevel'])
+        stats = stats[stats['DevType'].isin(self._top_tokens('DevType', top_n_devtypes).index)].copy()
+        stats['_key'] = list(zip(stats['DevType'], stats['ExperienceLevel']))
+        stats['DevType'] = stats['DevType'].replace(DEVTYPE_SHORT_NAMES)
+
+        # Sắp xếp như groupby: DevType theo tên, ExperienceLevel theo thứ tự nhóm
+        stats['_order'] = _experience_order(stats['ExperienceLevel'])
+        stats = stats.sort_values(['DevType', '_order'], kind='stable').reset_index(drop=True)
+
+        # Bootstrap median trên giá trị đại diện của KLLSketch từng nhóm
+        columns = ['DevType', 'ExperienceLevel', 'Count', 'Mean', 'Median']
+        if n_boot:
+            values = [self.comp_by_devtype_level.groups[key][1].values() for key in stats['_key']]
+            stats['Median_CI_Low'], stats['Median_CI_High'] = bootstrap_median_ci(
+                values, n_boot=n_boot, confidence=confidence, seed=seed)
+            columns += ['Median_CI_Low', 'Median_CI_High']
+
+        return stats[columns].round(2)
+
+    def language_sets_by_devtype(self, top_n_devtypes: int = 10, min_support: float = 0.05, min_size: int = 2,
+                                 max_size: int = 4, top_n_sets: int = 5) -> pd.DataFrame:
+        if not self._has('DevType', 'LanguageHaveWorkedWith'):
+            return pd.DataFrame()
+
+        # Chỉ số ngôn ngữ theo thứ tự xuất hiện đầu tiên (giống mã hoá trên toàn bộ dữ liệu)
+        vocabulary = np.asarray(list(self.tokens['LanguageHaveWorkedWith']), dtype=object)
+        index = {language: i for i, language in enumerate(vocabulary)}
+        rows = []
+
+        for devtype, n in self._top_tokens('DevType', top_n_devtypes).items():
+            # Dựng lại ma trận chỉ báo của DevType (mỗi tập ngôn ngữ lặp lại theo
+            # số respondent) rồi khai phá một lần với support thật
+            counter = self.language_sets.get(devtype, Counter())
+            combos = list(counter)
+            indices = [index[language] for combo in combos for language in combo]
+            indptr = np.concatenate([[0], np.cumsum([len(combo) for combo in combos], dtype=np.int64)])
+            distinct = sparse.csr_matrix((np.ones(len(indices), dtype=np.int8), indices, indptr),
+                                         shape=(len(combos), len(vocabulary)))
+            matrix = distinct[np.repeat(np.arange(len(combos)), [counter[combo] for combo in combos])]
+
+            itemsets = frequent_itemsets(pack_columns(matrix), np.ceil(min_support * n), max_size)
+            rows.extend(rank_language_sets(devtype, itemsets, int(n), vocabulary, min_size, top_n_sets))
+
+        columns = ['DevType', 'Languages', 'Size', 'Count', 'Support', 'Rule', 'Confidence', 'Lift', 'Rank']
+
+        return pd.DataFrame(rows, columns=columns).round(2)
+
+    def comp_percentiles(self, by: list = None, percentiles: list = None) -> pd.DataFrame:
+        if by not in (None, ['ExperienceLevel']):
+            raise ValueError("Trạng thái tăng dần chỉ lưu percentile theo ExperienceLevel")
+
+        percentiles = DEFAULT_PERCENTILES if percentiles is None else percentiles
+        stats = self.comp_by_exp()[['ExperienceLevel', 'Count']]
+
+        for p in percentiles:
+            stats[f'P{p:g}'] = [float(self.comp_by_level.groups[level][1].quantile(p / 100))
+                                for level in stats['ExperienceLevel']]
+
+        return stats.round(2)
+
+    def ai_by_exp(self) -> pd.DataFrame:
+        return self._by_experience('AISelect')
+
+    def _top_multi_select(self, col: str, label: str, top_n: int) -> pd.DataFrame:
+        if not self._has(col):
+            return pd.DataFrame()
+        return self._share_table(self._top_tokens(col, top_n), label, self.n_rows)
+
+    def top_frustrations(self, top_n: int = 10) -> pd.DataFrame:
+        return self._top_multi_select('Frustration', 'Frustration', top_n)
+
+    def top_devtypes(self, top_n: int = 15) -> pd.DataFrame:
+        return self._top_multi_select('DevType', 'DevType', top_n)
+
+    def languages_by_devtype(self, top_n_devtypes: int = 10, top_n_languages: int = 5) -> pd.DataFrame:
+        if not self._has('DevType', 'LanguageHaveWorkedWith'):
+            return pd.DataFrame()
+
+        # Hàng/cột theo thứ tự xuất hiện đầu tiên, giống ma trận của analyze_cooccurrence
+        counts = pd.DataFrame(0, index=pd.Index(list(self.tokens['DevType']), name='DevType'),
+                              columns=pd.Index(list(self.tokens['LanguageHaveWorkedWith']),
+                                               name='LanguageHaveWorkedWith'))
+        for (devtype, language), count in self.pairs[('DevType', 'LanguageHaveWorkedWith')].items():
+            counts.at[devtype, language] = count
+
+        result_df = top_k_cooccurrence(counts, top_n_devtypes, top_n_languages)
+
+        return result_df.rename(columns={'LanguageHaveWorkedWith': 'Language'})
+
+    def finalize(self) -> dict:
+        """
+        Tính các bảng kết quả với cùng tham số như run_analysis.
+
+        Trả về:
+            Dictionary {khoá trong ANALYSIS_SPECS: bảng kết quả}
+        """
+        return {key: getattr(self, key)(**kwargs) for key, _, kwargs, *_ in ANALYSIS_SPECS}
+
+
+# HÀM CHÍNH: CẬP NHẬT TRẠNG THÁI VỚI BATCH MỚI VÀ GHI LẠI CÁC BẢNG
+def run_incremental(batch_paths: list, state_path: str = DEFAULT_STATE_PATH,
+                    sketch_k: int = 200, write_tables: bool = True) -> dict:
+    """
+    Đọc trạng thái đã lưu (nếu có), update với các batch mới, lưu lại trạng
+    thái và ghi các bảng kết quả như run_analysis.
+
+    Tham số:
+        batch_paths: List file batch đã transform, theo thứ tự thời gian
+        state_path: File lưu trạng thái (tạo mới nếu chưa có)
+        sketch_k: Độ chính xác của sketch median khi tạo trạng thái mới
+        write_tables: True = ghi các bảng ra OUTPUT_DIR của analysis
+
+    Trả về:
+        Dictionary chứa tất cả các bảng kết quả
+    """
+    if os.path.exists(state_path):
+        state = AnalysisState.load(state_path)
+    else:
+        state = AnalysisState(sketch_k=sketch_k)
+
+    for path in batch_paths:
+        state.update(read_table(path, categories={'ExperienceLevel': EXPERIENCE_LABELS}))
+        print(f"Đã cập nhật {path}: tổng {state.n_rows} dòng")
+
+    state.save(state_path)
+    results = state.finalize()
+
+    if write_tables:
+        for key, _, _, filename, index, skip_empty, _ in ANALYSIS_SPECS:
+            save_table(results[key], filename, index=index, skip_empty=skip_empty)
+
+    return results
+
+
+# HÀM PHÂN TÍCH THEO SHARD (MAP-REDUCE TRÊN NHIỀU PROCESS)
+def _shard_state(shard, sketch_k: int = None, seed: int = 0) -> AnalysisState:
+    """
+    Bước map: trạng thái tổng hợp của một shard: DataFrame, đường dẫn file,
+    hoặc tuple (đường dẫn file, dòng bắt đầu, dòng kết thúc) để process tự
+    đọc đoạn dòng của mình (read_table_rows).
+    """
+    if isinstance(shard, tuple):
+        shard = read_table_rows(*shard, categories={'ExperienceLevel': EXPERIENCE_LABELS})
+    elif isinstance(shard, str):
+        shard = read_table(shard, categories={'ExperienceLevel': EXPERIENCE_LABELS})
+
+    return AnalysisState(sketch_k=sketch_k, seed=seed).update(shard)
+
+
+def reduce_states(states: list) -> AnalysisState:
+    """
+    Bước reduce: gộp trạng thái các shard theo đúng thứ tự shard (giữ thứ tự
+    xuất hiện đầu tiên của giá trị như khi duyệt toàn bộ dữ liệu).
+    """
+    state = states[0]
+    for other in states[1:]:
+        state.merge(other)
+
+    return state
+
+
+def run_sharded(input_path, n_workers: int = 4, n_shards: int = None, sketch_k: int = None,
+                write_tables: bool = True) -> dict:
+    """
+    Chạy toàn bộ phân tích theo kiểu map-reduce: chia respondent thành các
+    shard liên tiếp, tính AnalysisState của từng shard trong process pool,
+    gộp lại và finalize thành các bảng của run_analysis.
+
+    Process chính chỉ đọc số dòng của file, mỗi process tự đọc đoạn dòng của
+    shard mình và làm toàn bộ phần việc theo dòng (mã hoá multi-hot, explode,
+    đếm bộ ngôn ngữ, sắp xếp lương); bước reduce chỉ gộp các trạng thái.
+
+    Tham số:
+        input_path: File đã transform, hoặc list file (mỗi file là một shard,
+            theo thứ tự, mỗi process tự đọc file của mình)
+        n_workers: Số process (1 = chạy tuần tự trong process hiện tại)
+        n_shards: Số shard khi input_path là một file (mặc định n_workers)
+        sketch_k: None = median / percentile chính xác (gộp mảng lương đã sắp
+            xếp, cùng kết quả với run_analysis); số nguyên = dùng KLLSketch
+            (bộ nhớ cố định, median xấp xỉ với nhóm lớn)
+        write_tables: True = ghi các bảng ra OUTPUT_DIR của analysis
+
+    Trả về:
+        Dictionary chứa tất cả các bảng kết quả
+    """
+    if isinstance(input_path, str):
+        n_rows, n_parts = count_table_rows(input_path), n_shards or n_workers
+        bounds = [n_rows * i // n_parts for i in range(n_parts + 1)]
+        shards = [(input_path, start, stop) for start, stop in zip(bounds[:-1], bounds[1:])
+                  if stop > start] or [(input_path, 0, 0)]
+    else:
+        shards = list(input_path)
+
+    if n_workers == 1:
+        states = [_shard_state(shard, sketch_k) for shard in shards]
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            states = list(pool.map(_shard_state, shards, [sketch_k] * len(shards)))
+
+    results = reduce_states(states).finalize()
+
+    if write_tables:
+        for key, _, _, filename, index, skip_empty, _ in ANALYSIS_SPECS:
+            save_table(results[key], filename, index=index, skip_empty=skip_empty)
+
+    return results
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Cập nhật phân tích với batch dữ liệu mới')
+    parser.add_argument('--batch', action='append', required=True,
+                        help='File batch đã transform (lặp lại cho nhiều batch)')
+    parser.add_argument('--state', default=DEFAULT_STATE_PATH, help='File lưu trạng thái tổng hợp')
+    parser.add_argument('--sketch-k', type=int, default=200,
+                        help='Độ chính xác của sketch median khi tạo trạng thái mới')
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    run_incremental(args.batch, state_path=args.state, sketch_k=args.sketch_k)
@@ -0,0 +1,133 @@
+# itemsets.py - Khai phá tập phổ biến (frequent itemsets) trên bitset
+# file này tìm các tổ hợp giá trị hay được chọn cùng nhau của một cột
+# multi-select (VD: các bộ ngôn ngữ trong LanguageHaveWorkedWith):
+# 1. Mỗi token là một bitset nén (uint64) trên các respondent: bit i = 1 nếu
+#    respondent i chọn token đó
+# 2. Support của một tập token = popcount(AND các bitset)
+# 3. Duyệt theo từng kích thước (Eclat): tập cỡ k + 1 = tập cỡ k phổ biến AND
+#    bitset của một token phổ biến đứng sau token cuối cùng, mọi ứng viên
+#    cùng cỡ được tính vector hoá, bỏ tập có support < min_count
+# 4. Luật kết hợp mạnh nhất (X -> y) của mỗi tập, kèm confidence và lift
+
+import numpy as np
+
+
+# Số bit 1 của mỗi giá trị byte (dùng khi numpy chưa có np.bitwise_count)
+_BYTE_POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+def popcount(bits: np.ndarray) -> np.ndarray:
+    """
+    Số bit 1 của từng bitset (theo trục cuối).
+    """
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(bits).sum(axis=-1, dtype=np.int64)
+
+    return _BYTE_POPCOUNT[bits.view(np.uint8)].sum(axis=-1, dtype=np.int64)
+
+
+def pack_columns(matrix) -> np.ndarray:
+    """
+    Bitset của từng cột của ma trận chỉ báo thưa (respondent x token).
+
+    Tham số:
+        matrix: scipy.sparse matrix giá trị 0/1
+
+    Trả về:
+        Mảng uint64 (số token x số word), bit i của cột j = matrix[i, j] != 0
+    """
+    matrix = matrix.tocsc()
+    n_rows, n_items = matrix.shape
+    n_words = max(1, (n_rows + 63) // 64)
+
+    rows = matrix.indices.astype(np.int64)
+    items = np.repeat(np.arange(n_items), np.diff(matrix.indptr))
+
+    bits = np.zeros((n_items, n_words), dtype=np.uint64)
+    np.bitwise_or.at(bits, (items, rows >> 6), np.left_shift(np.uint64(1), (rows & 63).astype(np.uint64)))
+
+    return bits
+
+
+# HÀM KHAI PHÁ TẬP PHỔ BIẾN
+def frequent_itemsets(bits: np.ndarray, min_count: int, max_size: int = 4,
+                      max_words: int = 1 << 22) -> list:
+    """
+    Mọi tập token có support >= min_count (tính cả tập 1 phần tử).
+
+    Tham số:
+        bits: Bitset của từng token (xem pack_columns)
+        min_count: Support tối thiểu (số respondent)
+        max_size: Kích thước tập lớn nhất
+        max_words: Số word uint64 tối đa của một khối ứng viên (giới hạn bộ nhớ)
+
+    Trả về:
+        List (tuple chỉ số token tăng dần, support), theo kích thước rồi theo
+        thứ tự chỉ số token
+    """
+    min_count = max(int(min_count), 1)
+    counts = popcount(bits)
+    singles = np.flatnonzero(counts >= min_count)
+
+    items = singles[:, None]
+    set_bits = bits[singles]
+    set_counts = counts[singles]
+    result = [((int(i),), int(c)) for i, c in zip(singles, set_counts)]
+
+    for _ in range(1, max_size):
+        # Ứng viên: tập cỡ k nối thêm một token phổ biến đứng sau token cuối
+        parents, extensions = np.nonzero(items[:, -1][:, None] < singles[None, :])
+        if len(parents) == 0:
+            break
+
+        step = max(1, max_words // bits.shape[1])
+        keep_parents, keep_ext, keep_bits, keep_counts = [], [], [], []
+
+        for start in range(0, len(parents), step):
+            p, e = parents[start:start + step], extensions[start:start + step]
+            candidate_bits = set_bits[p] & bits[singles[e]]
+            candidate_counts = popcount(candidate_bits)
+            keep = candidate_counts >= min_count
+
+            keep_parents.append(p[keep])
+            keep_ext.append(e[keep])
+            keep_bits.append(candidate_bits[keep])
+            keep_counts.append(candidate_counts[keep])
+
+        p, e = np.concatenate(keep_parents), np.concatenate(keep_ext)
+        if len(p) == 0:
+            break
+
+        items = np.column_stack([items[p], singles[e]])
+        set_bits = np.concatenate(keep_bits)
+        set_counts = np.concatenate(keep_counts)
+        result.extend((tuple(int(i) for i in row), int(c)) for row, c in zip(items, set_counts))
+
+    return result
+
+
+def strongest_rule(itemset: tuple, supports: dict, n: int) -> tuple:
+    """
+    Luật X -> y có confidence cao nhất của một tập (cỡ >= 2): y là phần tử
+    mà tập còn lại X có support nhỏ nhất.
+
+    Tham số:
+        itemset: Tuple chỉ số token
+        supports: Dictionary {tuple chỉ số token: support} chứa mọi tập con
+            của itemset (luôn đúng với kết quả của frequent_itemsets)
+        n: Tổng số respondent
+
+    Trả về:
+        Tuple (X, y, confidence, lift)
+    """
+    best = None
+    for y in itemset:
+        antecedent = tuple(i for i in itemset if i != y)
+        if best is None or supports[antecedent] < supports[best[0]]:
+            best = (antecedent, y)
+
+    antecedent, consequent = best
+    confidence = supports[itemset] / supports[antecedent]
+    lift = confidence / (supports[(consequent,)] / n)
+
+    return antecedent, consequent, confidence, lift
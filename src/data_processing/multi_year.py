@@ -0,0 +1,109 @@
+# multi_year.py - Xử lý dữ liệu survey của nhiều năm
+# file này chạy cleaning + transform cho từng file survey (mỗi năm một file)
+# trong các process riêng biệt, gắn cột 'Year' và gộp kết quả:
+# 1. Mỗi năm được xử lý song song bằng process pool
+# 2. Nhãn RemoteWork/AISelect khác nhau giữa các năm được chuẩn hoá chung
+#    (xem REMOTE_WORK_MAPPING, AI_SELECT_MAPPING trong transform.py)
+# 3. Kết quả các năm được nối thành một bảng
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from cleaning import run_cleaning
+from schema import apply_dtype_plan
+from storage import write_table
+from transform import transform_survey
+
+
+# HÀM XỬ LÝ MỘT NĂM (CHẠY TRONG WORKER PROCESS)
+def process_year(year: int, input_path: str, cleaning_options: dict = None) -> pd.DataFrame:
+    """
+    Clean + transform file survey của một năm và gắn cột 'Year'.
+
+    Tham số:
+        year: Năm survey (VD: 2024)
+        input_path: Đường dẫn file CSV gốc của năm đó
+        cleaning_options: Tham số thêm cho run_cleaning (VD: chunksize, iqr_k)
+
+    Trả về:
+        DataFrame đã clean + transform của năm đó
+    """
+    df = run_cleaning(input_path, None, **(cleaning_options or {}))
+    df = transform_survey(df)
+    df.insert(0, 'Year', year)
+
+    return df
+
+
+# HÀM CHẠY TOÀN BỘ QUY TRÌNH CHO NHIỀU NĂM
+def run_multi_year(inputs: dict, output_path: str = None, max_workers: int = None,
+                   **cleaning_options) -> pd.DataFrame:
+    """
+    Clean + transform nhiều file survey song song, mỗi năm một process,
+    nên tổng thời gian xấp xỉ thời gian của năm chậm nhất.
+
+    Tham số:
+        inputs: Dictionary {năm: đường dẫn file CSV gốc}
+        output_path: Đường dẫn file đầu ra (.parquet, .feather hoặc .csv; None = không ghi file)
+        max_workers: Số process tối đa (None = theo số CPU)
+        **cleaning_options: Tham số thêm cho run_cleaning
+
+    Trả về:
+        DataFrame gộp của tất cả các năm, sắp theo năm
+    """
+    years = sorted(inputs)
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(process_year, year, inputs[year], cleaning_options)
+            for year in years
+        ]
+        frames = [future.result() for future in futures]
+
+    # Mỗi năm có bộ category riêng: chuyển về object trước khi nối rồi thu gọn lại
+    # (ExperienceLevel dùng chung một bộ nhãn nên giữ nguyên)
+    frames = [
+        frame.astype({
+            col: object for col in frame.columns
+            if isinstance(frame[col].dtype, pd.CategoricalDtype) and col != 'ExperienceLevel'
+        })
+        for frame in frames
+    ]
+    df = apply_dtype_plan(pd.concat(frames, ignore_index=True))
+
+    if output_path is not None:
+        write_table(df, output_path)
+
+    return df
+
+
+def parse_args(argv=None):
+    """
+    Đọc tham số dòng lệnh: mỗi --input có dạng NĂM=ĐƯỜNG_DẪN.
+    """
+    parser = argparse.ArgumentParser(description='Clean + transform survey nhiều năm')
+    parser.add_argument('--input', action='append', required=True,
+                        help='Dạng NĂM=ĐƯỜNG_DẪN, VD: 2024=./data/raw/2024.csv (lặp lại cho mỗi năm)')
+    parser.add_argument('--output', default='./data/processed/transformed_developer_survey_multi_year.parquet',
+                        help='File đầu ra (.parquet, .feather hoặc .csv)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Số process tối đa')
+
+    args = parser.parse_args(argv)
+
+    inputs = {}
+    for item in args.input:
+        year, _, path = item.partition('=')
+        inputs[int(year)] = path
+    args.inputs = inputs
+
+    return args
+
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    df = run_multi_year(args.inputs, args.output, max_workers=args.workers)
@@ -0,0 +1,395 @@
+# query.py - API truy vấn group-by / metric tuỳ ý trên dữ liệu đã transform
+# file này cho phép hỏi các câu hỏi mới mà không cần viết thêm hàm phân tích:
+# 1. SurveyQuery.query(dimensions, metrics, filters, top_n): nhóm theo các
+#    cột bất kỳ (cột đơn hoặc multi-select, VD: DevType x ExperienceLevel),
+#    lọc theo giá trị, tính số đếm / tỉ lệ % / thống kê lương của từng nhóm
+# 2. Cột multi-select được xử lý trên mã hoá multi-hot: mỗi respondent góp
+#    vào mọi token đã chọn (giống explode), không explode DataFrame
+#    Nếu có chỉ mục bitmap (bitmap_index.py) thì bộ lọc được tính bằng & / |
+#    trên bitset
+# 3. Kết quả được lưu trong LRUCache giới hạn theo dung lượng (byte): câu
+#    truy vấn lặp lại trả về ngay, bảng ít dùng nhất bị loại khi đầy
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from bitmap_index import BitmapIndex
+from counting import dimension_codes
+from encoding import MULTI_SELECT_COLUMNS, encode_multi_select
+from salary_index import SalaryIndex
+
+
+# Metric -> cột kết quả (tên cột lương giống SurveyCube.aggregate)
+METRIC_COLUMNS = {
+    'count': 'Count',
+    'percentage': 'Percentage',
+    'comp_count': 'CompCount',
+    'comp_mean': 'CompMean',
+    'comp_median': 'CompQ50',
+    'comp_std': 'CompStd',
+    'comp_min': 'CompMin',
+    'comp_max': 'CompMax',
+}
+
+
+def _metric_column(metric: str) -> str:
+    """
+    Tên cột kết quả của một metric; 'comp_q<mức>' (VD: 'comp_q90') là
+    percentile lương bất kỳ.
+    """
+    if metric in METRIC_COLUMNS:
+        return METRIC_COLUMNS[metric]
+
+    if metric.startswith('comp_q'):
+        try:
+            level = float(metric[len('comp_q'):])
+        except ValueError:
+            level = -1
+        if 0 <= level <= 100:
+            return f'CompQ{level:g}'
+
+    raise ValueError(f"Metric '{metric}' không hợp lệ, dùng một trong {list(METRIC_COLUMNS)} hoặc 'comp_q<0-100>'")
+
+
+# CACHE LRU GIỚI HẠN THEO DUNG LƯỢNG
+class LRUCache:
+    """
+    Cache các bảng kết quả, loại bảng ít được dùng gần đây nhất khi tổng dung
+    lượng vượt max_bytes. Bảng lớn hơn max_bytes không được lưu.
+
+    An toàn khi nhiều thread cùng gọi (một lock cho cả cache).
+
+    Thuộc tính:
+        max_bytes: Dung lượng tối đa (byte, theo DataFrame.memory_usage(deep=True))
+        hits, misses, evictions: Số lần lấy được kết quả có sẵn / phải tính / bị loại
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _size(value: pd.DataFrame) -> int:
+        return int(value.memory_usage(index=True, deep=True).sum())
+
+    def get(self, key):
+        """
+        Bảng đã lưu của key (None nếu chưa có), đánh dấu là vừa được dùng.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value: pd.DataFrame):
+        """
+        Lưu bảng, loại các bảng cũ nhất cho tới khi đủ chỗ.
+        """
+        size = self._size(value)
+
+        with self._lock:
+            if key in self._entries:
+                self.bytes -= self._entries.pop(key)[1]
+            if size > self.max_bytes:
+                return
+
+            while self._entries and self.bytes + size > self.max_bytes:
+                self.bytes -= self._entries.popitem(last=False)[1][1]
+                self.evictions += 1
+
+            self._entries[key] = (value, size)
+            self.bytes += size
+
+    def stats(self) -> dict:
+        """
+        Thống kê cache: {'hits', 'misses', 'evictions', 'entries', 'bytes', 'hit_rate'}.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                    'entries': len(self._entries), 'bytes': self.bytes,
+                    'hit_rate': self.hits / lookups if lookups else 0.0}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key) -> bool:
+        return key in self._entries
+
+
+# API TRUY VẤN
+class SurveyQuery:
+    """
+    Truy vấn group-by / metric trên một DataFrame đã transform (không bị sửa
+    sau khi tạo SurveyQuery, vì kết quả được cache).
+
+    Tham số:
+        df: DataFrame đã transform
+        cache_bytes: Dung lượng tối đa của cache kết quả (0 = không cache)
+        encodings: Dictionary {cột: MultiHotEncoding} đã có sẵn (VD từ
+            encoding.load_multi_hot), cột multi-select khác được mã hoá khi cần
+        multi_select: Các cột multi-select (mặc định encoding.MULTI_SELECT_COLUMNS)
+        salary_col: Cột lương cho các metric comp_*
+        bitmaps: BitmapIndex build từ df (tuỳ chọn). Nếu có thì các bộ lọc trên
+            cột đã đánh chỉ mục được tính trên bitset
+    """
+
+    def __init__(self, df: pd.DataFrame, cache_bytes: int = 64 * 1024 * 1024, encodings: dict = None,
+                 multi_select: list = None, salary_col: str = 'CompTotal', bitmaps: BitmapIndex = None):
+        self.df = df
+        self.cache = LRUCache(cache_bytes)
+        self.multi_select = MULTI_SELECT_COLUMNS if multi_select is None else multi_select
+        self.salary_col = salary_col
+        self._encodings = {col: encoded for col, encoded in (encodings or {}).items()
+                           if encoded.n_respondents == len(df)}
+        self.bitmaps = bitmaps if bitmaps is not None and bitmaps.n_rows == len(df) else None
+        self._codes = {}
+        self._lock = threading.Lock()
+
+    # MÃ CỦA TỪNG CỘT
+    def _dimension(self, col: str) -> tuple:
+        """
+        Mã và nhãn của một cột. Cột multi-select: ma trận multi-hot (CSR) và
+        mã token theo thứ tự nhãn (sắp xếp theo tên, giống explode + groupby).
+
+        Trả về:
+            Tuple (mảng mã hoặc ma trận CSR, mảng đổi mã token hoặc None, list nhãn)
+        """
+        with self._lock:
+            if col not in self._codes:
+                if col not in self.df.columns:
+                    raise ValueError(f"Cột '{col}' không tồn tại trong dữ liệu")
+
+                if col in self.multi_select:
+                    encoded = self._encodings.get(col)
+                    if encoded is None:
+                        encoded = encode_multi_select(self.df[col])
+                    order = np.argsort(np.asarray(encoded.vocabulary, dtype=object), kind='stable')
+                    rank = np.empty(len(order), dtype=np.int64)
+                    rank[order] = np.arange(len(order))
+                    labels = [encoded.vocabulary[i] for i in order]
+                    self._codes[col] = (encoded.matrix.tocsr(), rank, labels)
+                else:
+                    codes, labels = dimension_codes(self.df[col])
+                    self._codes[col] = (np.asarray(codes, dtype=np.int64), None, labels)
+
+            return self._codes[col]
+
+    def _value_mask(self, col: str, values: list) -> np.ndarray:
+        # Respondent có ít nhất một trong các giá trị của cột col
+        codes, rank, labels = self._dimension(col)
+        index = {label: i for i, label in enumerate(labels)}
+        wanted = [index[v] for v in values if v in index]
+
+        if rank is None:
+            return np.isin(codes, wanted)
+
+        tokens = np.flatnonzero(np.isin(rank, wanted))
+        return codes[:, tokens].getnnz(axis=1) > 0
+
+    def _filter_mask(self, filters: dict, all_of: dict) -> np.ndarray:
+        """
+        Respondent thoả mọi điều kiện: filters {cột: list giá trị} = có ít nhất
+        một giá trị, all_of {cột: list giá trị} = có mọi giá trị.
+        """
+        columns = set(filters) | set(all_of)
+        if self.bitmaps is not None and columns and columns <= set(self.bitmaps.columns):
+            return self.bitmaps.mask(self.bitmaps.select(filters, all_of))
+
+        mask = np.ones(len(self.df), dtype=bool)
+        for col, values in filters.items():
+            mask &= self._value_mask(col, values)
+        for col, values in all_of.items():
+            for value in values:
+                mask &= self._value_mask(col, [value])
+
+        return mask
+
+    def _pairs(self, rows: np.ndarray, dimensions: list) -> tuple:
+        """
+        Các cặp (respondent, mã nhóm theo từng chiều): respondent có giá trị
+        rỗng ở một chiều bị bỏ, chiều multi-select nhân một respondent thành
+        một cặp cho mỗi token đã chọn.
+
+        Trả về:
+            Tuple (mảng respondent, list mảng mã, list nhãn)
+        """
+        codes, labels = [], []
+
+        for dim in dimensions:
+            dim_codes, rank, dim_labels = self._dimension(dim)
+            labels.append(dim_labels)
+
+            if rank is None:
+                values = dim_codes[rows]
+                keep = values >= 0
+                rows, codes = rows[keep], [c[keep] for c in codes] + [values[keep]]
+            else:
+                sub = dim_codes[rows]
+                repeats = np.diff(sub.indptr)
+                rows = np.repeat(rows, repeats)
+                codes = [np.repeat(c, repeats) for c in codes] + [rank[sub.indices]]
+
+        return rows, codes, labels
+
+    def _salary_table(self, rows: np.ndarray, group_ids: np.ndarray, groups: np.ndarray, dims: list,
+                      labels: list, shape: tuple, quantiles: list) -> dict:
+        """
+        Thống kê lương của các nhóm groups (mảng mã phẳng), theo SalaryIndex.
+        """
+        salary = self.df[self.salary_col]
+        values = salary.to_numpy(dtype=float, na_value=np.nan)[rows]
+        valid = ~np.isnan(values)
+
+        group_ids, values = group_ids[valid], values[valid]
+        order = np.lexsort((values, group_ids))
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(group_ids, minlength=int(np.prod(shape))))])
+        index = SalaryIndex(dims or ['_all'], labels or [['_all']], values[order], offsets,
+                            salary.dtype if salary.dtype == np.float32 else np.float64)
+
+        # Dòng của summary / percentile_table là các nhóm có lương, theo mã phẳng tăng dần
+        nonempty = np.flatnonzero(np.diff(offsets) > 0)
+        position = np.searchsorted(nonempty, groups)
+        has_salary = (position < len(nonempty)) & (nonempty[np.minimum(position, len(nonempty) - 1)] == groups)
+
+        summary = index.summary()
+        percentiles = index.percentile_table([q * 100 for q in quantiles]) if quantiles else summary
+
+        def column(table, col, dtype=float, fill=np.nan):
+            out = np.full(len(groups), fill, dtype=dtype)
+            out[has_salary] = table[col].to_numpy()[position[has_salary]]
+            return out
+
+        result = {
+            'CompCount': column(summary, 'Count', np.int64, 0),
+            'CompMean': column(summary, 'Mean'),
+            'CompQ50': column(summary, 'Median'),
+            'CompStd': column(summary, 'Std'),
+            'CompMin': column(summary, 'Min'),
+            'CompMax': column(summary, 'Max'),
+        }
+        for q in quantiles:
+            result[f'CompQ{q * 100:g}'] = column(percentiles, f'P{q * 100:g}')
+
+        # Min/max là giá trị gốc nên giữ kiểu cột lương, mean/std/quantile là float64
+        for col in ['CompMin', 'CompMax']:
+            result[col] = result[col].astype(index.dtype)
+
+        return result
+
+    def _compute(self, dimensions: list, metrics: list, filters: dict, all_of: dict, top_n: int,
+                 sort_by: str) -> pd.DataFrame:
+        mask = self._filter_mask(filters, all_of)
+        rows, codes, labels = self._pairs(np.flatnonzero(mask), dimensions)
+        shape = tuple(len(dim_labels) for dim_labels in labels)
+
+        # Mỗi nhóm là một mã phẳng, chỉ giữ nhóm có ít nhất một respondent
+        if dimensions:
+            group_ids = np.ravel_multi_index(codes, shape)
+        else:
+            # Không có chiều nào: một nhóm chung
+            shape, group_ids = (1,), np.zeros(len(rows), dtype=np.int64)
+        counts = np.bincount(group_ids, minlength=int(np.prod(shape)))
+        groups = np.flatnonzero(counts)
+        keys = np.unravel_index(groups, shape) if dimensions else ()
+
+        result = pd.DataFrame({
+            dim: pd.Categorical.from_codes(dim_codes, categories=dim_labels)
+            for dim, dim_codes, dim_labels in zip(dimensions, keys, labels)
+        }, index=pd.RangeIndex(len(groups)))
+
+        columns = [_metric_column(metric) for metric in metrics]
+        salary = {}
+        if any(col.startswith('Comp') for col in columns):
+            quantiles = [float(col[len('CompQ'):]) / 100 for col in columns
+                         if col.startswith('CompQ') and col != 'CompQ50']
+            salary = self._salary_table(rows, group_ids, groups, dimensions, labels, shape, quantiles)
+
+        for col in columns:
+            if col == 'Count':
+                result[col] = counts[groups]
+            elif col == 'Percentage':
+                # % so với số respondent thoả filters
+                total = int(mask.sum())
+                result[col] = (counts[groups] / total * 100).round(2) if total else np.nan
+            else:
+                result[col] = salary[col]
+
+        # Top N theo sort_by (mặc định metric đầu tiên), giảm dần, bằng nhau thì giữ thứ tự nhãn
+        if sort_by is not None or top_n is not None:
+            sort_col = _metric_column(sort_by) if sort_by is not None else columns[0]
+            if sort_col not in result.columns:
+                raise ValueError(f"sort_by '{sort_by}' phải là một trong các metric đã chọn")
+            result = result.sort_values(sort_col, ascending=False, kind='stable', na_position='last')
+
+        if top_n is not None:
+            result = result.head(top_n)
+
+        return result.reset_index(drop=True)
+
+    # HÀM TRUY VẤN CHÍNH
+    def query(self, dimensions: list = None, metrics: list = None, filters: dict = None, top_n: int = None,
+              sort_by: str = None, all_of: dict = None) -> pd.DataFrame:
+        """
+        Nhóm respondent theo dimensions (sau khi lọc theo filters) và tính metrics.
+
+        Tham số:
+            dimensions: List cột nhóm, cột đơn hoặc multi-select
+                (VD: ['DevType', 'ExperienceLevel']). [] = một nhóm chung.
+            metrics: List metric (mặc định ['count']):
+                - 'count': số respondent (cột Count)
+                - 'percentage': % so với số respondent thoả filters (Percentage)
+                - 'comp_count', 'comp_mean', 'comp_median', 'comp_std',
+                  'comp_min', 'comp_max': thống kê lương (CompCount, CompMean,
+                  CompQ50, ...; giống SurveyCube.aggregate)
+                - 'comp_q<mức>': percentile lương, VD 'comp_q90' (CompQ90)
+            filters: Dictionary {cột: giá trị hoặc list giá trị}
+                (VD: {'RemoteWork': 'Remote', 'LanguageHaveWorkedWith': ['Rust', 'Go']}),
+                respondent có ít nhất một giá trị của mỗi cột
+            top_n: Chỉ giữ top_n nhóm có sort_by lớn nhất (None = tất cả)
+            sort_by: Metric để sắp xếp giảm dần (mặc định metric đầu tiên nếu có
+                top_n, không có thì giữ thứ tự nhãn)
+            all_of: Dictionary {cột: list giá trị}, respondent có mọi giá trị
+                (VD: {'LanguageHaveWorkedWith': ['Python', 'Rust']})
+
+        Trả về:
+            DataFrame: các cột dimensions (category theo thứ tự nhãn) và một
+            cột cho mỗi metric. Nhóm không có respondent không được liệt kê.
+            Bảng trả về là bản sao, sửa không ảnh hưởng cache.
+        """
+        dimensions = list(dimensions or [])
+        metrics = list(metrics or ['count'])
+        filters, all_of = [{col: [values] if isinstance(values, str) or np.isscalar(values) else list(values)
+                            for col, values in (conditions or {}).items()} for conditions in (filters, all_of)]
+
+        key = (tuple(dimensions), tuple(metrics),
+               tuple(sorted((col, tuple(values)) for col, values in filters.items())),
+               tuple(sorted((col, tuple(values)) for col, values in all_of.items())), top_n, sort_by)
+        result = self.cache.get(key)
+
+        if result is None:
+            result = self._compute(dimensions, metrics, filters, all_of, top_n, sort_by)
+            self.cache.put(key, result)
+
+        return result.copy()
+
+    def cache_stats(self) -> dict:
+        return self.cache.stats()
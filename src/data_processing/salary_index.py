@@ -0,0 +1,327 @@
+# salary_index.py - Chỉ mục lương đã sắp xếp theo nhóm
+# file này sắp xếp cột lương (CompTotal) một lần trong từng nhóm (VD: theo
+# ExperienceLevel, hoặc DevType x ExperienceLevel) và lưu vị trí bắt đầu của
+# từng nhóm (offsets), sau đó:
+# 1. Percentile bất kỳ của một nhóm: tra trực tiếp theo vị trí, O(1)
+# 2. Percentile của hợp nhiều nhóm: tìm kiếm nhị phân trên các đoạn đã sắp xếp
+# 3. Bảng percentile / thống kê (count, mean, median, min, max, std) của mọi
+#    nhóm được tính vector hoá, không cần groupby lại
+# 4. Khoảng tin cậy bootstrap cho median của từng nhóm
+
+import numpy as np
+import pandas as pd
+
+from counting import dimension_codes
+
+
+# Các mức percentile mặc định cho bảng lương (roadmap)
+DEFAULT_PERCENTILES = [10, 25, 50, 75, 90]
+
+
+def _lerp(lower: np.ndarray, upper: np.ndarray, t: np.ndarray) -> np.ndarray:
+    """
+    Nội suy tuyến tính giữa hai giá trị liền kề (cùng công thức với np.percentile).
+    """
+    diff = upper - lower
+    return np.where(t >= 0.5, upper - diff * (1 - t), lower + diff * t)
+
+
+# CHỈ MỤC LƯƠNG
+class SalaryIndex:
+    """
+    Lương đã sắp xếp trong từng nhóm.
+
+    Nhóm g (mã phẳng của tổ hợp nhãn các cột by) gồm
+    values[offsets[g]:offsets[g + 1]], đã sắp xếp tăng dần, không có NaN.
+
+    Thuộc tính:
+        by: Tên các cột nhóm
+        labels: List nhãn của từng cột nhóm
+        values: Mảng lương đã sắp xếp theo (nhóm, lương)
+        offsets: Vị trí bắt đầu của từng nhóm (độ dài = số nhóm + 1)
+        dtype: Kiểu của cột lương gốc (min/max trả về cùng kiểu; mean, median, std
+            và percentile luôn tính và trả về float64)
+    """
+
+    def __init__(self, by: list, labels: list, values: np.ndarray, offsets: np.ndarray, dtype='float64'):
+        self.by = list(by)
+        self.labels = labels
+        self.values = values
+        self.offsets = offsets
+        self.dtype = np.dtype(dtype)
+
+    @classmethod
+    def build(cls, df: pd.DataFrame, by: list, col: str = 'CompTotal') -> "SalaryIndex":
+        """
+        Sắp xếp cột col một lần theo (nhóm, giá trị).
+
+        Tham số:
+            df: DataFrame chứa các cột by và col
+            by: List cột nhóm (VD: ['ExperienceLevel']). Dòng có giá trị rỗng
+                ở cột nhóm hoặc cột lương bị bỏ qua.
+            col: Cột lương
+        """
+        codes, labels = [], []
+        for dim in by:
+            dim_codes, dim_labels = dimension_codes(df[dim])
+            codes.append(dim_codes)
+            labels.append(dim_labels)
+
+        shape = tuple(len(dim_labels) for dim_labels in labels)
+        values = df[col].to_numpy(dtype=float, na_value=np.nan)
+
+        valid = ~np.isnan(values)
+        for dim_codes in codes:
+            valid &= dim_codes >= 0
+
+        group_ids = np.ravel_multi_index([dim_codes[valid] for dim_codes in codes], shape)
+        values = values[valid]
+
+        order = np.lexsort((values, group_ids))
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(group_ids, minlength=int(np.prod(shape))))])
+        dtype = df[col].dtype if df[col].dtype == np.float32 else np.float64
+
+        return cls(by, labels, values[order], offsets, dtype)
+
+    @property
+    def n_groups(self) -> int:
+        return len(self.offsets) - 1
+
+    def group_id(self, key) -> int:
+        """
+        Mã phẳng của một nhóm từ nhãn (một nhãn, hoặc tuple nhãn khi có nhiều cột nhóm).
+        """
+        key = key if isinstance(key, tuple) else (key,)
+        if len(key) != len(self.by):
+            raise ValueError(f"Khoá nhóm cần {len(self.by)} giá trị theo {self.by}")
+
+        codes = [dim_labels.index(label) for dim_labels, label in zip(self.labels, key)]
+        return int(np.ravel_multi_index(codes, tuple(len(dim_labels) for dim_labels in self.labels)))
+
+    def group(self, key) -> np.ndarray:
+        """
+        Lương đã sắp xếp của một nhóm.
+        """
+        g = self.group_id(key)
+        return self.values[self.offsets[g]:self.offsets[g + 1]]
+
+    # PERCENTILE CỦA MỘT NHÓM HOẶC HỢP NHIỀU NHÓM
+    def _kth(self, segments: list, k: int) -> float:
+        """
+        Phần tử thứ k (bắt đầu từ 0) của hợp các đoạn đã sắp xếp, tìm kiếm
+        nhị phân trên từng đoạn (không cần gộp các đoạn).
+        """
+        for seg in segments:
+            lo, hi = 0, len(seg)
+            while lo < hi:
+                mid = (lo + hi) // 2
+                value = seg[mid]
+                # Số phần tử < value và <= value trong hợp các đoạn
+                less = sum(np.searchsorted(s, value, side='left') for s in segments)
+                less_equal = sum(np.searchsorted(s, value, side='right') for s in segments)
+
+                if less > k:
+                    hi = mid
+                elif less_equal > k:
+                    return float(value)
+                else:
+                    lo = mid + 1
+
+        raise IndexError(k)
+
+    def quantile(self, q, keys=None) -> float:
+        """
+        Quantile lương (nội suy tuyến tính như np.percentile / Series.quantile).
+
+        Tham số:
+            q: Mức quantile trong [0, 1]
+            keys: Một nhóm (nhãn hoặc tuple nhãn) -> tra O(1);
+                list nhóm -> quantile của hợp các nhóm (tìm kiếm nhị phân);
+                None -> toàn bộ dữ liệu
+
+        Trả về:
+            Giá trị quantile (NaN nếu không có dữ liệu)
+        """
+        if keys is None:
+            groups = range(self.n_groups)
+        elif isinstance(keys, list):
+            groups = [self.group_id(key) for key in keys]
+        else:
+            groups = [self.group_id(keys)]
+
+        segments = [self.values[self.offsets[g]:self.offsets[g + 1]] for g in groups]
+        segments = [seg for seg in segments if len(seg)]
+        n = sum(len(seg) for seg in segments)
+
+        if n == 0:
+            return np.nan
+
+        pos = q * (n - 1)
+        k = int(np.floor(pos))
+
+        if len(segments) == 1:
+            lower, upper = segments[0][k], segments[0][min(k + 1, n - 1)]
+        else:
+            lower = self._kth(segments, k)
+            upper = self._kth(segments, min(k + 1, n - 1))
+
+        return float(_lerp(np.float64(lower), np.float64(upper), pos - k))
+
+    # BẢNG CHO MỌI NHÓM
+    def _group_frame(self, groups: np.ndarray) -> pd.DataFrame:
+        shape = tuple(len(dim_labels) for dim_labels in self.labels)
+        codes = np.unravel_index(groups, shape)
+
+        return pd.DataFrame({
+            dim: np.asarray(dim_labels, dtype=object)[dim_codes]
+            for dim, dim_codes, dim_labels in zip(self.by, codes, self.labels)
+        })
+
+    def _nonempty(self):
+        starts, ends = self.offsets[:-1], self.offsets[1:]
+        groups = np.flatnonzero(ends > starts)
+        return groups, starts[groups], ends[groups] - starts[groups]
+
+    def _quantiles(self, q: float, starts: np.ndarray, sizes: np.ndarray) -> np.ndarray:
+        pos = q * (sizes - 1)
+        k = np.floor(pos).astype(np.int64)
+        lower = self.values[starts + k].astype(float)
+        upper = self.values[starts + np.minimum(k + 1, sizes - 1)].astype(float)
+        return _lerp(lower, upper, pos - k)
+
+    def percentile_table(self, percentiles: list = None) -> pd.DataFrame:
+        """
+        Bảng percentile lương của mọi nhóm có dữ liệu.
+
+        Tham số:
+            percentiles: List mức percentile 0-100 (mặc định DEFAULT_PERCENTILES)
+
+        Trả về:
+            DataFrame: các cột nhóm, Count, P10, P25, ... (theo thứ tự nhóm)
+        """
+        percentiles = DEFAULT_PERCENTILES if percentiles is None else percentiles
+        groups, starts, sizes = self._nonempty()
+
+        table = self._group_frame(groups)
+        table['Count'] = sizes
+        for p in percentiles:
+            table[f'P{p:g}'] = self._quantiles(p / 100, starts, sizes)
+
+        return table
+
+    def summary(self) -> pd.DataFrame:
+        """
+        Count, Mean, Median, Min, Max, Std (ddof=1) của mọi nhóm có dữ liệu,
+        tương đương groupby(by).agg(...) nhưng không cần groupby.
+        """
+        groups, starts, sizes = self._nonempty()
+        values = self.values.astype(float)
+
+        if len(groups):
+            mean = np.add.reduceat(values, starts) / sizes
+            m2 = np.add.reduceat((values - np.repeat(mean, sizes)) ** 2, starts)
+        else:
+            mean = m2 = np.empty(0)
+
+        table = self._group_frame(groups)
+        table['Count'] = sizes
+        table['Mean'] = mean
+        table['Median'] = self._quantiles(0.5, starts, sizes)
+        table['Min'] = self.values[starts].astype(self.dtype)
+        table['Max'] = self.values[starts + sizes - 1].astype(self.dtype)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            table['Std'] = np.where(sizes > 1, np.sqrt(m2 / (sizes - 1)), np.nan)
+
+        return table
+
+    def segments(self) -> list:
+        """
+        Lương đã sắp xếp của từng nhóm có dữ liệu (cùng thứ tự dòng với summary()).
+        """
+        groups, starts, sizes = self._nonempty()
+        return [self.values[start:start + size] for start, size in zip(starts, sizes)]
+
+
+# BOOTSTRAP KHOẢNG TIN CẬY CHO MEDIAN
+def _order_statistic_medians(n: int, lookup, n_boot: int, rng) -> np.ndarray:
+    """
+    Median của n_boot mẫu bootstrap (lấy lại n phần tử có hoàn lại), không
+    cần tạo mẫu: phần tử thứ r của mẫu là lookup(U_(r)) với U_(r) là thống kê
+    thứ tự của n biến đều, U_(r) ~ Beta(r + 1, n - r). Chi phí O(n_boot) mỗi nhóm.
+
+    Tham số:
+        n: Số giá trị của nhóm
+        lookup: Hàm nhận mảng mức u trong [0, 1) trả về giá trị values[floor(u * n)]
+    """
+    lo_k, hi_k = (n - 1) // 2, n // 2
+    u_lo = rng.beta(lo_k + 1, n - lo_k, size=n_boot)
+
+    if hi_k == lo_k:
+        return lookup(u_lo)
+
+    # Thống kê thứ tự kế tiếp: min của n - lo_k - 1 điểm đều còn lại trên (u_lo, 1)
+    u_hi = u_lo + (1 - u_lo) * rng.beta(1, n - lo_k - 1, size=n_boot)
+
+    return (lookup(u_lo) + lookup(u_hi)) / 2
+
+
+def _resample_medians(values: np.ndarray, n_boot: int, rng, max_elements: int = 5_000_000) -> np.ndarray:
+    """
+    Median của n_boot mẫu bootstrap bằng ma trận chỉ số lấy mẫu (n_boot x n),
+    chia thành từng khối tối đa max_elements phần tử để giới hạn bộ nhớ.
+
+    values đã sắp xếp nên median của mẫu là giá trị tại chỉ số median của
+    mẫu chỉ số (np.partition trên số nguyên, không sắp xếp giá trị).
+    """
+    n = len(values)
+    lo_k, hi_k = (n - 1) // 2, n // 2
+    medians = np.empty(n_boot)
+    step = max(1, max_elements // n)
+
+    for start in range(0, n_boot, step):
+        idx = rng.integers(0, n, size=(min(step, n_boot - start), n), dtype=np.int32)
+        idx = np.partition(idx, [lo_k, hi_k], axis=1)
+        medians[start:start + len(idx)] = (values[idx[:, lo_k]] + values[idx[:, hi_k]]) / 2
+
+    return medians
+
+
+def bootstrap_median_ci(groups: list, n_boot: int = 1000, confidence: float = 0.95, seed: int = 0,
+                        method: str = 'order_statistic') -> tuple:
+    """
+    Khoảng tin cậy bootstrap (percentile) cho median của từng nhóm.
+
+    Tham số:
+        groups: List mảng lương đã sắp xếp tăng dần, mỗi nhóm một mảng
+        n_boot: Số mẫu bootstrap
+        confidence: Mức tin cậy (mặc định 0.95 -> percentile 2.5 và 97.5)
+        seed: Seed, các nhóm dùng chung một bộ sinh theo thứ tự trong groups
+        method: 'order_statistic' (lấy mẫu trực tiếp median của mẫu bootstrap,
+            O(n_boot) mỗi nhóm) hoặc 'resample' (ma trận lấy mẫu n_boot x n
+            mỗi nhóm). Hai cách cho cùng phân phối.
+
+    Trả về:
+        Tuple (mảng cận dưới, mảng cận trên), NaN với nhóm rỗng
+    """
+    if method not in ('order_statistic', 'resample'):
+        raise ValueError("method phải là 'order_statistic' hoặc 'resample'")
+
+    rng = np.random.default_rng(seed)
+    alpha = (1 - confidence) / 2
+    low, high = np.full(len(groups), np.nan), np.full(len(groups), np.nan)
+
+    for i, group in enumerate(groups):
+        values = np.asarray(group, dtype=float)
+        n = len(values)
+        if n == 0:
+            continue
+
+        if method == 'resample':
+            medians = _resample_medians(values, n_boot, rng)
+        else:
+            medians = _order_statistic_medians(
+                n, lambda u: values[np.minimum((u * n).astype(np.int64), n - 1)], n_boot, rng)
+
+        low[i], high[i] = np.percentile(medians, [alpha * 100, (1 - alpha) * 100])
+
+    return low, high
@@ -0,0 +1,150 @@
+# schema.py - Kế hoạch kiểu dữ liệu (dtype plan) cho bảng respondent
+# file này khai báo kiểu dữ liệu gọn nhẹ cho từng cột và áp dụng khi đọc dữ liệu:
+# 1. category cho các cột ít giá trị khác nhau (RemoteWork, AISelect, ...), các cột
+#    multi-select (DevType, LanguageHaveWorkedWith, ...) chỉ khi ít tổ hợp khác nhau
+# 2. số nguyên nullable cho số năm kinh nghiệm
+# 3. thu nhỏ độ rộng số thực khi không làm mất giá trị (trừ cột lương CompTotal,
+#    giữ float64 để mean/median trong các bảng lương không bị lệch)
+# và báo cáo lượng bộ nhớ tiết kiệm được.
+
+import numpy as np
+import pandas as pd
+
+
+# Kiểu dữ liệu mong muốn cho từng cột.
+# 'auto' = chuyển sang category nếu số giá trị khác nhau <= AUTO_CATEGORY_RATIO * số dòng
+DTYPE_PLAN = {
+    'Year': 'uint16',
+    'MainBranch': 'category',
+    'Age': 'category',
+    'DevType': 'auto',
+    'RemoteWork': 'category',
+    'AISelect': 'category',
+    'LanguageHaveWorkedWith': 'auto',
+    'Frustration': 'auto',
+    'YearsCodePro': 'UInt8',
+    # float32 làm lệch mean/median đã làm tròn 2 chữ số (VD: 64725.47 -> 64725.48)
+    'CompTotal': 'float64',
+}
+
+AUTO_CATEGORY_RATIO = 0.5
+
+
+def _cast_column(s: pd.Series, dtype: str) -> pd.Series:
+    """
+    Ép kiểu một cột theo kế hoạch. Nếu ép kiểu làm mất giá trị (số lẻ, tràn
+    phạm vi, mất độ chính xác) thì giữ nguyên cột.
+    """
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        return s
+
+    if dtype == 'auto':
+        if s.nunique(dropna=True) <= AUTO_CATEGORY_RATIO * len(s):
+            return s.astype('category')
+        return s
+
+    if dtype == 'category':
+        return s.astype('category')
+
+    if not pd.api.types.is_numeric_dtype(s):
+        return s
+
+    values = s.to_numpy(dtype=float, na_value=np.nan)
+    valid = values[~np.isnan(values)]
+    target = pd.api.types.pandas_dtype(dtype)
+
+    if target.kind in 'iu':
+        # Kiểu nguyên numpy không chứa được giá trị rỗng, kiểu nullable (UInt8...) thì được
+        nullable = isinstance(target, pd.api.extensions.ExtensionDtype)
+        info = np.iinfo(target.numpy_dtype if nullable else target)
+
+        if len(valid) < len(values) and not nullable:
+            return s
+        if len(valid) and (not np.all(valid == np.round(valid))
+                           or valid.min() < info.min or valid.max() > info.max):
+            return s
+
+        return s.astype(target)
+
+    if target.kind == 'f':
+        cast = values.astype(target)
+        if not np.array_equal(cast.astype(float), values, equal_nan=True):
+            return s
+        return pd.Series(cast, index=s.index, name=s.name)
+
+    return s.astype(target)
+
+
+# HÀM ÁP DỤNG KẾ HOẠCH KIỂU DỮ LIỆU
+def apply_dtype_plan(df: pd.DataFrame, plan: dict = None, verbose: bool = False) -> pd.DataFrame:
+    """
+    Chuyển các cột sang kiểu dữ liệu gọn nhẹ theo DTYPE_PLAN.
+
+    Tham số:
+        df: DataFrame cần chuyển kiểu
+        plan: Dictionary {cột: kiểu}, mặc định DTYPE_PLAN. Cột không có
+            trong df được bỏ qua.
+        verbose: True = in ra lượng bộ nhớ tiết kiệm được
+
+    Trả về:
+        DataFrame mới với kiểu dữ liệu đã thu gọn
+    """
+    plan = DTYPE_PLAN if plan is None else plan
+
+    result = df.copy(deep=False)
+    for col, dtype in plan.items():
+        if col in result.columns:
+            result[col] = _cast_column(result[col], dtype)
+
+    if verbose:
+        report = memory_report(df, result)
+        before, after = report.loc['Total', 'Before_MB'], report.loc['Total', 'After_MB']
+        saved = report.loc['Total', 'Saved_%']
+        print(f"Bộ nhớ: {before:.2f} MB -> {after:.2f} MB (giảm {saved:.1f}%)")
+
+    return result
+
+
+def fixed_dtype_plan(df: pd.DataFrame, plan: dict = None) -> dict:
+    """
+    Kế hoạch kiểu dữ liệu cố định (không còn 'auto') theo kết quả áp dụng
+    plan trên df, dùng cho các chunk sau của cùng một bảng để mọi chunk có
+    cùng kiểu (VD: khi ghi theo chunk ở cleaning.run_cleaning_two_pass).
+
+    Tham số:
+        df: Chunk đầu tiên (chưa chuyển kiểu)
+        plan: Dictionary {cột: kiểu}, mặc định DTYPE_PLAN
+
+    Trả về:
+        Dictionary {cột: kiểu} chỉ gồm các cột có trong df
+    """
+    plan = DTYPE_PLAN if plan is None else plan
+    applied = apply_dtype_plan(df, plan)
+
+    return {
+        col: 'category' if isinstance(applied[col].dtype, pd.CategoricalDtype) else str(applied[col].dtype)
+        for col in plan if col in applied.columns
+    }
+
+
+# HÀM BÁO CÁO BỘ NHỚ
+def memory_report(before: pd.DataFrame, after: pd.DataFrame) -> pd.DataFrame:
+    """
+    So sánh bộ nhớ từng cột trước và sau khi áp dụng kế hoạch kiểu dữ liệu.
+
+    Tham số:
+        before: DataFrame trước khi chuyển kiểu
+        after: DataFrame sau khi chuyển kiểu
+
+    Trả về:
+        DataFrame với các cột Before_MB, After_MB, Saved_% theo từng cột và dòng 'Total'
+    """
+    mb = 1024 ** 2
+    before_mem = before.memory_usage(index=False, deep=True) / mb
+    after_mem = after.memory_usage(index=False, deep=True) / mb
+
+    report = pd.DataFrame({'Before_MB': before_mem, 'After_MB': after_mem})
+    report.loc['Total'] = report.sum()
+    report['Saved_%'] = ((1 - report['After_MB'] / report['Before_MB']) * 100).round(2)
+
+    return report
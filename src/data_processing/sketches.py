@@ -0,0 +1,329 @@
+# sketches.py - Các cấu trúc dữ liệu xấp xỉ (sketch) cho xử lý streaming
+# file này cung cấp các sketch có thể cập nhật theo từng chunk và gộp (merge)
+# với nhau, dùng khi dữ liệu quá lớn để nạp toàn bộ vào bộ nhớ:
+# 1. KLLSketch: ước lượng quantile (Q1, median, Q3, ...) trong một lần duyệt
+# 2. SpaceSavingSketch: top-k giá trị xuất hiện nhiều nhất (heavy hitters)
+#    với cận sai số đảm bảo cho từng giá trị
+# 3. SortedValues: bản chính xác cùng giao diện với KLLSketch (giữ toàn bộ
+#    giá trị đã sắp xếp, các đoạn đã sắp xếp được gộp một lần khi đọc)
+
+import numpy as np
+import pandas as pd
+
+
+# KLL QUANTILE SKETCH
+class KLLSketch:
+    """
+    Sketch ước lượng quantile theo thuật toán KLL (Karnin-Lang-Liberty).
+
+    Dữ liệu được lưu trong nhiều "compactor" (tầng). Tầng h chứa các phần tử
+    đại diện cho 2^h giá trị gốc. Khi một tầng vượt sức chứa, nó được sắp xếp
+    và giữ lại một nửa (chẵn hoặc lẻ, chọn ngẫu nhiên) đẩy lên tầng trên.
+    Bộ nhớ chỉ khoảng O(k) phần tử, không phụ thuộc số dòng đã duyệt.
+
+    Sai số:
+        Sai số về hạng (rank) chuẩn hoá của quantile trả về vào khoảng 2 / k
+        với độ tin cậy cao (k=200 -> khoảng 1%, tức giá trị trả về cho mức q
+        nằm giữa quantile thật ở mức q - 0.01 và q + 0.01). Khi chưa có tầng
+        nào bị nén (n nhỏ hơn khoảng k), kết quả là chính xác và trùng với
+        np.percentile.
+
+    Tham số:
+        k: Sức chứa tầng cao nhất, càng lớn càng chính xác (mặc định 200)
+        seed: Seed cho bộ sinh ngẫu nhiên (để kết quả lặp lại được)
+    """
+
+    def __init__(self, k: int = 200, seed=None):
+        self.k = k
+        self.n = 0
+        self.levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level: int) -> int:
+        # Tầng càng thấp sức chứa càng nhỏ theo hệ số 2/3
+        depth = len(self.levels) - level - 1
+        return max(2, int(np.ceil(self.k * (2 / 3) ** depth)))
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+
+            if len(items) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+
+                items = np.sort(items)
+
+                # Số lẻ phần tử: giữ lại phần tử cuối ở tầng hiện tại
+                keep = items[len(items) - len(items) % 2:]
+                items = items[:len(items) - len(items) % 2]
+
+                offset = self._rng.integers(2)
+                self.levels[level] = keep
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], items[offset::2]])
+
+            level += 1
+
+    def update(self, values):
+        """
+        Thêm một mảng giá trị (VD: một chunk của cột CompTotal) vào sketch.
+        Giá trị NaN bị bỏ qua.
+        """
+        values = np.asarray(values, dtype=float).ravel()
+        values = values[~np.isnan(values)]
+
+        if len(values) == 0:
+            return self
+
+        self.n += len(values)
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+
+        return self
+
+    def merge(self, other: "KLLSketch"):
+        """
+        Gộp một sketch khác (VD: của một shard/file khác) vào sketch này.
+        """
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+
+        self.n += other.n
+        self._compress()
+
+        return self
+
+    def quantile(self, q):
+        """
+        Ước lượng quantile.
+
+        Tham số:
+            q: Một số hoặc list các mức quantile trong [0, 1] (VD: [0.25, 0.75])
+
+        Trả về:
+            Giá trị quantile (cùng dạng với q)
+        """
+        q_arr = np.asarray(q, dtype=float)
+
+        if self.n == 0:
+            return np.full(q_arr.shape, np.nan) if q_arr.ndim else np.nan
+
+        # Chưa nén lần nào -> dữ liệu còn đầy đủ, tính chính xác
+        if len(self.levels) == 1:
+            return np.percentile(self.levels[0], q_arr * 100)
+
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([
+            np.full(len(level_items), 2.0 ** level)
+            for level, level_items in enumerate(self.levels)
+        ])
+
+        order = np.argsort(items, kind='stable')
+        items = items[order]
+        cum_weights = np.cumsum(weights[order])
+
+        idx = np.searchsorted(cum_weights, q_arr * cum_weights[-1], side='left')
+        idx = np.clip(idx, 0, len(items) - 1)
+
+        return items[idx]
+
+    def values(self) -> np.ndarray:
+        """
+        Các giá trị đại diện đã sắp xếp (phần tử ở tầng h lặp lại 2^h lần),
+        dùng như một mẫu có kích thước ~n (VD: cho bootstrap).
+        """
+        if not self.levels:
+            return np.empty(0)
+
+        return np.sort(np.concatenate([
+            np.repeat(level_items, 2 ** level) for level, level_items in enumerate(self.levels)
+        ]))
+
+    def __len__(self):
+        return self.n
+
+
+
+# QUANTILE CHÍNH XÁC (CÙNG GIAO DIỆN VỚI KLLSKETCH)
+class SortedValues:
+    """
+    Giữ toàn bộ giá trị đã sắp xếp: quantile luôn chính xác (trùng với
+    np.percentile), bộ nhớ O(n). Dùng thay KLLSketch khi cần kết quả chính
+    xác, VD khi gộp các shard của cùng một dữ liệu.
+
+    update / merge chỉ lưu lại các đoạn đã sắp xếp (runs), các đoạn được gộp
+    một lần khi đọc giá trị (quantile / values), nên gộp nhiều shard không
+    phải sắp xếp lại toàn bộ mảng sau mỗi lần gộp.
+    """
+
+    def __init__(self):
+        self.items = np.empty(0)
+        self.runs = []
+
+    def __setstate__(self, state):
+        # Trạng thái lưu từ bản cũ chưa có runs
+        state.setdefault('runs', [])
+        self.__dict__.update(state)
+
+    @property
+    def n(self) -> int:
+        return len(self.items) + sum(len(run) for run in self.runs)
+
+    def _insert(self, values: np.ndarray):
+        self.runs.append(values)
+
+    def _flush(self) -> np.ndarray:
+        # Các đoạn đã sắp xếp: sắp xếp ổn định (timsort) chỉ cần gộp các đoạn
+        if self.runs:
+            self.items = np.sort(np.concatenate([self.items] + self.runs), kind='stable')
+            self.runs = []
+
+        return self.items
+
+    def update(self, values):
+        """
+        Thêm một mảng giá trị, bỏ qua NaN.
+        """
+        values = np.asarray(values, dtype=float).ravel()
+        values = np.sort(values[~np.isnan(values)])
+
+        if len(values):
+            self._insert(values)
+
+        return self
+
+    def merge(self, other: "SortedValues"):
+        if other.n:
+            self.runs.extend([other.items] + other.runs)
+
+        return self
+
+    def quantile(self, q):
+        q_arr = np.asarray(q, dtype=float)
+
+        if self.n == 0:
+            return np.full(q_arr.shape, np.nan) if q_arr.ndim else np.nan
+
+        return np.percentile(self._flush(), q_arr * 100)
+
+    def values(self) -> np.ndarray:
+        return self._flush()
+
+    def __len__(self):
+        return self.n
+
+
+
+# SPACE-SAVING (HEAVY HITTERS)
+class SpaceSavingSketch:
+    """
+    Sketch Space-Saving: đếm xấp xỉ tần suất các giá trị, chỉ giữ tối đa
+    capacity bộ đếm, dùng để lấy top-k giá trị phổ biến nhất của một luồng dữ
+    liệu bất kỳ độ lớn.
+
+    Mỗi chunk được đếm chính xác rồi gộp vào sketch như một sketch khác (cùng
+    cách với merge), nên sketch có thể cập nhật theo chunk và gộp giữa các shard.
+    Khi gộp, giá trị không có trong một bên được tính bằng "sàn" của bên đó
+    (bộ đếm nhỏ nhất khi bên đó đã đầy, 0 nếu chưa đầy), sau đó chỉ giữ
+    capacity bộ đếm lớn nhất.
+
+    Sai số:
+        Với mọi giá trị được giữ: Count - Error <= số lần thật <= Count.
+        Giá trị không được giữ có số lần thật <= floor(). Khi số giá trị khác
+        nhau không vượt capacity, kết quả là chính xác (Error = 0).
+
+    Tham số:
+        capacity: Số bộ đếm tối đa (mặc định 1000)
+    """
+
+    def __init__(self, capacity: int = 1000):
+        self.capacity = capacity
+        self.n = 0
+        # Giữ thứ tự xuất hiện đầu tiên (bằng nhau thì giá trị đến trước đứng trước)
+        self.counts = {}
+        self.errors = {}
+
+    def floor(self) -> int:
+        """
+        Cận trên số lần xuất hiện của một giá trị không có trong sketch.
+        """
+        if len(self.counts) < self.capacity:
+            return 0
+        return min(self.counts.values())
+
+    def _combine(self, counts: dict, errors: dict, other_floor: int, other_n: int):
+        own_floor = self.floor()
+
+        # Giá trị của sketch này (theo thứ tự cũ) cộng sàn của bên kia, sau đó
+        # chỉ duyệt các giá trị của bên kia (thay sàn bằng số đếm thật)
+        merged_counts = {item: count + other_floor for item, count in self.counts.items()}
+        merged_errors = {item: error + other_floor for item, error in self.errors.items()}
+        for item, count in counts.items():
+            error = errors.get(item, other_floor)
+            if item in merged_counts:
+                merged_counts[item] += count - other_floor
+                merged_errors[item] += error - other_floor
+            else:
+                merged_counts[item] = own_floor + count
+                merged_errors[item] = own_floor + error
+
+        # Chỉ giữ capacity bộ đếm lớn nhất, vẫn theo thứ tự xuất hiện
+        if len(merged_counts) > self.capacity:
+            order = sorted(merged_counts, key=lambda item: -merged_counts[item])
+            keep = set(order[:self.capacity])
+            merged_counts = {item: c for item, c in merged_counts.items() if item in keep}
+            merged_errors = {item: merged_errors[item] for item in merged_counts}
+
+        self.counts, self.errors = merged_counts, merged_errors
+        self.n += other_n
+
+        return self
+
+    def update(self, items):
+        """
+        Thêm một mảng giá trị (VD: các token của một chunk). Giá trị rỗng bị bỏ qua.
+        """
+        counts = pd.Series(items, dtype=object).dropna().value_counts(sort=False)
+        return self.update_counts(dict(zip(counts.index, counts.tolist())))
+
+    def update_counts(self, counts: dict):
+        """
+        Thêm số đếm chính xác {giá trị: số lần} của một chunk.
+        """
+        return self._combine(counts, {}, 0, int(sum(counts.values())))
+
+    def merge(self, other: "SpaceSavingSketch"):
+        """
+        Gộp một sketch khác (VD: của một shard/file khác) vào sketch này.
+        """
+        return self._combine(other.counts, other.errors, other.floor(), other.n)
+
+    def top(self, k: int = None) -> pd.DataFrame:
+        """
+        Top-k giá trị theo số đếm ước lượng (giảm dần, bằng nhau thì giữ thứ tự
+        xuất hiện).
+
+        Trả về:
+            DataFrame index là giá trị, các cột:
+            - Count: số đếm ước lượng (cận trên)
+            - Error: sai số tối đa (số lần thật >= Count - Error)
+            - Guaranteed: True nếu chắc chắn thuộc top-k thật
+        """
+        table = pd.DataFrame({'Count': pd.Series(self.counts, dtype='int64'),
+                              'Error': pd.Series(self.errors, dtype='int64')})
+        table = table.sort_values('Count', ascending=False, kind='stable')
+
+        k = len(table) if k is None else k
+        # Giá trị ngoài top-k có số lần thật <= Count của hạng k + 1 (hoặc floor)
+        threshold = max(table['Count'].iloc[k] if len(table) > k else 0, self.floor())
+        table = table.head(k)
+        table['Guaranteed'] = table['Count'] - table['Error'] >= threshold
+
+        return table
+
+    def __len__(self):
+        return self.n
@@ -0,0 +1,481 @@
+# sql_backend.py - Chạy phân tích trên engine SQL nhúng (SQLite hoặc DuckDB)
+# file này cho phép dữ liệu đã transform lớn hơn RAM:
+# 1. load_survey: đọc file đã transform theo từng chunk và ghi vào một file
+#    database (SQLite có sẵn trong Python, DuckDB là tuỳ chọn):
+#    - bảng respondents: mỗi respondent một dòng (rid + các cột gốc)
+#    - bảng tokens_<cột>: mỗi cặp (rid, mã token) của một cột multi-select
+#    - bảng vocabulary: token của từng cột theo thứ tự xuất hiện đầu tiên
+#    - bảng metadata: số dòng, kiểu cột lương gốc
+# 2. SQLBackend: các phép tính cơ bản mà analysis.py dùng (đếm, crosstab,
+#    co-occurrence, thống kê / percentile lương theo nhóm) được tính bằng
+#    GROUP BY / window function trong engine, chỉ kết quả nhỏ được đưa về
+#    pandas. Kết quả có cùng dạng với bản pandas (CountTable, bảng đếm
+#    token, bảng thống kê lương) để các hàm phân tích dùng chung phần còn lại.
+#
+# Các câu SQL chỉ dùng cú pháp chung của SQLite và DuckDB (không dùng phép
+# chia số nguyên, hàm median / sqrt); phần nội suy percentile và căn bậc hai
+# làm bằng numpy với cùng công thức như salary_index.py.
+
+import os
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from counting import CountTable
+from encoding import MULTI_SELECT_COLUMNS, encode_multi_select
+from salary_index import _lerp
+from storage import iter_table_chunks
+
+
+SALARY_COLUMN = 'CompTotal'
+ENGINES = ('sqlite', 'duckdb')
+
+
+def _connect(path: str, engine: str):
+    """
+    Mở kết nối tới file database.
+    """
+    if engine == 'sqlite':
+        return sqlite3.connect(path)
+
+    if engine == 'duckdb':
+        try:
+            import duckdb
+        except ImportError as e:
+            raise ImportError("engine='duckdb' cần thư viện duckdb (pip install duckdb)") from e
+        return duckdb.connect(path)
+
+    raise ValueError(f"engine phải là một trong {ENGINES}")
+
+
+def _quote(name: str) -> str:
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def _tokens_table(col: str) -> str:
+    return _quote(f'tokens_{col}')
+
+
+def _insert(con, engine: str, table: str, frame: pd.DataFrame):
+    """
+    Ghi thêm các dòng của frame vào bảng đã tạo (cùng thứ tự cột).
+    """
+    if engine == 'duckdb':
+        con.register('_chunk', frame)
+        con.execute(f'INSERT INTO {_quote(table)} SELECT * FROM _chunk')
+        con.unregister('_chunk')
+    else:
+        frame.to_sql(table, con, if_exists='append', index=False)
+
+
+# HÀM NẠP DỮ LIỆU VÀO DATABASE (THEO TỪNG CHUNK)
+def load_survey(input_path: str, db_path: str, engine: str = 'sqlite', chunksize: int = 100_000,
+                multi_select: list = None) -> str:
+    """
+    Nạp file đã transform vào file database, đọc theo từng chunk nên không
+    cần giữ toàn bộ dữ liệu trong bộ nhớ. File database cũ (nếu có) bị ghi đè.
+
+    Tham số:
+        input_path: File đã transform (.parquet, .feather hoặc .csv)
+        db_path: File database đầu ra
+        engine: 'sqlite' hoặc 'duckdb'
+        chunksize: Số dòng mỗi chunk
+        multi_select: Các cột multi-select được tách thành bảng token
+            (mặc định encoding.MULTI_SELECT_COLUMNS)
+
+    Trả về:
+        db_path
+    """
+    multi_select = MULTI_SELECT_COLUMNS if multi_select is None else multi_select
+    if os.path.exists(db_path):
+        os.remove(db_path)
+
+    con = _connect(db_path, engine)
+    vocabulary = {}
+    n_rows, salary_dtype, columns = 0, 'float64', None
+
+    for chunk in iter_table_chunks(input_path, chunksize=chunksize):
+        if columns is None:
+            columns = list(chunk.columns)
+            numeric = [col for col in columns if pd.api.types.is_numeric_dtype(chunk[col])
+                       and not isinstance(chunk[col].dtype, pd.CategoricalDtype)]
+            if SALARY_COLUMN in chunk.columns:
+                salary_dtype = str(chunk[SALARY_COLUMN].dtype)
+
+            definitions = ', '.join(['rid BIGINT'] + [f'{_quote(col)} {"DOUBLE" if col in numeric else "VARCHAR"}'
+                                                       for col in columns])
+            con.execute(f'CREATE TABLE respondents ({definitions})')
+            for col in multi_select:
+                if col in columns:
+                    vocabulary[col] = {}
+                    con.execute(f'CREATE TABLE {_tokens_table(col)} (rid BIGINT, token_id INTEGER)')
+
+        rid = np.arange(n_rows, n_rows + len(chunk))
+
+        # Cột số lưu dạng float (NaN -> NULL), cột khác lưu dạng chuỗi
+        frame = pd.DataFrame({'rid': rid})
+        for col in columns:
+            values = chunk[col]
+            if col in numeric:
+                frame[col] = values.astype('float64').to_numpy()
+            else:
+                frame[col] = values.astype(object).where(values.notna(), None).to_numpy()
+        _insert(con, engine, 'respondents', frame)
+
+        # Token của từng cột multi-select (mã token theo thứ tự xuất hiện đầu tiên trong cả file)
+        for col, token_ids in vocabulary.items():
+            encoding = encode_multi_select(chunk[col])
+            ids = np.array([token_ids.setdefault(token, len(token_ids)) for token in encoding.vocabulary],
+                           dtype=np.int64)
+            row_ids = np.repeat(np.arange(len(chunk)), np.diff(encoding.matrix.indptr))
+            _insert(con, engine, f'tokens_{col}',
+                    pd.DataFrame({'rid': rid[row_ids], 'token_id': ids[encoding.matrix.indices]}))
+
+        n_rows += len(chunk)
+
+    con.execute('CREATE TABLE vocabulary (col VARCHAR, token_id INTEGER, token VARCHAR)')
+    for col, token_ids in vocabulary.items():
+        _insert(con, engine, 'vocabulary', pd.DataFrame({'col': col, 'token_id': list(token_ids.values()),
+                                                          'token': list(token_ids)}, columns=['col', 'token_id',
+                                                                                              'token']))
+        con.execute(f'CREATE INDEX {_quote(f"idx_tokens_{col}")} ON {_tokens_table(col)} (token_id, rid)')
+        con.execute(f'CREATE INDEX {_quote(f"idx_tokens_{col}_rid")} ON {_tokens_table(col)} (rid)')
+
+    con.execute('CREATE TABLE metadata (key VARCHAR, value VARCHAR)')
+    _insert(con, engine, 'metadata', pd.DataFrame({'key': ['n_rows', 'salary_dtype'],
+                                                   'value': [str(n_rows), salary_dtype]}))
+    con.commit()
+    con.close()
+
+    return db_path
+
+
+# TOKEN CỦA MỘT CỘT MULTI-SELECT TRONG DATABASE
+class SQLTokens:
+    """
+    Cùng các phép tính với encoding.MultiHotEncoding (counts, crosstab,
+    cooccurrence) nhưng tính bằng SQL trên bảng tokens_<cột>.
+    """
+
+    def __init__(self, backend: "SQLBackend", column: str):
+        self.backend = backend
+        self.column = column
+        vocab = backend.query('SELECT token_id, token FROM vocabulary WHERE col = ? ORDER BY token_id', (column,))
+        self.vocabulary = list(vocab['token'])
+
+    @property
+    def n_tokens(self) -> int:
+        return len(self.vocabulary)
+
+    def _frame(self, table: np.ndarray, columns) -> pd.DataFrame:
+        return pd.DataFrame(table, index=pd.Index(self.vocabulary, name=self.column), columns=columns)
+
+    def counts(self) -> pd.Series:
+        """
+        Số respondent chọn mỗi token, giảm dần (bằng nhau thì giữ thứ tự xuất hiện).
+        """
+        rows = self.backend.query(f'SELECT token_id, COUNT(*) AS n FROM {_tokens_table(self.column)} '
+                                  f'GROUP BY token_id')
+        counts = np.zeros(self.n_tokens, dtype=np.int64)
+        counts[rows['token_id'].to_numpy(dtype=np.int64)] = rows['n'].to_numpy(dtype=np.int64)
+        order = np.argsort(-counts, kind='stable')
+
+        return pd.Series(counts[order], index=pd.Index(np.asarray(self.vocabulary, dtype=object)[order],
+                                                        name=self.column), name='count')
+
+    def crosstab(self, values) -> pd.DataFrame:
+        """
+        Bảng đếm token x giá trị của một cột đơn.
+
+        Tham số:
+            values: Tên cột (hoặc Series có name là tên cột) trong bảng respondents
+        """
+        col = values if isinstance(values, str) else values.name
+        labels = self.backend.labels(col)
+        rows = self.backend.query(
+            f'SELECT t.token_id, r.{_quote(col)} AS value, COUNT(*) AS n '
+            f'FROM {_tokens_table(self.column)} t JOIN respondents r ON r.rid = t.rid '
+            f'WHERE r.{_quote(col)} IS NOT NULL GROUP BY t.token_id, r.{_quote(col)}'
+        )
+        codes = pd.Index(labels).get_indexer(rows['value'])
+        keep = codes >= 0
+
+        table = np.zeros((self.n_tokens, len(labels)), dtype=np.int64)
+        table[rows['token_id'].to_numpy(dtype=np.int64)[keep], codes[keep]] = rows['n'].to_numpy(dtype=np.int64)[keep]
+
+        return self._frame(table, pd.Index(labels, name=col))
+
+    def cooccurrence(self, other: "SQLTokens") -> pd.DataFrame:
+        """
+        Ma trận đồng xuất hiện token của cột này x token của cột khác.
+        """
+        rows = self.backend.query(
+            f'SELECT a.token_id AS a, b.token_id AS b, COUNT(*) AS n '
+            f'FROM {_tokens_table(self.column)} a JOIN {_tokens_table(other.column)} b ON a.rid = b.rid '
+            f'GROUP BY a.token_id, b.token_id'
+        )
+        table = np.zeros((self.n_tokens, other.n_tokens), dtype=np.int64)
+        table[rows['a'].to_numpy(dtype=np.int64), rows['b'].to_numpy(dtype=np.int64)] = rows['n'].to_numpy(dtype=np.int64)
+
+        return self._frame(table, pd.Index(other.vocabulary, name=other.column))
+
+
+# KẾT NỐI + CÁC PHÉP TÍNH CƠ BẢN
+class SQLBackend:
+    """
+    Database đã nạp bằng load_survey.
+
+    Tham số:
+        path: File database
+        engine: 'sqlite' hoặc 'duckdb'
+        categories: Dictionary {cột: list nhãn theo thứ tự} của các cột
+            category có thứ tự (giống storage.read_table), VD:
+            {'ExperienceLevel': EXPERIENCE_LABELS}. Cột khác sắp xếp theo nhãn.
+
+    Thuộc tính:
+        columns: Các cột của bảng respondents (không gồm rid)
+        n_rows: Số respondent
+        salary_dtype: Kiểu cột lương gốc (min/max trả về cùng kiểu, mean/median
+            luôn là float64, giống SalaryIndex.summary)
+    """
+
+    def __init__(self, path: str, engine: str = 'sqlite', categories: dict = None):
+        self.path = path
+        self.engine = engine
+        self.categories = dict(categories or {})
+        self.con = _connect(path, engine)
+
+        metadata = dict(self.query('SELECT key, value FROM metadata').to_numpy())
+        self.n_rows = int(metadata['n_rows'])
+        self.salary_dtype = metadata['salary_dtype']
+        self.columns = [col for col in self.query('SELECT * FROM respondents LIMIT 0').columns if col != 'rid']
+        self._tokens = {}
+
+    def query(self, sql: str, params: tuple = ()) -> pd.DataFrame:
+        """
+        Chạy một câu SELECT, trả về DataFrame.
+        """
+        if self.engine == 'duckdb':
+            return self.con.execute(sql, list(params)).df()
+        return pd.read_sql_query(sql, self.con, params=params)
+
+    def close(self):
+        self.con.close()
+
+    def labels(self, col: str) -> list:
+        """
+        Nhãn của một cột theo thứ tự mã (giống counting.dimension_codes).
+        """
+        if col in self.categories:
+            return list(self.categories[col])
+
+        rows = self.query(f'SELECT DISTINCT {_quote(col)} AS v FROM respondents WHERE {_quote(col)} IS NOT NULL '
+                          f'ORDER BY {_quote(col)}')
+        return list(rows['v'])
+
+    def tokens(self, col: str) -> SQLTokens:
+        if col not in self._tokens:
+            self._tokens[col] = SQLTokens(self, col)
+        return self._tokens[col]
+
+    # ĐẾM THEO CÁC CỘT ĐƠN
+    def count_codes(self, dims: list) -> CountTable:
+        """
+        Giống counting.count_codes: số dòng theo mọi tổ hợp giá trị của dims
+        (dòng có giá trị rỗng ở bất kỳ cột nào bị bỏ qua).
+        """
+        columns = ', '.join(_quote(dim) for dim in dims)
+        not_null = ' AND '.join(f'{_quote(dim)} IS NOT NULL' for dim in dims)
+        rows = self.query(f'SELECT {columns}, COUNT(*) AS n FROM respondents WHERE {not_null} GROUP BY {columns}')
+
+        labels = [self.labels(dim) for dim in dims]
+        codes = [pd.Index(dim_labels).get_indexer(rows[dim]) for dim, dim_labels in zip(dims, labels)]
+        keep = np.all([dim_codes >= 0 for dim_codes in codes], axis=0)
+
+        counts = np.zeros(tuple(len(dim_labels) for dim_labels in labels), dtype=np.int64)
+        counts[tuple(dim_codes[keep] for dim_codes in codes)] = rows['n'].to_numpy(dtype=np.int64)[keep]
+
+        return CountTable(dims, labels, counts)
+
+    def value_rows(self, columns: list) -> pd.DataFrame:
+        """
+        Các dòng của bảng respondents chỉ gồm columns, dựng lại từ số đếm của
+        từng tổ hợp giá trị khác nhau (theo thứ tự xuất hiện đầu tiên).
+        """
+        selected = ', '.join(_quote(col) for col in columns)
+        combos = self.query(f'SELECT {selected}, COUNT(*) AS n, MIN(rid) AS first FROM respondents '
+                            f'GROUP BY {selected} ORDER BY first')
+        repeats = np.repeat(np.arange(len(combos)), combos['n'].to_numpy(dtype=np.int64))
+
+        return combos[columns].iloc[repeats].reset_index(drop=True)
+
+    # LƯƠNG THEO NHÓM
+    def _salary_source(self, by: list, token_col: str = None, tokens: list = None) -> tuple:
+        """
+        Câu SELECT các dòng (nhóm, lương x) có lương và đủ giá trị nhóm.
+        Cột token_col (multi-select) được nối với bảng token, chỉ giữ tokens.
+
+        Trả về:
+            Tuple (câu SQL, tham số)
+        """
+        select, joins, where, params = [], [], [f'r.{_quote(SALARY_COLUMN)} IS NOT NULL'], []
+
+        for dim in by:
+            if dim == token_col:
+                joins.append(f'JOIN {_tokens_table(dim)} t ON t.rid = r.rid')
+                joins.append('JOIN vocabulary v ON v.col = ? AND v.token_id = t.token_id')
+                params.append(dim)
+                select.append(f'v.token AS {_quote(dim)}')
+                if tokens is not None:
+                    where.append(f'v.token IN ({", ".join("?" * len(tokens))})')
+                    params.extend(tokens)
+            else:
+                select.append(f'r.{_quote(dim)} AS {_quote(dim)}')
+                where.append(f'r.{_quote(dim)} IS NOT NULL')
+
+        select.append(f'r.{_quote(SALARY_COLUMN)} AS x')
+        sql = f'SELECT {", ".join(select)} FROM respondents r {" ".join(joins)} WHERE {" AND ".join(where)}'
+
+        return sql, tuple(params)
+
+    def _order_statistics(self, source: str, params: tuple, by: list, qs: list) -> pd.DataFrame:
+        """
+        Các phần tử ở vị trí floor(q * (n - 1)) và kế tiếp trong từng nhóm
+        (đánh số i từ 0 theo lương tăng dần), đủ để nội suy quantile q.
+
+        Trả về:
+            DataFrame: các cột by, i, cnt (số phần tử của nhóm), x
+        """
+        groups = ', '.join(_quote(dim) for dim in by)
+        windows = ' OR '.join('(i > (cnt - 1) * ? - 1 AND i <= (cnt - 1) * ? + 1)' for _ in qs)
+        sql = (
+            f'WITH src AS ({source}), '
+            f'ranked AS (SELECT {groups}, x, ROW_NUMBER() OVER (PARTITION BY {groups} ORDER BY x) - 1 AS i, '
+            f'COUNT(*) OVER (PARTITION BY {groups}) AS cnt FROM src) '
+            f'SELECT {groups}, i, cnt, x FROM ranked WHERE {windows}'
+        )
+        return self.query(sql, params + tuple(q for q in qs for _ in range(2)))
+
+    @staticmethod
+    def _quantiles(stats: pd.DataFrame, points: pd.DataFrame, by: list, q: float) -> np.ndarray:
+        # Nội suy quantile q cho từng dòng của stats (cùng công thức với SalaryIndex)
+        sizes = stats['Count'].to_numpy(dtype=np.int64)
+        pos = q * (sizes - 1)
+        k = np.floor(pos).astype(np.int64)
+
+        def at(i):
+            keys = stats[by].assign(i=i)
+            return keys.merge(points, on=by + ['i'], how='left')['x'].to_numpy(dtype=float)
+
+        return _lerp(at(k), at(np.minimum(k + 1, sizes - 1)), pos - k)
+
+    def _sorted_groups(self, table: pd.DataFrame, by: list) -> pd.DataFrame:
+        # Sắp xếp theo thứ tự mã của từng cột nhóm (category theo thứ tự nhãn, cột khác theo nhãn)
+        keys = [table[dim].map({label: i for i, label in enumerate(self.categories[dim])})
+                if dim in self.categories else table[dim] for dim in by]
+        order = pd.DataFrame({f'_{i}': key.to_numpy() for i, key in enumerate(keys)})
+        order = order.sort_values(list(order.columns), kind='stable').index
+
+        return table.iloc[order].reset_index(drop=True)
+
+    def salary_summary(self, by: list, token_col: str = None, tokens: list = None) -> pd.DataFrame:
+        """
+        Giống SalaryIndex.build(df, by).summary(): Count, Mean, Median, Min,
+        Max, Std (ddof=1) của mọi nhóm có lương.
+
+        Tham số:
+            by: List cột nhóm
+            token_col: Cột multi-select trong by (mỗi token là một nhóm)
+            tokens: Chỉ giữ các token này của token_col (None = tất cả)
+        """
+        source, params = self._salary_source(by, token_col, tokens)
+        groups = ', '.join(_quote(dim) for dim in by)
+        joined = ' AND '.join(f'src.{_quote(dim)} = stats.{_quote(dim)}' for dim in by)
+
+        stats = self.query(
+            f'WITH src AS ({source}), '
+            f'stats AS (SELECT {groups}, COUNT(*) AS n, AVG(x) AS mean, MIN(x) AS lo, MAX(x) AS hi '
+            f'FROM src GROUP BY {groups}) '
+            f'SELECT {", ".join(f"stats.{_quote(dim)}" for dim in by)}, stats.n, stats.mean, stats.lo, stats.hi, '
+            f'SUM((src.x - stats.mean) * (src.x - stats.mean)) AS m2 '
+            f'FROM src JOIN stats ON {joined} '
+            f'GROUP BY {", ".join(f"stats.{_quote(dim)}" for dim in by)}, stats.n, stats.mean, stats.lo, stats.hi',
+            params
+        )
+        stats = self._sorted_groups(stats, by)
+        points = self._order_statistics(source, params, by, [0.5])
+
+        sizes = stats['n'].to_numpy(dtype=np.int64)
+        table = stats[by].astype(object)
+        table['Count'] = sizes
+        table['Mean'] = stats['mean'].to_numpy(dtype=float)
+        table['Median'] = self._quantiles(table, points, by, 0.5)
+        table['Min'] = stats['lo'].to_numpy(dtype=float).astype(self.salary_dtype)
+        table['Max'] = stats['hi'].to_numpy(dtype=float).astype(self.salary_dtype)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            table['Std'] = np.where(sizes > 1, np.sqrt(stats['m2'].to_numpy(dtype=float) / (sizes - 1)), np.nan)
+
+        return table
+
+    def salary_percentiles(self, by: list, percentiles: list) -> pd.DataFrame:
+        """
+        Giống SalaryIndex.build(df, by).percentile_table(percentiles).
+        """
+        source, params = self._salary_source(by)
+        groups = ', '.join(_quote(dim) for dim in by)
+
+        counts = self.query(f'WITH src AS ({source}) SELECT {groups}, COUNT(*) AS n FROM src GROUP BY {groups}',
+                            params)
+        counts = self._sorted_groups(counts, by)
+        points = self._order_statistics(source, params, by, [p / 100 for p in percentiles])
+
+        table = counts[by].astype(object)
+        table['Count'] = counts['n'].to_numpy(dtype=np.int64)
+        for p in percentiles:
+            table[f'P{p:g}'] = self._quantiles(table, points, by, p / 100)
+
+        return table
+
+    def salary_values(self, filters: dict, token_col: str = None) -> np.ndarray:
+        """
+        Lương đã sắp xếp của các dòng thoả filters {cột: giá trị} (VD cho bootstrap).
+        """
+        source, params = self._salary_source(list(filters), token_col)
+        where = ' AND '.join(f'{_quote(col)} = ?' for col in filters)
+        rows = self.query(f'WITH src AS ({source}) SELECT x FROM src WHERE {where} ORDER BY x',
+                          params + tuple(filters.values()))
+
+        return rows['x'].to_numpy(dtype=float)
+
+    def token_salary_medians(self, col: str, by: str) -> pd.DataFrame:
+        """
+        Median lương của người dùng và không dùng từng token của cột col,
+        theo từng giá trị của cột by (chỉ dòng có lương và có giá trị by).
+
+        Trả về:
+            DataFrame: token_id, by, uses (True = người dùng), n, median
+        """
+        source = (
+            f'SELECT v.token_id AS token_id, r.{_quote(by)} AS {_quote(by)}, '
+            f'CASE WHEN t.rid IS NULL THEN 0 ELSE 1 END AS uses, r.{_quote(SALARY_COLUMN)} AS x '
+            f'FROM vocabulary v CROSS JOIN respondents r '
+            f'LEFT JOIN {_tokens_table(col)} t ON t.token_id = v.token_id AND t.rid = r.rid '
+            f'WHERE v.col = ? AND r.{_quote(SALARY_COLUMN)} IS NOT NULL AND r.{_quote(by)} IS NOT NULL'
+        )
+        groups = ['token_id', by, 'uses']
+        points = self._order_statistics(source, (col,), groups, [0.5])
+
+        # Median = trung bình hai phần tử giữa (cùng cách với analyze_language_salary_uplift)
+        points = points.sort_values(groups + ['i'], kind='stable')
+        sizes = points['cnt'].to_numpy(dtype=np.int64)
+        index = points['i'].to_numpy(dtype=np.int64)
+        lower = points[index == (sizes - 1) // 2].set_index(groups)
+        upper = points[index == sizes // 2].set_index(groups)
+
+        result = lower[['cnt']].rename(columns={'cnt': 'n'})
+        result['median'] = (lower['x'].to_numpy(dtype=float) + upper.loc[lower.index, 'x'].to_numpy(dtype=float)) / 2
+        result = result.reset_index()
+        result['uses'] = result['uses'].astype(bool)
+
+        return result
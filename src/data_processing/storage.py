@@ -0,0 +1,303 @@
+# storage.py - Đọc/ghi bảng dữ liệu trung gian giữa các bước pipeline
+# file này chọn định dạng theo đuôi file:
+# 1. .parquet (mặc định giữa các bước): nhị phân, lưu theo cột, giữ nguyên
+#    kiểu dữ liệu (kể cả category có thứ tự của ExperienceLevel)
+# 2. .feather: nhị phân, đọc/ghi rất nhanh, không nén nhiều
+# 3. .csv: dùng để xuất dữ liệu cho người đọc/công cụ khác
+# Parquet/Feather cần thư viện pyarrow.
+# Các file .npz build cùng lúc với bảng (cube, multi-hot, bitmap) lưu dấu vân
+# tay của file bảng (table_fingerprint) để phát hiện file cũ không còn khớp.
+
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+
+
+SUPPORTED_FORMATS = ('.parquet', '.feather', '.csv')
+
+# Số dòng mỗi row group khi ghi Parquet: read_table_rows chỉ giải mã các
+# row group chứa đoạn dòng cần đọc
+PARQUET_ROW_GROUP_SIZE = 100_000
+
+
+def _get_format(path: str) -> str:
+    """
+    Lấy định dạng từ đuôi file, báo lỗi nếu không hỗ trợ.
+    """
+    ext = os.path.splitext(str(path))[1].lower()
+
+    if ext not in SUPPORTED_FORMATS:
+        raise ValueError(f"Định dạng '{ext}' không được hỗ trợ, dùng một trong {SUPPORTED_FORMATS}")
+
+    return ext
+
+
+def _restore_categories(df: pd.DataFrame, categories: dict) -> pd.DataFrame:
+    """
+    Khôi phục kiểu category có thứ tự cho các cột trong categories khi đọc
+    từ CSV (CSV chỉ lưu chuỗi nên mất thông tin thứ tự).
+    """
+    for col, labels in (categories or {}).items():
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = pd.Categorical(df[col], categories=labels, ordered=True)
+
+    return df
+
+
+# HÀM ĐỌC BẢNG
+def read_table(path: str, columns: list = None, categories: dict = None) -> pd.DataFrame:
+    """
+    Đọc bảng dữ liệu trung gian, định dạng theo đuôi file.
+
+    Tham số:
+        path: Đường dẫn file (.parquet, .feather hoặc .csv)
+        columns: Chỉ đọc các cột này (None = đọc tất cả)
+        categories: Dictionary {cột: list nhãn theo thứ tự} để khôi phục kiểu
+            category có thứ tự khi file không lưu kiểu (CSV),
+            VD: {'ExperienceLevel': EXPERIENCE_LABELS}
+
+    Trả về:
+        DataFrame
+    """
+    fmt = _get_format(path)
+
+    if fmt == '.parquet':
+        df = pd.read_parquet(path, columns=columns)
+    elif fmt == '.feather':
+        df = pd.read_feather(path, columns=columns)
+    else:
+        df = pd.read_csv(path, usecols=columns)
+
+    return _restore_categories(df, categories)
+
+
+# HÀM ĐỌC MỘT ĐOẠN DÒNG CỦA BẢNG
+def count_table_rows(path: str) -> int:
+    """
+    Số dòng của bảng, không nạp dữ liệu (Parquet đọc metadata, Feather đọc số
+    dòng từng record batch, CSV đọc theo chunk chỉ một cột).
+    """
+    fmt = _get_format(path)
+
+    if fmt == '.csv':
+        first = list(pd.read_csv(path, nrows=0).columns[:1])
+        return sum(len(chunk) for chunk in iter_table_chunks(path, columns=first))
+
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if fmt == '.parquet':
+        return pq.ParquetFile(path).metadata.num_rows
+
+    with pa.memory_map(path) as source:
+        reader = pa.ipc.open_file(source)
+        return sum(reader.get_batch(i).num_rows for i in range(reader.num_record_batches))
+
+
+def read_table_rows(path: str, start: int, stop: int, columns: list = None,
+                    categories: dict = None) -> pd.DataFrame:
+    """
+    Đọc các dòng [start, stop) của bảng, không nạp cả file (VD: mỗi process
+    đọc shard của mình trong incremental.run_sharded).
+
+    Parquet chỉ đọc các row group chứa đoạn dòng, Feather chỉ đọc các record
+    batch chứa đoạn dòng, CSV bỏ qua các dòng trước start khi đọc.
+
+    Tham số:
+        path: Đường dẫn file (.parquet, .feather hoặc .csv)
+        start, stop: Đoạn dòng cần đọc (đánh số từ 0, không gồm stop)
+        columns, categories: Giống read_table
+
+    Trả về:
+        DataFrame (index từ 0)
+    """
+    fmt = _get_format(path)
+
+    if fmt == '.csv':
+        df = pd.read_csv(path, usecols=columns, skiprows=range(1, start + 1), nrows=max(stop - start, 0))
+        return _restore_categories(df, categories)
+
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if fmt == '.parquet':
+        parquet_file = pq.ParquetFile(path)
+        sizes = [parquet_file.metadata.row_group(i).num_rows for i in range(parquet_file.num_row_groups)]
+        offsets = np.concatenate([[0], np.cumsum(sizes, dtype=np.int64)])
+        groups = [i for i in range(len(sizes)) if offsets[i] < stop and offsets[i + 1] > start]
+        table = parquet_file.read_row_groups(groups, columns=columns) if groups else \
+            parquet_file.schema_arrow.empty_table().select(columns or parquet_file.schema_arrow.names)
+        first = offsets[groups[0]] if groups else start
+        df = table.slice(start - first, max(stop - start, 0)).to_pandas()
+        return _restore_categories(df, categories)
+
+    with pa.memory_map(path) as source:
+        reader = pa.ipc.open_file(source)
+        batches, offset = [], 0
+        for i in range(reader.num_record_batches):
+            batch = reader.get_batch(i)
+            if offset < stop and offset + batch.num_rows > start:
+                batches.append(batch.slice(max(start - offset, 0), min(stop, offset + batch.num_rows)
+                                           - max(start, offset)))
+            offset += batch.num_rows
+        table = pa.Table.from_batches(batches, schema=reader.schema)
+        df = (table.select(columns) if columns is not None else table).to_pandas()
+
+    return _restore_categories(df, categories)
+
+
+# HÀM ĐỌC BẢNG THEO TỪNG CHUNK
+def iter_table_chunks(path: str, columns: list = None, chunksize: int = 100_000):
+    """
+    Đọc bảng dữ liệu trung gian theo từng chunk, không nạp toàn bộ file.
+
+    Tham số:
+        path: Đường dẫn file (.parquet, .feather hoặc .csv)
+        columns: Chỉ đọc các cột này (None = đọc tất cả)
+        chunksize: Số dòng tối đa mỗi chunk (Feather đọc theo record batch đã ghi)
+
+    Trả về:
+        Generator các DataFrame chunk
+    """
+    fmt = _get_format(path)
+
+    if fmt == '.csv':
+        with pd.read_csv(path, usecols=columns, chunksize=chunksize) as reader:
+            yield from reader
+        return
+
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if fmt == '.parquet':
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize, columns=columns):
+            yield batch.to_pandas()
+        return
+
+    with pa.memory_map(path) as source:
+        reader = pa.ipc.open_file(source)
+        for i in range(reader.num_record_batches):
+            batch = reader.get_batch(i)
+            yield (batch.select(columns) if columns is not None else batch).to_pandas()
+
+
+# HÀM GHI BẢNG
+def write_table(df: pd.DataFrame, path: str):
+    """
+    Ghi bảng dữ liệu trung gian, định dạng theo đuôi file.
+
+    Tham số:
+        df: DataFrame cần ghi
+        path: Đường dẫn file (.parquet, .feather hoặc .csv)
+    """
+    fmt = _get_format(path)
+
+    if fmt == '.parquet':
+        df.to_parquet(path, index=False, row_group_size=PARQUET_ROW_GROUP_SIZE)
+    elif fmt == '.feather':
+        df.reset_index(drop=True).to_feather(path)
+    else:
+        df.to_csv(path, index=False)
+
+
+# DẤU VÂN TAY CỦA BẢNG
+def table_fingerprint(path: str, n_rows: int) -> str:
+    """
+    Dấu vân tay của một file bảng: số dòng + SHA-1 nội dung file (đọc theo
+    khối, không nạp cả file). Ghi lại bảng (kể cả cùng dữ liệu) cho dấu vân
+    tay mới, nên các file .npz build từ bản cũ bị phát hiện.
+
+    Tham số:
+        path: File bảng đã ghi (.parquet, .feather hoặc .csv)
+        n_rows: Số dòng của bảng
+    """
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+
+    return f'{n_rows}:{digest.hexdigest()}'
+
+
+def check_fingerprint(stored, fingerprint: str, path: str):
+    """
+    Báo lỗi nếu file path không được build từ bảng có dấu vân tay fingerprint
+    (stored = dấu vân tay lưu trong file, None nếu file không có).
+    fingerprint=None: không kiểm tra.
+    """
+    if fingerprint is not None and stored != fingerprint:
+        raise ValueError(f"File '{path}' không khớp với bảng dữ liệu (file cũ hoặc của bảng khác), "
+                         f"chạy lại transform để build lại")
+
+
+# GHI BẢNG THEO TỪNG CHUNK
+class ChunkWriter:
+    """
+    Ghi dần từng chunk DataFrame vào một file (.csv hoặc .parquet),
+    dùng cho các bước streaming không giữ toàn bộ dữ liệu trong bộ nhớ.
+
+    Nếu không có chunk nào được ghi, close() vẫn tạo file rỗng với các cột
+    columns (để bước sau đọc được).
+
+    Ví dụ:
+        with ChunkWriter('out.parquet', columns=selected_columns) as writer:
+            for chunk in chunks:
+                writer.write(chunk)
+    """
+
+    def __init__(self, path: str, columns: list = None):
+        self.path = path
+        self.columns = list(columns or [])
+        self.format = _get_format(path)
+        self._parquet_writer = None
+        self._schema = None
+        self._header = True
+        self._written = False
+
+        if self.format == '.feather':
+            raise ValueError("Feather không hỗ trợ ghi theo chunk, dùng .parquet hoặc .csv")
+
+    def write(self, df: pd.DataFrame):
+        self._written = True
+
+        if self.format == '.csv':
+            df.to_csv(self.path, mode='w' if self._header else 'a', header=self._header, index=False)
+            self._header = False
+            return
+
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if self._parquet_writer is None:
+            # Cột toàn giá trị rỗng ở chunk đầu được coi là chuỗi, cột category
+            # dùng chỉ số int32 (chunk sau có thể có nhiều nhãn hơn chunk đầu)
+            schema = pa.Schema.from_pandas(df, preserve_index=False)
+            for i, field in enumerate(schema):
+                if pa.types.is_null(field.type):
+                    schema = schema.set(i, field.with_type(pa.string()))
+                elif pa.types.is_dictionary(field.type):
+                    value_type = pa.string() if pa.types.is_null(field.type.value_type) else field.type.value_type
+                    schema = schema.set(i, field.with_type(pa.dictionary(pa.int32(), value_type,
+                                                                         field.type.ordered)))
+            self._schema = schema
+            self._parquet_writer = pq.ParquetWriter(self.path, schema)
+
+        table = pa.Table.from_pandas(df, schema=self._schema, preserve_index=False)
+        self._parquet_writer.write_table(table)
+
+    def close(self):
+        if not self._written:
+            # Chưa ghi chunk nào: ghi file rỗng chỉ có tên cột
+            self.write(pd.DataFrame(columns=self.columns))
+
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+            self._parquet_writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
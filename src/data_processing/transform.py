@@ -8,8 +8,162 @@
 import pandas as pd
 import numpy as np
 
+from bitmap_index import build_bitmap_index, save_bitmap_index
+from cube import DEFAULT_SKETCH_K, build_cube, save_cube
+from encoding import encode_survey, save_multi_hot
+from schema import apply_dtype_plan
+from storage import read_table, table_fingerprint, write_table
+
+
+# Các mốc chia nhóm kinh nghiệm và nhãn tương ứng
+EXPERIENCE_BINS = [0, 1, 2, 5, 10, 20, np.inf]  # Các mốc: 0-1, 1-2, 3-5, 6-10, 11-20, 21+
+EXPERIENCE_LABELS = ['Fresher (<1)', 'Junior (1-2)', 'Mid-level (3-5)',
+                     'Senior (6-10)', 'Lead/Staff (11-20)', 'Principal+ (21+)']
+
+# Các cách chia nhóm kinh nghiệm (khai báo): {tên cột: {'bins': mốc, 'labels': nhãn}}
+# Khoảng của nhóm i là (bins[i], bins[i+1]], riêng nhóm đầu tiên gồm cả bins[0].
+# - ExperienceLevel: nhóm mặc định dùng trong mọi báo cáo
+# - ExperienceLevelFine: nhóm chi tiết hơn cho đường cong lương
+EXPERIENCE_SCHEMES = {
+    'ExperienceLevel': {
+        'bins': EXPERIENCE_BINS,
+        'labels': EXPERIENCE_LABELS,
+    },
+    'ExperienceLevelFine': {
+        'bins': [0, 1, 2, 3, 4, 5, 6, 8, 10, 12, 15, 20, 25, 30, np.inf],
+        'labels': ['0-1', '2', '3', '4', '5', '6', '7-8', '9-10', '11-12',
+                   '13-15', '16-20', '21-25', '26-30', '31+'],
+    },
+}
+
+# Mapping nhãn RemoteWork về dạng ngắn gọn.
+# Gồm cả nhãn của các năm survey khác (VD: 2022 dùng "Fully remote",
+# "Full in-person") để dữ liệu nhiều năm có cùng bộ nhãn.
+REMOTE_WORK_MAPPING = {
+    'Remote': 'Remote',
+    'Fully remote': 'Remote',
+    'Hybrid (some remote, some in-person)': 'Hybrid',
+    'Hybrid (some in-person, leans heavy to flexibility)': 'Hybrid',
+    'Hybrid (some remote, leans heavy to in-person)': 'Hybrid',
+    'In-person': 'In-person',
+    'Full in-person': 'In-person',
+    # Giá trị đã chuẩn hoá giữ nguyên
+    'Hybrid': 'Hybrid',
+}
+
+# Mapping nhãn AISelect về dạng ngắn gọn.
+# Từ 2025 câu trả lời "Yes" được tách theo tần suất sử dụng.
+AI_SELECT_MAPPING = {
+    'Yes': 'Using AI',
+    'Yes, I use AI tools daily': 'Using AI',
+    'Yes, I use AI tools weekly': 'Using AI',
+    'Yes, I use AI tools monthly or infrequently': 'Using AI',
+    'No, but I plan to soon': 'Planning',
+    "No, and I don't plan to": 'Not Using',
+    # Giá trị đã chuẩn hoá giữ nguyên
+    'Using AI': 'Using AI',
+    'Planning': 'Planning',
+    'Not Using': 'Not Using',
+}
+
 
 # HÀM TẠO NHÓM KINH NGHIỆM 
+def experience_bin_codes(years, schemes: dict = None) -> tuple:
+    """
+    Tính mã nhóm kinh nghiệm (số nguyên) cho nhiều cách chia nhóm cùng lúc.
+
+    Mảng số năm chỉ được duyệt một lần: mỗi giá trị được định vị trong hợp
+    của tất cả các mốc (np.searchsorted), sau đó mã của từng cách chia được
+    suy ra bằng bảng tra nhỏ. Kết quả giống pd.cut(..., include_lowest=True).
+
+    Tham số:
+        years: Mảng/Series số năm kinh nghiệm (NaN được phép)
+        schemes: Dictionary các cách chia nhóm, mặc định EXPERIENCE_SCHEMES
+
+    Trả về:
+        Tuple (codes, label_table):
+        - codes: Dictionary {tên: mảng int8}, -1 = rỗng/ngoài khoảng
+        - label_table: DataFrame các cột Scheme, Code, Label, Lower, Upper
+    """
+    schemes = EXPERIENCE_SCHEMES if schemes is None else schemes
+
+    values = pd.Series(years).to_numpy(dtype=float, na_value=np.nan)
+    all_edges = np.unique(np.concatenate([np.asarray(s['bins'], dtype=float) for s in schemes.values()]))
+
+    # Duyệt dữ liệu một lần: vị trí b nghĩa là all_edges[b-1] < giá trị <= all_edges[b]
+    base = np.searchsorted(all_edges, values, side='left')
+    base[np.isnan(values)] = len(all_edges)
+
+    codes = {}
+    labels = []
+    for name, scheme in schemes.items():
+        edges = np.asarray(scheme['bins'], dtype=float)
+
+        # Bảng tra: vị trí trong all_edges -> mã nhóm của cách chia này
+        lookup = np.searchsorted(edges, all_edges, side='left') - 1
+        lookup[(all_edges <= edges[0]) | (all_edges > edges[-1])] = -1
+        lookup = np.append(lookup, -1).astype(np.int8)
+
+        scheme_codes = lookup[base]
+        # include_lowest: giá trị bằng mốc đầu tiên thuộc nhóm đầu tiên
+        scheme_codes[values == edges[0]] = 0
+        codes[name] = scheme_codes
+
+        labels.append(pd.DataFrame({
+            'Scheme': name,
+            'Code': np.arange(len(scheme['labels']), dtype=np.int8),
+            'Label': scheme['labels'],
+            'Lower': edges[:-1],
+            'Upper': edges[1:],
+        }))
+
+    return codes, pd.concat(labels, ignore_index=True)
+
+
+def experience_level_columns(df: pd.DataFrame, schemes: dict = None,
+                             col: str = 'YearsCodePro') -> dict:
+    """
+    Tính các cột nhóm kinh nghiệm theo nhiều cách chia trong một lần gọi.
+    Mỗi cột là category có thứ tự tạo trực tiếp từ mã số nguyên
+    (Categorical.from_codes), nên chỉ lưu mã int8 + bảng nhãn dùng chung.
+
+    Tham số:
+        df: DataFrame chứa dữ liệu
+        schemes: Dictionary các cách chia nhóm, mặc định EXPERIENCE_SCHEMES
+        col: Tên cột chứa số năm kinh nghiệm (mặc định 'YearsCodePro')
+
+    Trả về:
+        Dictionary {tên cột: Series category}
+    """
+    schemes = EXPERIENCE_SCHEMES if schemes is None else schemes
+    codes, _ = experience_bin_codes(df[col], schemes)
+
+    return {
+        name: pd.Series(
+            pd.Categorical.from_codes(codes[name], categories=schemes[name]['labels'], ordered=True),
+            index=df.index, name=name
+        )
+        for name in schemes
+    }
+
+
+def experience_level_column(df: pd.DataFrame, col: str = 'YearsCodePro') -> pd.Series:
+    """
+    Tính cột 'ExperienceLevel' (chỉ trả về cột mới, không copy DataFrame).
+    Xem create_experience_bins để biết các nhóm.
+    
+    Tham số:
+        df: DataFrame chứa dữ liệu
+        col: Tên cột chứa số năm kinh nghiệm (mặc định 'YearsCodePro')
+    
+    Trả về:
+        Series category có thứ tự chứa nhóm kinh nghiệm
+    """
+    schemes = {'ExperienceLevel': EXPERIENCE_SCHEMES['ExperienceLevel']}
+
+    return experience_level_columns(df, schemes, col)['ExperienceLevel']
+
+
 def create_experience_bins(df: pd.DataFrame, col: str = 'YearsCodePro') -> pd.DataFrame:
     """
     Chia số năm kinh nghiệm thành các nhóm ) để dễ phân tích.
@@ -29,20 +183,9 @@ def create_experience_bins(df: pd.DataFrame, col: str = 'YearsCodePro') -> pd.Da
     Trả về:
         DataFrame với cột mới 'ExperienceLevel' chứa nhóm kinh nghiệm
     """
-    # Định nghĩa các mốc chia nhóm và nhãn tương ứng
-    # Fresher: 0-1 năm, Junior: 1-2 năm, v.v.
-    bins = [0, 1, 2, 5, 10, 20, np.inf]  # Các mốc: 0-1, 1-2, 3-5, 6-10, 11-20, 21+
-    labels = ['Fresher (<1)', 'Junior (1-2)', 'Mid-level (3-5)', 
-              'Senior (6-10)', 'Lead/Staff (11-20)', 'Principal+ (21+)']
-    
-    # Tạo cột mới với pd.cut() để phân nhóm
+    # Tạo cột mới bằng experience_bin_codes (searchsorted + bảng tra, không dùng pd.cut)
     df = df.copy()  # Tránh SettingWithCopyWarning
-    df['ExperienceLevel'] = pd.cut(
-        df[col], 
-        bins=bins, 
-        labels=labels, 
-        include_lowest=True  # Bao gồm giá trị 0
-    )
+    df['ExperienceLevel'] = experience_level_column(df, col)
     
     return df
 
@@ -65,31 +208,47 @@ def explode_multi_select(df: pd.DataFrame, col: str, sep: str = ';') -> pd.DataF
     Trả về:
         DataFrame mới với các dòng đã được mở rộng (exploded)
     """
-    df = df.copy()
-    
-    # Bước 1: Tách chuỗi thành list bằng str.split()
+    # Bước 1: Mã hoá các tổ hợp khác nhau theo thứ tự xuất hiện, chỉ split các tổ hợp
     # VD: "Python;JavaScript" -> ["Python", "JavaScript"]
-    df[col] = df[col].str.split(sep)
+    combo_codes, combos = pd.factorize(df[col], sort=False)
+    tokens = pd.Series(np.asarray(combos, dtype=object)).str.split(sep).explode()
+    
+    # Bước 2: Loại bỏ khoảng trắng thừa ở đầu/cuối và các giá trị rỗng (nếu có)
+    tokens = tokens.str.strip()
+    tokens = tokens[tokens.notna() & (tokens != '')]
     
-    # Bước 2: Explode - mỗi phần tử trong list thành một dòng riêng
-    df = df.explode(col)
+    # Bước 3: Explode - mỗi dòng lấy lại các token của tổ hợp tương ứng (giữ thứ tự,
+    # token lặp lại trong một dòng vẫn được giữ như DataFrame.explode)
+    lengths = np.bincount(tokens.index.to_numpy(dtype=np.int64), minlength=len(combos) + 1)
+    starts = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+    row_codes = np.where(combo_codes >= 0, combo_codes, len(combos))
+    row_lengths = lengths[row_codes]
     
-    # Bước 3: Loại bỏ khoảng trắng thừa ở đầu/cuối
-    df[col] = df[col].str.strip()
+    rows = np.repeat(np.arange(len(df)), row_lengths)
+    offsets = np.arange(len(rows)) - np.repeat(np.cumsum(row_lengths) - row_lengths, row_lengths)
     
-    # Bước 4: Loại bỏ các dòng rỗng (nếu có)
-    df = df[df[col].notna() & (df[col] != '')]
+    df = df.iloc[rows].copy()
+    df[col] = tokens.to_numpy()[np.repeat(starts[row_codes], row_lengths) + offsets]
     
     return df
 
 
 
 #  HÀM CHUẨN HOÁ GIÁ TRỊ REMOTEWORK
+def remote_work_column(df: pd.DataFrame) -> pd.Series:
+    """
+    Tính cột RemoteWork đã chuẩn hoá (chỉ trả về cột mới, không copy DataFrame).
+    Xem standardize_remote_work.
+    """
+    # Mapping từ giá trị gốc sang giá trị ngắn gọn
+    return df['RemoteWork'].map(REMOTE_WORK_MAPPING)
+
+
 def standardize_remote_work(df: pd.DataFrame) -> pd.DataFrame:
     """
     Chuẩn hoá nhãn cột RemoteWork cho ngắn gọn và dễ hiển thị.
     
-    Chuyển đổi:
+    Chuyển đổi (xem đầy đủ ở REMOTE_WORK_MAPPING):
     - "Remote" -> "Remote"
     - "Hybrid (some remote, some in-person)" -> "Hybrid"
     - "In-person" -> "In-person"
@@ -102,24 +261,25 @@ def standardize_remote_work(df: pd.DataFrame) -> pd.DataFrame:
     """
     df = df.copy()
     
-    # Mapping từ giá trị gốc sang giá trị ngắn gọn
-    mapping = {
-        'Remote': 'Remote',
-        'Hybrid (some remote, some in-person)': 'Hybrid',
-        'In-person': 'In-person'
-    }
-    
-    df['RemoteWork'] = df['RemoteWork'].map(mapping)
+    df['RemoteWork'] = remote_work_column(df)
     
     return df
 
 
 # HÀM CHUẨN HOÁ GIÁ TRỊ AI SELECT
+def ai_select_column(df: pd.DataFrame) -> pd.Series:
+    """
+    Tính cột AISelect đã chuẩn hoá (chỉ trả về cột mới, không copy DataFrame).
+    Xem standardize_ai_select.
+    """
+    return df['AISelect'].map(AI_SELECT_MAPPING)
+
+
 def standardize_ai_select(df: pd.DataFrame) -> pd.DataFrame:
     """
     Chuẩn hoá nhãn cột AISelect cho ngắn gọn.
     
-    Chuyển đổi:
+    Chuyển đổi (xem đầy đủ ở AI_SELECT_MAPPING):
     - "Yes" -> "Using AI"
     - "No, but I plan to soon" -> "Planning"
     - "No, and I don't plan to" -> "Not Using"
@@ -132,50 +292,119 @@ def standardize_ai_select(df: pd.DataFrame) -> pd.DataFrame:
     """
     df = df.copy()
     
-    mapping = {
-        'Yes': 'Using AI',
-        'No, but I plan to soon': 'Planning',
-        "No, and I don't plan to": 'Not Using'
-    }
-    
-    df['AISelect'] = df['AISelect'].map(mapping)
+    df['AISelect'] = ai_select_column(df)
     
     return df
 
 
+# Các bước transform dạng cột: {tên cột kết quả: hàm tính cột}
+COLUMN_STEPS = {
+    'ExperienceLevel': experience_level_column,
+    'RemoteWork': remote_work_column,
+    'AISelect': ai_select_column,
+}
+
+
+# HÀM ÁP DỤNG CÁC BƯỚC TRANSFORM LÊN DATAFRAME
+def transform_survey(df: pd.DataFrame, inplace: bool = False,
+                     experience_schemes: dict = None) -> pd.DataFrame:
+    """
+    Áp dụng các bước biến đổi lên DataFrame đã clean (không đọc/ghi file).
+
+    Mỗi bước trong COLUMN_STEPS chỉ tính cột mới/cột thay thế, sau đó các cột
+    được gắn vào bảng. Bảng không bị copy lại ở mỗi bước như khi gọi lần lượt
+    create_experience_bins, standardize_remote_work, standardize_ai_select.
+
+    Tham số:
+        df: DataFrame sau khi clean
+        inplace: True = gắn cột trực tiếp vào df (df bị thay đổi),
+            False = gắn vào một bản copy nông (không copy dữ liệu, df giữ nguyên)
+        experience_schemes: Các cách chia nhóm kinh nghiệm thêm (xem
+            EXPERIENCE_SCHEMES), tất cả được tính trong một lần duyệt YearsCodePro
+
+    Trả về:
+        DataFrame đã được transform
+    """
+    # Tính các cột từ dữ liệu gốc trước khi gắn (các bước độc lập với nhau)
+    columns = {name: step(df) for name, step in COLUMN_STEPS.items()}
+
+    if experience_schemes:
+        columns.update(experience_level_columns(df, experience_schemes))
+
+    if not inplace:
+        df = df.copy(deep=False)
+
+    for name, values in columns.items():
+        df[name] = values
+
+    return df
+
+
 # HÀM CHẠY TOÀN BỘ QUY TRÌNH TRANSFORM
-def run_transform(input_path: str, output_path: str) -> pd.DataFrame:
+def run_transform(input_path: str, output_path: str, compact_dtypes: bool = True,
+                  multi_hot_path: str = None, experience_schemes: dict = None,
+                  cube_path: str = None, cube_sketch_k: int = DEFAULT_SKETCH_K, bitmap_path: str = None) -> pd.DataFrame:
     """
     Hàm chính thực hiện toàn bộ quy trình biến đổi dữ liệu.
     
     Các bước:
-    1. Đọc dữ liệu đã clean
+    1. Đọc dữ liệu đã clean (áp dụng kiểu dữ liệu gọn nhẹ)
     2. Tạo nhóm kinh nghiệm
     3. Chuẩn hoá các cột category
     4. Lưu kết quả
+    5. (Tuỳ chọn) Mã hoá multi-hot các cột multi-select và lưu cạnh kết quả
+    6. (Tuỳ chọn) Build cube OLAP (cube.build_cube) và lưu cạnh kết quả
+    7. (Tuỳ chọn) Build chỉ mục bitmap (bitmap_index.build_bitmap_index) và lưu cạnh kết quả
     
     Tham số:
-        input_path: Đường dẫn file CSV đầu vào (sau khi clean)
-        output_path: Đường dẫn file CSV đầu ra (sau khi transform)
+        input_path: Đường dẫn file đầu vào sau khi clean (.parquet, .feather hoặc .csv)
+        output_path: Đường dẫn file đầu ra sau khi transform (.parquet mặc định,
+            dùng đuôi .csv để xuất CSV)
+        compact_dtypes: True = chuyển sang kiểu dữ liệu gọn nhẹ theo
+            schema.DTYPE_PLAN khi đọc và sau khi chuẩn hoá nhãn
+        multi_hot_path: Đường dẫn file .npz lưu mã hoá multi-hot của
+            LanguageHaveWorkedWith, DevType, Frustration (None = không mã hoá)
+        experience_schemes: Các cách chia nhóm kinh nghiệm thêm, VD:
+            {'ExperienceLevelFine': EXPERIENCE_SCHEMES['ExperienceLevelFine']}
+        cube_path: Đường dẫn file .npz lưu cube (None = không build cube)
+        cube_sketch_k: Độ chính xác tóm tắt lương của cube (mặc định
+            cube.DEFAULT_SKETCH_K, None = giữ mọi giá trị, xem cube.build_cube)
+        bitmap_path: Đường dẫn file .npz lưu chỉ mục bitmap của các cột
+            bitmap_index.BITMAP_COLUMNS (None = không build)
     
     Trả về:
         DataFrame đã được transform
     """
     
     # Bước 1: Đọc dữ liệu
-    df = pd.read_csv(input_path)
-    
-    # Bước 2: Tạo nhóm kinh nghiệm
-    df = create_experience_bins(df)
+    df = read_table(input_path)
+    if compact_dtypes:
+        df = apply_dtype_plan(df)
     
-    # Bước 3: Chuẩn hoá RemoteWork
-    df = standardize_remote_work(df)
-    
-    # Bước 4: Chuẩn hoá AISelect
-    df = standardize_ai_select(df)
+    # Bước 2-4: Tạo nhóm kinh nghiệm, chuẩn hoá RemoteWork và AISelect
+    # (df vừa đọc từ file nên có thể sửa trực tiếp)
+    df = transform_survey(df, inplace=True, experience_schemes=experience_schemes)
+
+    # Nhãn sau khi chuẩn hoá cũng được chuyển về category
+    if compact_dtypes:
+        df = apply_dtype_plan(df)
     
-    # Lưu kết quả
-    df.to_csv(output_path, index=False)
+    # Lưu kết quả, các file .npz bên dưới lưu dấu vân tay của file vừa ghi
+    write_table(df, output_path)
+    fingerprint = table_fingerprint(output_path, len(df))
+
+    # Mã hoá multi-hot (thứ tự dòng trùng với file vừa lưu), dùng chung cho chỉ mục bitmap
+    encodings = encode_survey(df) if multi_hot_path is not None or bitmap_path is not None else None
+    if multi_hot_path is not None:
+        save_multi_hot(encodings, multi_hot_path, fingerprint)
+
+    # Build cube một lần, các phân tích sau chỉ truy vấn cube
+    if cube_path is not None:
+        save_cube(build_cube(df, sketch_k=cube_sketch_k), cube_path, fingerprint)
+
+    # Chỉ mục bitmap cho các bộ lọc nhiều điều kiện
+    if bitmap_path is not None:
+        save_bitmap_index(build_bitmap_index(df, encodings=encodings), bitmap_path, fingerprint)
 
     return df
 
@@ -183,8 +412,12 @@ def run_transform(input_path: str, output_path: str) -> pd.DataFrame:
 
 if __name__ == "__main__":
     # Đường dẫn mặc định
-    INPUT_PATH = './data/processed/cleaned_developer_survey.csv'
-    OUTPUT_PATH = './data/processed/transformed_developer_survey.csv'
+    INPUT_PATH = './data/processed/cleaned_developer_survey.parquet'
+    OUTPUT_PATH = './data/processed/transformed_developer_survey.parquet'
+    MULTI_HOT_PATH = './data/processed/multi_hot_encoding.npz'
+    CUBE_PATH = './data/processed/survey_cube.npz'
+    BITMAP_PATH = './data/processed/bitmap_index.npz'
     
     # Chạy transform
-    df = run_transform(INPUT_PATH, OUTPUT_PATH)
+    df = run_transform(INPUT_PATH, OUTPUT_PATH, multi_hot_path=MULTI_HOT_PATH, cube_path=CUBE_PATH,
+                       bitmap_path=BITMAP_PATH)
@@ -0,0 +1,13 @@
+# conftest.py - Cấu hình chung cho pytest
+# các module của pipeline nằm phẳng trong src/data_processing và import lẫn
+# nhau bằng tên module, nên thêm thư mục này vào sys.path trước khi chạy test.
+
+import os
+import sys
+
+
+DATA_PROCESSING_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                   'src', 'data_processing')
+
+if DATA_PROCESSING_DIR not in sys.path:
+    sys.path.insert(0, DATA_PROCESSING_DIR)
@@ -0,0 +1,62 @@
+# survey_data.py - Dữ liệu survey tổng hợp nhỏ dùng chung cho các test
+# bảng đã transform (cùng các cột với transformed_developer_survey), có đủ các
+# trường hợp dễ lệch giữa các cách tính:
+# 1. Lương rỗng (NaN) ở nhiều dòng, một nhóm kinh nghiệm không có dòng nào có lương
+# 2. Nhóm rỗng: một nhóm kinh nghiệm không có respondent nào
+# 3. Số đếm bằng nhau (ngôn ngữ lặp theo chu kỳ) và lương trùng nhau (ties)
+
+import numpy as np
+import pandas as pd
+
+from transform import EXPERIENCE_LABELS
+
+
+N_ROWS = 240
+
+LANGUAGE_PATTERNS = [
+    'Python;SQL', 'JavaScript;TypeScript;HTML/CSS', 'Go;Rust', 'Java;Kotlin',
+    'Python;Rust;SQL', 'C#;SQL', None, 'JavaScript;Python',
+]
+DEVTYPES = ['Developer, back-end', 'Developer, front-end', 'Developer, full-stack',
+            'Data engineer', 'DevOps specialist', 'Developer, mobile']
+FRUSTRATIONS = ['Amount of technical debt', 'Tracking my work', 'Number of software tools in use']
+
+
+def _join_random(rng, options: list, max_items: int):
+    # Một giá trị multi-select (các token nối bằng ';'), đôi khi rỗng
+    size = rng.integers(0, max_items + 1)
+    if size == 0:
+        return None
+    return ';'.join(rng.choice(options, size=size, replace=False))
+
+
+def make_survey(seed: int = 0) -> pd.DataFrame:
+    """
+    Bảng đã transform tổng hợp (cùng các cột với transformed_developer_survey).
+    """
+    rng = np.random.default_rng(seed)
+
+    # Không có respondent nào ở 'Junior (1-2)', 'Fresher (<1)' không có lương
+    levels = [label for label in EXPERIENCE_LABELS if label != 'Junior (1-2)']
+    experience = rng.choice(levels, size=N_ROWS)
+    salary = rng.choice([40_000, 50_000, 50_000, 75_000, 100_000, 120_000], size=N_ROWS).astype(float)
+    salary[rng.random(N_ROWS) < 0.2] = np.nan
+    salary[experience == 'Fresher (<1)'] = np.nan
+
+    df = pd.DataFrame({
+        'MainBranch': 'I am a developer by profession',
+        'Age': rng.choice(['18-24 years old', '25-34 years old', '35-44 years old'], size=N_ROWS),
+        'YearsCodePro': pd.array(rng.integers(0, 30, size=N_ROWS), dtype='UInt8'),
+        'DevType': [_join_random(rng, DEVTYPES, 2) for _ in range(N_ROWS)],
+        'LanguageHaveWorkedWith': [LANGUAGE_PATTERNS[i % len(LANGUAGE_PATTERNS)] for i in range(N_ROWS)],
+        'CompTotal': salary,
+        'RemoteWork': rng.choice(['Remote', 'Hybrid', 'In-person', None], size=N_ROWS),
+        'AISelect': rng.choice(['Using AI', 'Planning', 'Not Using'], size=N_ROWS),
+        'Frustration': [_join_random(rng, FRUSTRATIONS, 2) for _ in range(N_ROWS)],
+        'ExperienceLevel': pd.Categorical(experience, categories=EXPERIENCE_LABELS, ordered=True),
+    })
+
+    for col in ['MainBranch', 'Age', 'DevType', 'RemoteWork', 'AISelect', 'Frustration']:
+        df[col] = df[col].astype('category')
+
+    return df
@@ -0,0 +1,38 @@
+# test_cube.py - SurveyCube với dữ liệu rỗng, không có lương và filter không khớp ô nào
+
+import pytest
+
+from cube import build_cube
+from survey_data import make_survey
+
+
+@pytest.fixture(params=[200, None], ids=['sketch', 'exact'])
+def sketch_k(request):
+    return request.param
+
+
+def test_cube_without_salaries(sketch_k):
+    df = make_survey()
+    no_salary = df[df['CompTotal'].isna()]
+    cube = build_cube(no_salary, sketch_k=sketch_k)
+
+    table = cube.aggregate(['ExperienceLevel'], quantiles=[0.5])
+    assert table['Count'].sum() == len(no_salary)
+    assert (table['CompCount'] == 0).all()
+    assert table['CompQ50'].isna().all()
+
+
+def test_empty_cube(sketch_k):
+    cube = build_cube(make_survey().iloc[:0], sketch_k=sketch_k)
+
+    assert cube.aggregate(['ExperienceLevel'], quantiles=[0.5]).empty
+    assert cube.aggregate([], quantiles=[0.5]).empty
+
+
+@pytest.mark.parametrize('dims', [['ExperienceLevel'], ['DevType', 'ExperienceLevel'], []])
+def test_filter_without_match_returns_empty_table(sketch_k, dims):
+    cube = build_cube(make_survey(), sketch_k=sketch_k)
+    filters = {'RemoteWork': ['nope']}
+
+    assert cube.aggregate(dims, filters=filters, quantiles=[0.5]).empty
+    assert cube.salary_values(dims, filters=filters) == []
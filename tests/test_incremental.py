@@ -0,0 +1,76 @@
+# test_incremental.py - AnalysisState (update theo batch, merge, lưu / đọc lại) phải
+# finalize thành đúng các bảng của run_analysis, kể cả khi có ties
+
+import pandas as pd
+import pytest
+
+from analysis import ANALYSIS_SPECS, run_analysis
+from incremental import AnalysisState
+from storage import write_table
+from survey_data import DEVTYPES, N_ROWS, make_survey
+
+KEYS = [spec[0] for spec in ANALYSIS_SPECS]
+
+
+def make_tied_survey() -> pd.DataFrame:
+    # Mọi DevType có cùng tỉ lệ RemoteWork: thứ tự bảng remote_by_devtype chỉ do sort ổn định quyết định
+    df = make_survey()
+    patterns = [DEVTYPES[0], f'{DEVTYPES[1]};{DEVTYPES[2]}', DEVTYPES[3],
+                f'{DEVTYPES[4]};{DEVTYPES[0]}', DEVTYPES[5], DEVTYPES[2]]
+    remote = ['Remote', 'Hybrid', 'In-person', None]
+    df['DevType'] = pd.Categorical([patterns[i % len(patterns)] for i in range(N_ROWS)])
+    df['RemoteWork'] = pd.Categorical([remote[(i // len(patterns)) % len(remote)] for i in range(N_ROWS)])
+    return df
+
+
+def assert_same_tables(results: dict, expected: dict):
+    # Cùng giá trị, thứ tự dòng / cột và nhãn (không so kiểu số nguyên, giống check_backend_parity)
+    assert results.keys() == expected.keys()
+    for key in KEYS:
+        pd.testing.assert_frame_equal(results[key], expected[key], check_dtype=False, check_index_type=False,
+                                      check_column_type=False, check_categorical=False, obj=key)
+
+
+@pytest.fixture(scope='module', params=['survey', 'tied'])
+def survey(request) -> pd.DataFrame:
+    return make_survey() if request.param == 'survey' else make_tied_survey()
+
+
+@pytest.fixture(scope='module')
+def expected(survey, tmp_path_factory) -> dict:
+    path = tmp_path_factory.mktemp('survey') / 'transformed.parquet'
+    write_table(survey, str(path))
+    return run_analysis(str(path), write=False)
+
+
+def test_tied_survey_has_remote_ties():
+    table = AnalysisState(sketch_k=None).update(make_tied_survey()).remote_by_devtype()
+    assert len(table) > 1
+    assert table['Remote'].nunique() == 1
+
+
+@pytest.mark.parametrize('batch_rows', [N_ROWS, 70, 7])
+def test_batched_updates_match_run_analysis(survey, expected, batch_rows):
+    state = AnalysisState(sketch_k=None)
+    for start in range(0, len(survey), batch_rows):
+        state.update(survey.iloc[start:start + batch_rows])
+
+    assert state.n_rows == len(survey)
+    assert_same_tables(state.finalize(), expected)
+
+
+def test_merged_states_match_run_analysis(survey, expected):
+    middle = len(survey) // 3
+    state = AnalysisState(sketch_k=None).update(survey.iloc[:middle])
+    state.merge(AnalysisState(sketch_k=None).update(survey.iloc[middle:]))
+
+    assert_same_tables(state.finalize(), expected)
+
+
+def test_saved_state_keeps_updating(survey, expected, tmp_path):
+    middle = len(survey) // 2
+    path = str(tmp_path / 'state.pkl')
+    AnalysisState(sketch_k=None).update(survey.iloc[:middle]).save(path)
+
+    state = AnalysisState.load(path).update(survey.iloc[middle:])
+    assert_same_tables(state.finalize(), expected)